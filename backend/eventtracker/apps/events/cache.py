@@ -0,0 +1,88 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .utils import months_between
+
+# Les pages du calendrier mensuel sont rangées sous une version propre à (utilisateur, année, mois).
+# Invalider un mois revient à changer sa version : les pages de l'ancienne version ne sont plus
+# jamais lues, même si un lecteur concurrent les écrit après l'invalidation.
+CALENDAR_TIMEOUT = 60 * 60
+STATS_KEYS = {'hits': 'calendar:stats:hits', 'misses': 'calendar:stats:misses'}
+
+
+def _version_key(user_id, year, month):
+    return f'calendar:{user_id}:{year}:{month}:version'
+
+
+def _get_version(user_id, year, month):
+    key = _version_key(user_id, year, month)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), CALENDAR_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def _page_key(user_id, year, month, version, variant):
+    digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()
+    return f'calendar:{user_id}:{year}:{month}:{version}:{digest}'
+
+
+def _count(name):
+    key = STATS_KEYS[name]
+    if cache.add(key, 1, None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_month_page(user_id, year, month, variant):
+    """Retourne (clé, entrée en cache ou None) pour une page du calendrier ;
+    la clé sert à enregistrer la page calculée après un défaut de cache"""
+    key = _page_key(user_id, year, month, _get_version(user_id, year, month), variant)
+    entry = cache.get(key)
+    _count('hits' if entry is not None else 'misses')
+    return key, entry
+
+
+def set_month_page(key, entry):
+    cache.set(key, entry, CALENDAR_TIMEOUT)
+
+
+def invalidate_months(user_id, months):
+    version = time.time_ns()
+    cache.set_many({_version_key(user_id, year, month): version for year, month in months}, CALENDAR_TIMEOUT)
+
+
+def event_span(event):
+    """Période (organisateur, début, fin) d'un événement ; __dict__ évite de recharger un champ différé"""
+    fields = event.__dict__
+    return fields.get('created_by_id'), fields.get('start_date'), fields.get('end_date')
+
+
+def invalidate_span(user_id, start, end=None):
+    """Invalide les mois couverts par un événement"""
+    if user_id is None or start is None:
+        return
+    invalidate_months(user_id, months_between(start, end))
+
+
+def invalidate_spans_on_commit(spans):
+    """Invalide les mois de plusieurs périodes (user_id, début, fin) une fois la transaction validée"""
+    spans = set(spans)
+
+    def invalidate():
+        for span in spans:
+            invalidate_span(*span)
+    transaction.on_commit(invalidate)
+
+
+def calendar_cache_stats():
+    """Compteurs de succès et de défauts du cache calendrier"""
+    stats = cache.get_many(STATS_KEYS.values())
+    return {name: stats.get(key, 0) for name, key in STATS_KEYS.items()}
@@ -0,0 +1,46 @@
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Validateurs HTTP (ETag fort, Last-Modified) pour les lectures d'un ViewSet.
+
+    L'empreinte est calculée par une requête d'agrégat ; si le client possède déjà la
+    représentation courante, la vue répond 304 sans charger ni sérialiser les objets.
+
+    Last-Modified n'est envoyé que pour un objet seul : la date la plus récente d'une collection
+    ne change pas quand un élément en sort (suppression, fin de la période), alors que l'ETag,
+    qui inclut le nombre d'éléments, change.
+    """
+
+    def get_validators(self, request, fingerprint):
+        """ETag fort et, pour un objet seul, date de dernière modification (timestamp) de la représentation"""
+        last_modified = fingerprint['last_modified']
+        state = (request.user.pk, request.get_full_path(), request.accepted_media_type, sorted(fingerprint.items()))
+        etag = quote_etag(hashlib.sha1(repr(state).encode('utf-8')).hexdigest())
+        timestamp = timegm(last_modified.utctimetuple()) if last_modified and self.detail else None
+        return etag, timestamp
+
+    def check_validators(self, request, validators):
+        """Retourne une réponse 304 si If-None-Match / If-Modified-Since correspondent, sinon None"""
+        self.validators = validators
+        etag, timestamp = validators
+        return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    def not_modified(self, request, fingerprint):
+        if fingerprint is None:
+            return None
+        return self.check_validators(request, self.get_validators(request, fingerprint))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'validators', None)
+        if validators and response.status_code in (200, 304):
+            etag, timestamp = validators
+            response.headers['ETag'] = etag
+            if timestamp is not None:
+                response.headers['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,30 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+class EventSearchFilter(filters.SearchFilter):
+    """Recherche plein texte sur le vecteur stocké Event.search_vector (index GIN, français).
+
+    Les résultats contiennent tous les termes, comme avec SearchFilter, et sont classés par
+    pertinence sauf si le client demande un autre ordre. Hors PostgreSQL, la recherche
+    ILIKE de SearchFilter sur ``search_fields`` est utilisée.
+    """
+    search_config = 'french'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        query = SearchQuery(' '.join(terms), config=self.search_config)
+        # Rang en double précision : la valeur renvoyée au curseur de pagination reste exacte
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        )
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.order_by('-search_rank')
+        return queryset
@@ -0,0 +1,287 @@
+import re
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import event_span, invalidate_spans_on_commit
+from .models import EventType, Event, Reminder
+
+PRODID = '-//EventTracker//Evenements//FR'
+# Type des événements importés dont aucune catégorie ne correspond à un type existant
+DEFAULT_EVENT_TYPE = 'Autre'
+DURATION_RE = re.compile(
+    r'^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$'
+)
+
+
+class ICalendarError(ValueError):
+    pass
+
+
+def escape_text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def unescape_text(value):
+    return re.sub(r'\\([\\;,nN])', lambda match: '\n' if match.group(1) in 'nN' else match.group(1), value)
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def fold(line):
+    """Coupe une ligne de contenu à 75 octets (les lignes suivantes commencent par une espace)"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, current, size = [], '', 0
+    limit = 75
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            parts.append(current)
+            current, size, limit = '', 0, 74
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def iter_calendar(events, name='Événements'):
+    """Génère le calendrier morceau par morceau ; ``events`` peut être un itérateur de queryset"""
+    yield ''.join([
+        'BEGIN:VCALENDAR\r\n', 'VERSION:2.0\r\n', f'PRODID:{PRODID}\r\n', 'CALSCALE:GREGORIAN\r\n',
+        fold(f'X-WR-CALNAME:{escape_text(name)}'),
+    ])
+    for event in events:
+        yield ''.join(_event_lines(event))
+    yield 'END:VCALENDAR\r\n'
+
+
+def _event_lines(event):
+    yield 'BEGIN:VEVENT\r\n'
+    yield f'UID:event-{event.pk}@eventtracker\r\n'
+    yield f'DTSTAMP:{format_datetime(event.updated_at)}\r\n'
+    yield f'DTSTART:{format_datetime(event.start_date)}\r\n'
+    if event.end_date:
+        yield f'DTEND:{format_datetime(event.end_date)}\r\n'
+    yield fold(f'SUMMARY:{escape_text(event.title)}')
+    if event.description:
+        yield fold(f'DESCRIPTION:{escape_text(event.description)}')
+    if event.location:
+        yield fold(f'LOCATION:{escape_text(event.location)}')
+    yield fold(f'CATEGORIES:{escape_text(event.event_type.name)}')
+    if event.is_private:
+        yield 'CLASS:PRIVATE\r\n'
+    for reminder in event.reminders.all():
+        yield 'BEGIN:VALARM\r\n'
+        yield 'ACTION:DISPLAY\r\n'
+        yield fold(f'DESCRIPTION:{escape_text(reminder.message or event.title)}')
+        yield f'TRIGGER;VALUE=DATE-TIME:{format_datetime(reminder.reminder_date)}\r\n'
+        yield 'END:VALARM\r\n'
+    yield 'END:VEVENT\r\n'
+
+
+def unfold(lines):
+    """Reconstitue les lignes de contenu à partir d'un flux de lignes physiques (str ou bytes)"""
+    current = None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_line(line):
+    """Découpe « NOM;PARAM=VALEUR:contenu » en (nom, paramètres, contenu)"""
+    head, separator, value = line.partition(':')
+    # Un « : » peut apparaître dans un paramètre entre guillemets (TZID="...")
+    while head.count('"') % 2 and separator:
+        rest_head, separator, value = value.partition(':')
+        head = f'{head}:{rest_head}'
+    if not separator:
+        raise ICalendarError(f'Ligne invalide : {line[:40]}')
+    name, *raw_params = head.split(';')
+    params = {}
+    for raw in raw_params:
+        key, _, param_value = raw.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def parse_datetime(value, params):
+    """Date-heure UTC (Z), avec TZID, flottante (fuseau courant) ou date seule (minuit), convertie en UTC"""
+    is_date = params.get('VALUE') == 'DATE' or len(value) == 8
+    try:
+        if is_date:
+            parsed = datetime.combine(date(int(value[:4]), int(value[4:6]), int(value[6:8])), time())
+        else:
+            parsed = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    except ValueError:
+        raise ICalendarError(f'Date invalide : {value}')
+    zone = timezone.get_current_timezone()
+    if value.endswith('Z'):
+        zone = dt_timezone.utc
+    elif 'TZID' in params and not is_date:
+        try:
+            zone = ZoneInfo(params['TZID'])
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    try:
+        # Une date proche de l'an 1 ou de l'an 9999 peut sortir des bornes une fois en UTC
+        return parsed.replace(tzinfo=zone).astimezone(dt_timezone.utc)
+    except OverflowError:
+        raise ICalendarError(f'Date hors limites : {value}')
+
+
+def parse_duration(value):
+    match = DURATION_RE.match(value)
+    if not match or value in ('P', '+P', '-P'):
+        raise ICalendarError(f'Durée invalide : {value}')
+    parts = {key: int(number or 0) for key, number in match.groupdict().items() if key != 'sign'}
+    try:
+        duration = timedelta(**parts)
+    except OverflowError:
+        raise ICalendarError(f'Durée hors limites : {value}')
+    return -duration if match.group('sign') == '-' else duration
+
+
+def _shift(moment, duration):
+    try:
+        return moment + duration
+    except OverflowError:
+        raise ICalendarError(f'Date hors limites : {moment.isoformat()} + {duration}')
+
+
+def parse_events(lines):
+    """Lit un calendrier iCalendar (RFC 5545) en flux et produit un dictionnaire par VEVENT.
+
+    Chaque événement contient title, description, location, start_date, end_date,
+    categories, is_private et alarms (liste de (date, message)).
+    """
+    event = alarm = None
+    for line in unfold(lines):
+        name, params, value = parse_line(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = {'title': '', 'description': '', 'location': '', 'start_date': None, 'end_date': None,
+                     'duration': None, 'categories': [], 'is_private': False, 'alarms': []}
+        elif event is None:
+            continue
+        elif name == 'BEGIN' and value.upper() == 'VALARM':
+            alarm = {'trigger': None, 'related_end': False, 'message': ''}
+        elif name == 'END' and value.upper() == 'VALARM':
+            if alarm['trigger'] is not None:
+                event['alarms'].append(alarm)
+            alarm = None
+        elif name == 'END' and value.upper() == 'VEVENT':
+            yield _finish_event(event)
+            event = None
+        elif alarm is not None:
+            if name == 'TRIGGER':
+                if params.get('VALUE') == 'DATE-TIME':
+                    alarm['trigger'] = parse_datetime(value, params)
+                else:
+                    alarm['trigger'] = parse_duration(value)
+                    alarm['related_end'] = params.get('RELATED') == 'END'
+            elif name == 'DESCRIPTION':
+                alarm['message'] = unescape_text(value)
+        elif name == 'SUMMARY':
+            event['title'] = unescape_text(value)
+        elif name == 'DESCRIPTION':
+            event['description'] = unescape_text(value)
+        elif name == 'LOCATION':
+            event['location'] = unescape_text(value)
+        elif name == 'DTSTART':
+            event['start_date'] = parse_datetime(value, params)
+        elif name == 'DTEND':
+            event['end_date'] = parse_datetime(value, params)
+        elif name == 'DURATION':
+            event['duration'] = parse_duration(value)
+        elif name == 'CATEGORIES':
+            event['categories'] += [unescape_text(category).strip() for category in re.split(r'(?<!\\),', value)]
+        elif name == 'CLASS':
+            event['is_private'] = value.upper() in ('PRIVATE', 'CONFIDENTIAL')
+
+
+def _finish_event(event):
+    if event['start_date'] is None:
+        raise ICalendarError(f"Événement sans DTSTART : {event['title'][:40]}")
+    if event['end_date'] is None and event['duration']:
+        event['end_date'] = _shift(event['start_date'], event['duration'])
+    alarms = []
+    for alarm in event.pop('alarms'):
+        trigger = alarm['trigger']
+        if isinstance(trigger, timedelta):
+            anchor = event['end_date'] if alarm['related_end'] and event['end_date'] else event['start_date']
+            trigger = _shift(anchor, trigger)
+        alarms.append((trigger, alarm['message']))
+    event['alarms'] = alarms
+    del event['duration']
+    return event
+
+
+def import_calendar(user, lines, chunk_size=500):
+    """Crée les événements et rappels d'un calendrier par lots de ``chunk_size`` (bulk_create).
+
+    Les catégories sont associées aux types d'événements existants par nom (sans casse) ; sans
+    correspondance, l'événement reçoit le type par défaut « Autre ». Les types étant partagés par
+    tous les utilisateurs, un import n'en crée jamais d'autre. L'import est atomique. Retourne les
+    compteurs.
+    """
+    event_types = {event_type.name.lower(): event_type for event_type in EventType.objects.all()}
+    counts = {'events': 0, 'reminders': 0}
+
+    def event_type_for(categories):
+        for category in categories:
+            if category.lower() in event_types:
+                return event_types[category.lower()]
+        if DEFAULT_EVENT_TYPE.lower() not in event_types:
+            event_types[DEFAULT_EVENT_TYPE.lower()], _ = EventType.objects.get_or_create(
+                name=DEFAULT_EVENT_TYPE, defaults={'icon': 'event'},
+            )
+        return event_types[DEFAULT_EVENT_TYPE.lower()]
+
+    def flush(chunk):
+        events = Event.objects.bulk_create([event for event, _ in chunk])
+        reminders = Reminder.objects.bulk_create([
+            Reminder(event=event, reminder_date=trigger, message=message[:255])
+            for event, alarms in zip(events, (alarms for _, alarms in chunk))
+            for trigger, message in alarms
+        ])
+        # bulk_create n'envoie pas post_save : le calendrier est invalidé ici
+        invalidate_spans_on_commit(event_span(event) for event in events)
+        counts['events'] += len(events)
+        counts['reminders'] += len(reminders)
+
+    with transaction.atomic():
+        chunk = []
+        for data in parse_events(lines):
+            event = Event(
+                title=data['title'][:255] or 'Sans titre',
+                event_type=event_type_for(data['categories']),
+                description=data['description'],
+                location=data['location'][:255],
+                start_date=data['start_date'],
+                end_date=data['end_date'],
+                is_private=data['is_private'],
+                created_by=user,
+            )
+            chunk.append((event, data['alarms']))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    return counts
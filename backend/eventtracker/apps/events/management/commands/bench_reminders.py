@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from apps.events.models import EventType, Event, Reminder
+from apps.events.reminders import BaseNotifier, dispatch_due_reminders
+from apps.users.models import User
+
+class CountingNotifier(BaseNotifier):
+    def __init__(self):
+        self.count = 0
+
+    def send(self, reminders):
+        self.count += len(reminders)
+
+class Command(BaseCommand):
+    help = 'Mesure le débit d\'envoi des rappels sur une file de rappels échus (PostgreSQL recommandé)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000000, help='Nombre de rappels en attente à créer')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=4, help='Workers concurrents (un thread et une connexion chacun)')
+
+    def handle(self, *args, **options):
+        count, batch_size = options['count'], options['batch_size']
+        user, _ = User.objects.get_or_create(email='bench-reminders@example.com', defaults={'username': 'bench-reminders'})
+        event_type, _ = EventType.objects.get_or_create(name='Benchmark')
+        event = Event.objects.create(title='Benchmark rappels', event_type=event_type,
+                                     start_date=timezone.now(), created_by=user)
+
+        start = time.perf_counter()
+        due = timezone.now() - timedelta(minutes=1)
+        for offset in range(0, count, 10000):
+            Reminder.objects.bulk_create(
+                Reminder(event=event, reminder_date=due - timedelta(seconds=index), message='Benchmark')
+                for index in range(offset, min(offset + 10000, count))
+            )
+        self.stdout.write(f'{count} rappels créés en {time.perf_counter() - start:.1f} s')
+
+        def worker():
+            notifier = CountingNotifier()
+            try:
+                while dispatch_due_reminders(notifier, batch_size=batch_size):
+                    pass
+            finally:
+                connection.close()
+            return notifier.count
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            sent = sum(executor.map(lambda _: worker(), range(options['workers'])))
+        elapsed = time.perf_counter() - start
+
+        user.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{sent} rappels envoyés en {elapsed:.1f} s ({sent / elapsed:.0f} rappels/s, '
+            f'{options["workers"]} workers, lots de {batch_size})'
+        ))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.events.reminders import dispatch_due_reminders, get_notifier
+
+class Command(BaseCommand):
+    help = 'Envoie les rappels échus par lots (--loop pour un worker permanent)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Nombre de rappels réclamés par lot')
+        parser.add_argument('--loop', action='store_true', help='Continue à surveiller la file après l\'avoir vidée')
+        parser.add_argument('--interval', type=float, default=30, help='Pause (secondes) quand la file est vide')
+
+    def handle(self, *args, **options):
+        notifier = get_notifier()
+        total = 0
+        try:
+            while True:
+                sent = dispatch_due_reminders(notifier, batch_size=options['batch_size'])
+                total += sent
+                if sent:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{total} rappel(s) envoyé(s)')
+        )
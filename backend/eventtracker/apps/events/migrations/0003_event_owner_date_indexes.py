@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['created_by', 'start_date'], name='event_owner_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['created_by', 'end_date'], name='event_owner_end_idx'),
+        ),
+    ]
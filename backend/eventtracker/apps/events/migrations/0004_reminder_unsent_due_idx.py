@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_owner_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(condition=models.Q(('sent', False)), fields=['reminder_date'], name='reminder_unsent_due_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:01
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('french', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('french', coalesce({row}location, '')), 'B') ||
+    setweight(to_tsvector('french', coalesce({row}description, '')), 'C')
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    # Le vecteur est recalculé ligne par ligne à l'écriture, uniquement sur PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE OR REPLACE FUNCTION events_event_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER events_event_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, location, description ON events_event
+        FOR EACH ROW EXECUTE FUNCTION events_event_search_vector_update();
+    """)
+    schema_editor.execute(f"UPDATE events_event SET search_vector = {SEARCH_VECTOR_SQL.format(row='')}")
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        DROP TRIGGER IF EXISTS events_event_search_vector_trigger ON events_event;
+        DROP FUNCTION IF EXISTS events_event_search_vector_update();
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_reminder_unsent_due_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='event_search_vector_idx'),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
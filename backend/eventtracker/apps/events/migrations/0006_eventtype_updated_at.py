@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventtype',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,14 +1,90 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from apps.users.models import User
 
 class EventType(models.Model):
     name = models.CharField(max_length=100)
     icon = models.CharField(max_length=50, blank=True)
     color = models.CharField(max_length=7, default="#6200EE")  # Format hexadécimal
+    # Le type est sérialisé avec chaque événement : sa modification entre dans leur empreinte
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
 
+def _with_type_change(fingerprint):
+    """Une modification du type d'événement compte comme une modification de l'événement"""
+    if fingerprint and fingerprint['type_modified']:
+        fingerprint['last_modified'] = max(filter(None, (fingerprint['last_modified'], fingerprint['type_modified'])))
+    return fingerprint
+
+class EventQuerySet(models.QuerySet):
+    """Requêtes préchargées selon l'usage, pour un nombre de requêtes SQL constant"""
+
+    def owned_by(self, user):
+        return self.filter(created_by=user)
+
+    def overlapping(self, start, end):
+        """Événements qui chevauchent [start, end[, y compris ceux qui couvrent toute la période.
+        Un événement sans date de fin est ponctuel."""
+        return self.filter(
+            Q(start_date__lt=end),
+            Q(end_date__gte=start) | Q(end_date__isnull=True, start_date__gte=start),
+        )
+
+    def for_list(self):
+        """Champs lus par EventSerializer : type d'événement et rappels"""
+        return self.select_related('event_type').prefetch_related('reminders')
+
+    def for_detail(self):
+        """Champs lus par EventDetailSerializer : invités, tâches et liste de cadeaux en plus"""
+        return self.for_list().select_related('gift_list').prefetch_related(
+            models.Prefetch('guests', queryset=self._related_ids('guests')),
+            models.Prefetch('tasks', queryset=self._related_ids('tasks')),
+        )
+
+    def touch(self):
+        """Met à jour updated_at sans passer par save() (rappels modifiés ou envoyés)"""
+        return self.update(updated_at=timezone.now())
+
+    def fingerprint(self):
+        """État d'une collection en une requête : dernière modification, nombre d'événements et de rappels"""
+        return _with_type_change(self.order_by().aggregate(
+            last_modified=models.Max('updated_at'),
+            type_modified=models.Max('event_type__updated_at'),
+            events=models.Count('id', distinct=True),
+            reminders=models.Count('reminders'),
+        ))
+
+    def detail_fingerprint(self):
+        """État d'un événement et des collections exposées par EventDetailSerializer, en une requête"""
+        return _with_type_change(self.order_by().values(
+            last_modified=models.F('updated_at'), type_modified=models.F('event_type__updated_at'),
+            gift_list_id=models.F('gift_list__id'),
+        ).annotate(
+            reminders=self._related_aggregate('reminders', models.Count('id')),
+            guests=self._related_aggregate('guests', models.Count('id')),
+            last_guest=self._related_aggregate('guests', models.Max('id')),
+            tasks=self._related_aggregate('tasks', models.Count('id')),
+            last_task=self._related_aggregate('tasks', models.Max('id')),
+        ).first())
+
+    def _related_aggregate(self, related_name, aggregate):
+        related_model = self.model._meta.get_field(related_name).related_model
+        return models.Subquery(
+            related_model.objects.filter(event=models.OuterRef('pk')).order_by()
+            .values('event').annotate(value=aggregate).values('value')
+        )
+
+    def _related_ids(self, related_name):
+        # Le sérialiseur n'expose que les clés primaires des invités et des tâches
+        related_model = self.model._meta.get_field(related_name).related_model
+        return related_model.objects.only('id', 'event_id')
+
+
 class Event(models.Model):
     title = models.CharField(max_length=255)
     event_type = models.ForeignKey(EventType, on_delete=models.CASCADE)
@@ -20,6 +96,18 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_private = models.BooleanField(default=False)
+    # Maintenu par un trigger PostgreSQL (titre, lieu, description ; configuration française)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    objects = EventQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Listes et calendrier par organisateur : upcoming, by_month, pagination sur start_date
+            models.Index(fields=['created_by', 'start_date'], name='event_owner_start_idx'),
+            models.Index(fields=['created_by', 'end_date'], name='event_owner_end_idx'),
+            GinIndex(fields=['search_vector'], name='event_search_vector_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -30,5 +118,11 @@ class Reminder(models.Model):
     message = models.CharField(max_length=255, blank=True)
     sent = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            # File des rappels à envoyer : seuls les rappels non envoyés sont indexés
+            models.Index(fields=['reminder_date'], name='reminder_unsent_due_idx', condition=Q(sent=False)),
+        ]
+    
     def __str__(self):
         return f"Rappel pour {self.event.title}"
\ No newline at end of file
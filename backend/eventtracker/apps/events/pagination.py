@@ -0,0 +1,180 @@
+import datetime
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Garde les microsecondes des dates, que DjangoJSONEncoder tronque : la position doit être exacte"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """Pagination par curseur (keyset).
+
+    Chaque page filtre sur la position de la dernière ligne vue au lieu d'un OFFSET :
+    une page profonde coûte autant que la première. Le dernier champ de l'ordre doit
+    être unique (``id`` est ajouté sinon) et aucun champ de l'ordre ne doit être nul.
+    """
+    ordering = ('-id',)
+    tiebreaker = 'id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Curseur invalide'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request, queryset.model)
+
+        reverse = bool(self.cursor and self.cursor['reverse'])
+        if self.cursor:
+            queryset = queryset.filter(self.position_filter(self.cursor['position'], reverse))
+        order = [self._invert(field) for field in self.ordering] if reverse else self.ordering
+
+        rows = list(queryset.order_by(*order)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = self.cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        if rows:
+            self.first_position = self.get_position(rows[0])
+            self.last_position = self.get_position(rows[-1])
+        else:
+            # Page vide : les deux liens repartent de la position demandée
+            self.first_position = self.last_position = self.cursor['position'] if self.cursor else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """Ordre explicite du queryset (OrderingFilter) s'il existe, sinon ``ordering``"""
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering or len(ordering) != len(queryset.query.order_by):
+            ordering = list(self.ordering)
+        if not any(field.lstrip('-') in (self.tiebreaker, 'pk') for field in ordering):
+            ordering.append(self.tiebreaker)
+        return ordering
+
+    def position_filter(self, position, reverse=False):
+        """Condition « après la position » : (a > x) OU (a = x ET b > y) OU ..."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= equal & Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal &= Q(**{name: value})
+        # Borne sur le premier champ : le planificateur peut parcourir l'index sur une plage
+        first = self.ordering[0].lstrip('-')
+        descending = self.ordering[0].startswith('-') != reverse
+        return Q(**{f"{first}__{'lte' if descending else 'gte'}": position[0]}) & condition
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = instance
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            position.append(value)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, cls=CursorEncoder)
+        cursor = b64encode(payload.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = payload['p']
+            if len(position) != len(self.ordering):
+                raise ValueError
+            position = [self._to_python(model, field, value) for field, value in zip(self.ordering, position)]
+        except (TypeError, ValueError, KeyError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {'position': position, 'reverse': bool(payload.get('r'))}
+
+    def _to_python(self, model, field, value):
+        # Les annotations (rang de recherche, etc.) gardent leur valeur JSON
+        path = field.lstrip('-').split('__')
+        try:
+            for name in path[:-1]:
+                model = model._meta.get_field(name).related_model
+            model_field = model._meta.get_field('id' if path[-1] == 'pk' else path[-1])
+        except (FieldDoesNotExist, AttributeError):
+            return value
+        return model_field.to_python(value)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class EventCursorPagination(KeysetPagination):
+    """Pagination des listes d'événements sur (-start_date, id)"""
+    ordering = ('-start_date', 'id')
+
+
+class UpcomingEventPagination(KeysetPagination):
+    """Événements à venir, du plus proche au plus lointain, sur (start_date, id)"""
+    ordering = ('start_date', 'id')
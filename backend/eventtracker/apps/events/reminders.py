@@ -0,0 +1,67 @@
+import logging
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cache import event_span, invalidate_spans_on_commit
+from .models import Event, Reminder
+
+logger = logging.getLogger(__name__)
+
+
+class BaseNotifier(ABC):
+    """Envoie un lot de rappels ; une exception annule le lot, qui sera repris plus tard"""
+
+    @abstractmethod
+    def send(self, reminders):
+        """Remet chaque rappel du lot à son destinataire"""
+
+
+class LogNotifier(BaseNotifier):
+    """Notificateur par défaut : journalise les rappels sans service externe"""
+
+    def send(self, reminders):
+        for reminder in reminders:
+            logger.info("Rappel %s pour « %s » : %s", reminder.pk, reminder.event.title, reminder.message)
+
+
+class LocalNotifier(BaseNotifier):
+    """Conserve les rappels envoyés en mémoire (tests et mesures locales)"""
+
+    def __init__(self):
+        self.outbox = []
+
+    def send(self, reminders):
+        self.outbox.extend(reminders)
+
+
+def get_notifier():
+    return import_string(settings.REMINDER_NOTIFIER)()
+
+
+def dispatch_due_reminders(notifier, batch_size=500, now=None):
+    """Réclame un lot de rappels échus, l'envoie puis le marque envoyé en une seule mise à jour.
+
+    Les lignes sont verrouillées avec SELECT ... FOR UPDATE SKIP LOCKED : plusieurs workers
+    se partagent la file sans se bloquer ni envoyer deux fois le même rappel.
+    Retourne le nombre de rappels envoyés.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        reminders = list(
+            Reminder.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('event')
+            .filter(sent=False, reminder_date__lte=now)
+            .order_by('reminder_date')[:batch_size]
+        )
+        if not reminders:
+            return 0
+        notifier.send(reminders)
+        Reminder.objects.filter(pk__in=[reminder.pk for reminder in reminders]).update(sent=True)
+        Event.objects.filter(pk__in={reminder.event_id for reminder in reminders}).touch()
+        # Mise à jour groupée : aucun signal post_save, le calendrier est invalidé ici
+        invalidate_spans_on_commit(event_span(reminder.event) for reminder in reminders)
+    return len(reminders)
@@ -0,0 +1,15 @@
+from rest_framework import renderers
+
+
+class ICalendarRenderer(renderers.BaseRenderer):
+    """Négociation du type text/calendar ; le flux lui-même est produit par la vue"""
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Seules les réponses d'erreur (authentification, 404...) passent par ici
+        if data is None:
+            return b''
+        detail = data.get('detail', data) if isinstance(data, dict) else data
+        return str(detail).encode(self.charset)
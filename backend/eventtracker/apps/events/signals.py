@@ -0,0 +1,43 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .cache import event_span, invalidate_spans_on_commit
+from .models import Event, EventType, Reminder
+
+
+@receiver(post_init, sender=Event)
+def remember_event_span(sender, instance, **kwargs):
+    """Mémorise la période chargée pour invalider aussi les mois quittés par l'événement"""
+    instance._loaded_span = event_span(instance)
+
+
+@receiver(post_save, sender=Event)
+def invalidate_event_months(sender, instance, **kwargs):
+    invalidate_spans_on_commit([instance._loaded_span, event_span(instance)])
+    instance._loaded_span = event_span(instance)
+
+
+@receiver(post_delete, sender=Event)
+def invalidate_deleted_event_months(sender, instance, **kwargs):
+    invalidate_spans_on_commit([event_span(instance)])
+
+
+@receiver(post_save, sender=EventType)
+def invalidate_event_type_months(sender, instance, created, **kwargs):
+    # Nom et couleur du type figurent dans les pages du calendrier de ses événements
+    if not created:
+        spans = Event.objects.filter(event_type=instance).values_list('created_by_id', 'start_date', 'end_date')
+        invalidate_spans_on_commit(spans)
+
+
+@receiver(post_save, sender=Reminder)
+def invalidate_reminder_months(sender, instance, **kwargs):
+    invalidate_spans_on_commit([event_span(instance.event)])
+
+
+@receiver(post_delete, sender=Reminder)
+def invalidate_deleted_reminder_months(sender, instance, origin=None, **kwargs):
+    # Suppression en cascade d'un événement : son propre post_delete invalide déjà ses mois
+    if isinstance(origin, (Reminder, QuerySet)) and getattr(origin, 'model', Reminder) is Reminder:
+        invalidate_spans_on_commit([event_span(instance.event)])
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.apps import apps
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def _related(model_label, event_path, aggregate, output_field=IntegerField(), **filters):
+    """Sous-requête corrélée : agrégat des lignes de ``model_label`` rattachées à l'événement"""
+    model = apps.get_model(model_label)
+    queryset = (model.objects.filter(**{event_path: OuterRef('pk')}, **filters).order_by()
+                .values(event_path).annotate(value=aggregate).values('value'))
+    default = Value(Decimal(0)) if isinstance(output_field, DecimalField) else Value(0)
+    return Coalesce(Subquery(queryset, output_field=output_field), default, output_field=output_field)
+
+
+def summary_annotations(now=None):
+    now = now or timezone.now()
+    money = DecimalField(max_digits=12, decimal_places=2)
+    annotations = {
+        'tasks_total': _related('planning.Task', 'event', Count('pk')),
+        'tasks_overdue': _related('planning.Task', 'event', Count('pk'),
+                                  due_date__lt=now, status__in=['not_started', 'in_progress']),
+        'gifts_total': _related('gifts.Gift', 'list__event', Count('pk')),
+        'reserved_value': _related('gifts.Gift', 'list__event', Sum('price'), output_field=money, status='reserved'),
+        'albums': _related('photos.Album', 'event', Count('pk')),
+        'photos': _related('photos.Photo', 'album__event', Count('pk')),
+    }
+    # Les réponses viennent des compteurs maintenus (EventRSVPStats), sans parcourir les invités
+    for counter in ('pending', 'accepted', 'declined', 'plus_ones', 'accepted_plus_ones'):
+        annotations[f'guests_{counter}'] = Coalesce(F(f'rsvp_stats__{counter}'), 0)
+    for status in ('not_started', 'in_progress', 'completed'):
+        annotations[f'tasks_{status}'] = _related('planning.Task', 'event', Count('pk'), status=status)
+    for status in ('available', 'reserved', 'purchased'):
+        annotations[f'gifts_{status}'] = _related('gifts.Gift', 'list__event', Count('pk'), status=status)
+    return annotations
+
+
+def event_summary(queryset, now=None):
+    """Tableau de bord d'un événement (invités, tâches, cadeaux, photos) calculé en une seule requête"""
+    row = queryset.order_by().values('pk').annotate(**summary_annotations(now)).first()
+    if row is None:
+        return None
+    return {
+        'event': row['pk'],
+        'guests': {
+            'total': row['guests_pending'] + row['guests_accepted'] + row['guests_declined'],
+            'pending': row['guests_pending'],
+            'accepted': row['guests_accepted'],
+            'declined': row['guests_declined'],
+            'plus_ones': row['guests_plus_ones'],
+            'headcount': row['guests_accepted'] + row['guests_accepted_plus_ones'],
+        },
+        'tasks': {
+            'total': row['tasks_total'],
+            'not_started': row['tasks_not_started'],
+            'in_progress': row['tasks_in_progress'],
+            'completed': row['tasks_completed'],
+            'overdue': row['tasks_overdue'],
+        },
+        'gifts': {
+            'total': row['gifts_total'],
+            'available': row['gifts_available'],
+            'reserved': row['gifts_reserved'],
+            'purchased': row['gifts_purchased'],
+            'reserved_value': f"{row['reserved_value']:.2f}",
+        },
+        'photos': {
+            'albums': row['albums'],
+            'photos': row['photos'],
+        },
+    }
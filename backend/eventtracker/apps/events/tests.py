@@ -1,3 +1,542 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from eventtracker.testing import EndpointBudgetMixin
+from .cache import calendar_cache_stats
+from .models import EventType, Event, Reminder
+from .pagination import EventCursorPagination
+from .reminders import LocalNotifier, dispatch_due_reminders
+from .utils import month_bounds
+
+# Budgets par endpoint : nombre maximal de requêtes SQL et durée maximale (ms).
+# Toute régression (N+1, sérialisation plus lente) fait échouer la suite.
+ENDPOINT_BUDGETS = {
+    'events-list': {'queries': 3, 'ms': 300},
+    'events-list-next': {'queries': 3, 'ms': 300},
+    'events-retrieve': {'queries': 5, 'ms': 200},
+    'events-list-not-modified': {'queries': 1, 'ms': 100},
+    'events-retrieve-not-modified': {'queries': 1, 'ms': 100},
+    'events-upcoming': {'queries': 3, 'ms': 300},
+    'events-by-month': {'queries': 3, 'ms': 300},
+    'events-summary': {'queries': 1, 'ms': 200},
+    # Type, événement, ligne des compteurs de réponses (guests), rappels sérialisés
+    'events-create': {'queries': 4, 'ms': 200},
+    'reminders-list': {'queries': 1, 'ms': 300},
+    'reminders-create': {'queries': 4, 'ms': 200},
+}
+
+
+class EventEndpointBudgetTests(EndpointBudgetMixin, TestCase):
+    """Budgets des endpoints de l'application events sur un jeu de données réaliste"""
+    budgets = ENDPOINT_BUDGETS
+    EVENT_COUNT = 30
+    REMINDERS_PER_EVENT = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='organisateur', email='organisateur@example.com', password='secret')
+        other = User.objects.create_user(username='autre', email='autre@example.com', password='secret')
+        types = [
+            EventType.objects.create(name=name, icon=icon, color=color)
+            for name, icon, color in [('Mariage', 'favorite', '#AB47BC'), ('Fête', 'celebration', '#26A69A'),
+                                      ('Réunion', 'people', '#42A5F5')]
+        ]
+
+        now = timezone.now()
+        events = []
+        for index in range(cls.EVENT_COUNT):
+            start = now + timedelta(days=index * 3 - cls.EVENT_COUNT)
+            events.append(Event(
+                title=f"Événement {index}",
+                event_type=types[index % len(types)],
+                description="Description " * 20,
+                location="Douala",
+                start_date=start,
+                end_date=start + timedelta(hours=4),
+                created_by=cls.user,
+            ))
+        events.append(Event(title="Événement d'un autre", event_type=types[0], start_date=now, created_by=other))
+        Event.objects.bulk_create(events)
+
+        Reminder.objects.bulk_create([
+            Reminder(event=event, reminder_date=event.start_date - timedelta(days=day + 1), message=f"Rappel {day}")
+            for event in Event.objects.filter(created_by=cls.user)
+            for day in range(cls.REMINDERS_PER_EVENT)
+        ])
+        cls.event = Event.objects.filter(created_by=cls.user).first()
+        cls.event_type = types[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list(self):
+        response = self.measure('events-list', 'get', '/api/events/events/')
+        self.assertEqual(len(response.data['results']), EventCursorPagination.page_size)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_list_next_page(self):
+        next_url = self.client.get('/api/events/events/').data['next']
+        response = self.measure('events-list-next', 'get', next_url)
+        self.assertEqual(len(response.data['results']), self.EVENT_COUNT - EventCursorPagination.page_size)
+        self.assertIsNone(response.data['next'])
+
+    def test_list_cursor_walks_every_event_once(self):
+        # Des dates identiques obligent le curseur à départager sur l'id
+        Event.objects.filter(created_by=self.user, pk__lte=self.event.pk + 5).update(start_date=self.event.start_date)
+        seen, url = [], '/api/events/events/?page_size=7'
+        while url:
+            data = self.client.get(url).data
+            seen.extend((item['start_date'], item['id']) for item in data['results'])
+            url = data['next']
+        self.assertEqual(len({item_id for _, item_id in seen}), self.EVENT_COUNT)
+        expected = Event.objects.filter(created_by=self.user).order_by('-start_date', 'id').values_list('id', flat=True)
+        self.assertEqual([item_id for _, item_id in seen], list(expected))
+
+        previous = self.client.get(data['previous']).data
+        self.assertEqual([item['id'] for item in previous['results']], list(expected)[-9:-2])
+
+    def test_retrieve(self):
+        response = self.measure('events-retrieve', 'get', f'/api/events/events/{self.event.pk}/')
+        self.assertEqual(len(response.data['reminders']), self.REMINDERS_PER_EVENT)
+
+    def test_list_not_modified(self):
+        etag = self.client.get('/api/events/events/')['ETag']
+        response = self.measure('events-list-not-modified', 'get', '/api/events/events/', expected_status=304,
+                                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_retrieve_not_modified(self):
+        url = f'/api/events/events/{self.event.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.measure('events-retrieve-not-modified', 'get', url, expected_status=304, HTTP_IF_NONE_MATCH=etag)
+
+    def test_etag_changes_with_reminders(self):
+        url = f'/api/events/events/{self.event.pk}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        reminder = self.event.reminders.first()
+        self.client.patch(f'/api/events/reminders/{reminder.pk}/', {'message': "Nouveau message"}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        dispatch_due_reminders(LocalNotifier(), now=self.event.start_date)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_collections_ignore_if_modified_since(self):
+        soon = Event.objects.create(title="Bientôt", event_type=self.event_type, created_by=self.user,
+                                    start_date=timezone.now() + timedelta(minutes=5))
+        month = timezone.localtime(soon.start_date)
+        urls = ['/api/events/events/', '/api/events/events/upcoming/',
+                f'/api/events/events/by_month/?year={month.year}&month={month.month}']
+        self.assertTrue(all('Last-Modified' not in self.client.get(url) for url in urls))
+        since = self.client.get(f'/api/events/events/{soon.pk}/')['Last-Modified']
+
+        # La suppression fait reculer la date la plus récente : seul l'ETag reflète le changement
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/events/events/{soon.pk}/')
+        for url in urls:
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual((url, response.status_code), (url, 200))
+            self.assertNotIn(soon.pk, [item['id'] for item in response.data['results']])
+
+    def test_etag_changes_with_event_type(self):
+        urls = [f'/api/events/events/{self.event.pk}/', '/api/events/events/']
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        event_type = self.event.event_type
+        event_type.name = 'Cérémonie'
+        event_type.save()
+        responses = [self.client.get(url, HTTP_IF_NONE_MATCH=etag) for url, etag in zip(urls, etags)]
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual(responses[0].data['event_type_name'], 'Cérémonie')
+
+    def test_upcoming(self):
+        response = self.measure('events-upcoming', 'get', '/api/events/events/upcoming/?page_size=5')
+        # Les plus proches d'abord ; les pages suivantes continuent dans le même ordre
+        seen, data = [], response.data
+        while True:
+            seen.extend(item['id'] for item in data['results'])
+            if data['next'] is None:
+                break
+            data = self.client.get(data['next']).data
+        expected = (Event.objects.filter(created_by=self.user, start_date__gte=timezone.now())
+                    .order_by('start_date', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, list(expected))
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_by_month(self):
+        now = timezone.localtime()
+        self.measure('events-by-month', 'get', f'/api/events/events/by_month/?year={now.year}&month={now.month}')
+
+    def test_create(self):
+        self.measure('events-create', 'post', '/api/events/events/', {
+            'title': "Nouvel événement",
+            'event_type': self.event_type.pk,
+            'start_date': timezone.now().isoformat(),
+        }, expected_status=201)
+
+    def test_reminders_list(self):
+        response = self.measure('reminders-list', 'get', '/api/events/reminders/')
+        self.assertEqual(len(response.data), self.EVENT_COUNT * self.REMINDERS_PER_EVENT)
+
+    def test_reminders_create(self):
+        self.measure('reminders-create', 'post', '/api/events/reminders/', {
+            'event': self.event.pk,
+            'reminder_date': timezone.now().isoformat(),
+            'message': "Rappel",
+        }, expected_status=201)
+
+
+class EventCalendarQueryTests(TestCase):
+    """Requêtes calendrier : prédicat de chevauchement et utilisation des index composites"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agenda', email='agenda@example.com', password='secret')
+        cls.event_type = EventType.objects.create(name='Voyage')
+        cls.month_start, cls.month_end = month_bounds(2025, 6)
+
+    def create_event(self, title, start, end=None):
+        return Event.objects.create(title=title, event_type=self.event_type, start_date=start, end_date=end,
+                                    created_by=self.user)
+
+    def test_overlapping_includes_events_spanning_the_month(self):
+        day = timedelta(days=1)
+        spanning = self.create_event('Tour du monde', self.month_start - 10 * day, self.month_end + 10 * day)
+        inside = self.create_event('Dîner', self.month_start + 3 * day)
+        ending = self.create_event('Séminaire', self.month_start - 2 * day, self.month_start + day)
+        self.create_event('Avant', self.month_start - 5 * day, self.month_start - 4 * day)
+        self.create_event('Après', self.month_end)
+
+        events = Event.objects.owned_by(self.user).overlapping(self.month_start, self.month_end)
+        self.assertCountEqual(events, [spanning, inside, ending])
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertRegex(plan, r'event_owner_(start|end)_idx', plan)
+        self.assertNotRegex(plan, r'SCAN (TABLE )?events_event(?! USING)', plan)
+
+    def test_by_month_uses_owner_date_index(self):
+        queryset = Event.objects.owned_by(self.user).overlapping(self.month_start, self.month_end)
+        self.assertUsesIndex(queryset.order_by('-start_date', 'id'))
+
+    def test_upcoming_uses_owner_date_index(self):
+        queryset = Event.objects.owned_by(self.user).filter(start_date__gte=timezone.now())
+        self.assertUsesIndex(queryset.order_by('start_date', 'id'))
+
+
+class ReminderDispatchTests(TestCase):
+    """Envoi des rappels échus par lots"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='rappels', email='rappels@example.com', password='secret')
+        event = Event.objects.create(title='Anniversaire', event_type=EventType.objects.create(name='Anniversaire'),
+                                     start_date=timezone.now(), created_by=user)
+        now = timezone.now()
+        cls.due = Reminder.objects.bulk_create(
+            Reminder(event=event, reminder_date=now - timedelta(hours=index + 1)) for index in range(5)
+        )
+        cls.future = Reminder.objects.create(event=event, reminder_date=now + timedelta(days=1))
+        cls.already_sent = Reminder.objects.create(event=event, reminder_date=now - timedelta(days=1), sent=True)
+
+    def test_dispatch_sends_due_reminders_in_batches(self):
+        notifier = LocalNotifier()
+        self.assertEqual(dispatch_due_reminders(notifier, batch_size=3), 3)
+        self.assertEqual(dispatch_due_reminders(notifier, batch_size=3), 2)
+        self.assertEqual(dispatch_due_reminders(notifier, batch_size=3), 0)
+
+        self.assertCountEqual([reminder.pk for reminder in notifier.outbox], [reminder.pk for reminder in self.due])
+        self.assertFalse(Reminder.objects.filter(pk__in=[r.pk for r in self.due], sent=False).exists())
+        self.future.refresh_from_db()
+        self.assertFalse(self.future.sent)
+
+    def test_failed_batch_stays_pending(self):
+        class FailingNotifier(LocalNotifier):
+            def send(self, reminders):
+                raise ConnectionError
+
+        with self.assertRaises(ConnectionError):
+            dispatch_due_reminders(FailingNotifier())
+        self.assertEqual(Reminder.objects.filter(sent=False, reminder_date__lte=timezone.now()).count(), 5)
+
+    def test_command_drains_the_queue(self):
+        out = StringIO()
+        call_command('send_reminders', batch_size=2, stdout=out)
+        self.assertIn('5 rappel(s)', out.getvalue())
+
+
+class CalendarCacheTests(TestCase):
+    """Cache du calendrier mensuel et invalidation par signaux"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='calendrier', email='calendrier@example.com', password='secret')
+        cls.event_type = EventType.objects.create(name='Fête')
+        cls.june, _ = month_bounds(2025, 6)
+        cls.august, _ = month_bounds(2025, 8)
+        cls.event = Event.objects.create(title='Fête de la musique', event_type=cls.event_type,
+                                         start_date=cls.june + timedelta(days=20), created_by=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_month(self, month):
+        return self.client.get(f'/api/events/events/by_month/?year=2025&month={month}')
+
+    def test_second_read_is_served_from_cache(self):
+        self.assertEqual(self.get_month(6)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get_month(6)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['id'], self.event.pk)
+        self.assertEqual(calendar_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_cached_month_answers_conditional_requests(self):
+        etag = self.get_month(6)['ETag']
+        response = self.client.get('/api/events/events/by_month/?year=2025&month=6', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_saving_an_event_invalidates_only_its_months(self):
+        self.get_month(6)
+        self.get_month(8)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.start_date = self.august + timedelta(days=1)
+            self.event.save()
+        self.assertEqual(self.get_month(6)['X-Cache'], 'MISS')
+        self.assertEqual(self.get_month(8)['X-Cache'], 'MISS')
+        self.assertEqual(self.get_month(6).data['results'], [])
+
+        self.get_month(7)
+        with self.captureOnCommitCallbacks(execute=True):
+            Reminder.objects.create(event=self.event, reminder_date=self.august)
+        self.assertEqual(self.get_month(7)['X-Cache'], 'HIT')
+        self.assertEqual(self.get_month(8)['X-Cache'], 'MISS')
+
+    def test_renaming_the_event_type_invalidates_its_months(self):
+        self.get_month(6)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event_type.name = 'Festival'
+            self.event_type.save()
+        response = self.get_month(6)
+        self.assertEqual((response['X-Cache'], response.data['results'][0]['event_type_name']), ('MISS', 'Festival'))
+
+    def test_deleting_an_event_invalidates_its_months(self):
+        self.get_month(6)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.delete()
+        response = self.get_month(6)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+
+class EventSearchTests(TestCase):
+    """Paramètre search de la liste des événements"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='recherche', email='recherche@example.com', password='secret')
+        event_type = EventType.objects.create(name='Mariage')
+        now = timezone.now()
+        cls.in_title = Event.objects.create(title='Mariage de Paul et Awa', event_type=event_type, start_date=now,
+                                            created_by=cls.user)
+        cls.in_description = Event.objects.create(title='Réception', description='Soirée après le mariage',
+                                                  event_type=event_type, start_date=now + timedelta(days=1),
+                                                  created_by=cls.user)
+        Event.objects.create(title='Conférence', location='Yaoundé', event_type=event_type, start_date=now,
+                             created_by=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, terms, **params):
+        response = self.client.get('/api/events/events/', {'search': terms, **params})
+        return [item['id'] for item in response.data['results']]
+
+    def test_search_matches_every_term(self):
+        self.assertCountEqual(self.search('mariage'), [self.in_title.pk, self.in_description.pk])
+        self.assertEqual(self.search('mariage awa'), [self.in_title.pk])
+        self.assertEqual(self.search('anniversaire'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Recherche plein texte PostgreSQL')
+    def test_full_text_search_is_stemmed_and_ranked(self):
+        # « mariages » est ramené à la même racine ; le titre pèse plus que la description
+        self.assertEqual(self.search('mariages'), [self.in_title.pk, self.in_description.pk])
+        self.assertEqual(self.search('mariages', ordering='-start_date'), [self.in_description.pk, self.in_title.pk])
+
+        response = self.client.get('/api/events/events/', {'search': 'mariages', 'page_size': 1})
+        second_page = self.client.get(response.data['next']).data['results']
+        self.assertEqual([item['id'] for item in second_page], [self.in_description.pk])
+
+
+class ICalendarTests(TestCase):
+    """Export en flux et import des calendriers iCalendar"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='ical', email='ical@example.com', password='secret')
+        cls.event_type = EventType.objects.create(name='Réunion')
+        start = timezone.now().replace(microsecond=0)
+        cls.event = Event.objects.create(title='Réunion, budget; suite', description='Ligne 1\nLigne 2',
+                                         location='Douala', event_type=cls.event_type, start_date=start,
+                                         end_date=start + timedelta(hours=2), created_by=cls.user)
+        Reminder.objects.create(event=cls.event, reminder_date=start - timedelta(days=1), message='Veille')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_feed_streams_events_with_alarms(self):
+        response = self.client.get('/api/events/events/feed.ics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('SUMMARY:Réunion\\, budget\\; suite\r\n', content)
+        self.assertIn('CATEGORIES:Réunion\r\n', content)
+        self.assertEqual(content.count('BEGIN:VALARM'), 1)
+        self.assertTrue(content.endswith('END:VCALENDAR\r\n'))
+
+    def test_import_round_trips_the_feed(self):
+        content = b''.join(self.client.get('/api/events/events/feed.ics').streaming_content)
+        upload = SimpleUploadedFile('agenda.ics', content, content_type='text/calendar')
+        response = self.client.post('/api/events/events/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data, {'events': 1, 'reminders': 1})
+
+        imported = Event.objects.exclude(pk=self.event.pk).get()
+        self.assertEqual((imported.title, imported.description, imported.location),
+                         (self.event.title, self.event.description, self.event.location))
+        self.assertEqual((imported.start_date, imported.end_date), (self.event.start_date, self.event.end_date))
+        self.assertEqual(imported.event_type, self.event_type)
+        self.assertEqual(imported.reminders.get().reminder_date, self.event.reminders.get().reminder_date)
+
+    def test_import_maps_categories_and_relative_alarms(self):
+        content = (
+            'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\nSUMMARY:Match de football au stade de la R\r\n'
+            ' éunification\r\nDTSTART;TZID=Africa/Douala:20250614T150000\r\nDURATION:PT2H\r\n'
+            'CATEGORIES:Sport\r\nBEGIN:VALARM\r\nTRIGGER:-PT30M\r\nACTION:DISPLAY\r\nEND:VALARM\r\n'
+            'END:VEVENT\r\nEND:VCALENDAR\r\n'
+        ).encode('utf-8')
+        sport = EventType.objects.create(name='sport')
+        upload = SimpleUploadedFile('sport.ics', content, content_type='text/calendar')
+        self.client.post('/api/events/events/import/', {'file': upload}, format='multipart')
+
+        event = Event.objects.get(event_type=sport)
+        self.assertEqual(event.title, 'Match de football au stade de la Réunification')
+        self.assertEqual(event.end_date - event.start_date, timedelta(hours=2))
+        self.assertEqual(event.start_date - event.reminders.get().reminder_date, timedelta(minutes=30))
+
+    def test_unknown_categories_use_the_default_type(self):
+        content = (
+            'BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nSUMMARY:Atelier\r\nDTSTART:20250614T150000Z\r\n'
+            'CATEGORIES:Poterie,Loisirs\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n'
+        ).encode('utf-8')
+        for name in ('a.ics', 'b.ics'):
+            upload = SimpleUploadedFile(name, content, content_type='text/calendar')
+            self.client.post('/api/events/events/import/', {'file': upload}, format='multipart')
+        self.assertEqual(set(Event.objects.filter(title='Atelier').values_list('event_type__name', flat=True)), {'Autre'})
+        self.assertEqual(EventType.objects.count(), 2)
+
+    def test_invalid_calendar_is_rejected_atomically(self):
+        content = b'BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nSUMMARY:Sans date\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n'
+        upload = SimpleUploadedFile('invalide.ics', content, content_type='text/calendar')
+        response = self.client.post('/api/events/events/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_out_of_range_dates_are_rejected(self):
+        events = [
+            'DTSTART:20250614T150000Z\r\nBEGIN:VALARM\r\nTRIGGER:-P99999999999D\r\nEND:VALARM\r\n',
+            'DTSTART:00010101T000000Z\r\nBEGIN:VALARM\r\nTRIGGER:-PT30M\r\nEND:VALARM\r\n',
+            'DTSTART:99991231T230000Z\r\nDURATION:P2D\r\n',
+            'DTSTART;TZID=Asia/Tokyo:00010101T000000\r\n',
+        ]
+        for lines in events:
+            content = f'BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nSUMMARY:Hors limites\r\n{lines}END:VEVENT\r\nEND:VCALENDAR\r\n'
+            upload = SimpleUploadedFile('limites.ics', content.encode('utf-8'), content_type='text/calendar')
+            response = self.client.post('/api/events/events/import/', {'file': upload}, format='multipart')
+            self.assertEqual((lines, response.status_code), (lines, 400))
+        self.assertEqual(Event.objects.count(), 1)
+
+
+class EventSummaryTests(EndpointBudgetMixin, TestCase):
+    """Tableau de bord d'un événement en une requête"""
+    budgets = ENDPOINT_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        from apps.gifts.models import Gift, GiftList
+        from apps.guests.models import Guest
+        from apps.photos.models import Album, Photo
+        from apps.planning.models import Task
+
+        cls.user = User.objects.create_user(username='tableau', email='tableau@example.com', password='secret')
+        cls.event = Event.objects.create(title='Mariage', event_type=EventType.objects.create(name='Mariage'),
+                                         start_date=timezone.now(), created_by=cls.user)
+        Guest.objects.bulk_create([
+            Guest(event=cls.event, name='Awa', response_status='accepted', plus_ones=2),
+            Guest(event=cls.event, name='Paul', response_status='accepted', plus_ones=1),
+            Guest(event=cls.event, name='Jean', response_status='declined', plus_ones=1),
+            Guest(event=cls.event, name='Marie'),
+        ])
+        yesterday = timezone.now() - timedelta(days=1)
+        Task.objects.bulk_create([
+            Task(event=cls.event, title='Traiteur', status='completed', due_date=yesterday, created_by=cls.user),
+            Task(event=cls.event, title='Fleurs', status='in_progress', due_date=yesterday, created_by=cls.user),
+            Task(event=cls.event, title='Musique', created_by=cls.user),
+        ])
+        gift_list = GiftList.objects.create(name='Liste', event=cls.event)
+        Gift.objects.bulk_create([
+            Gift(list=gift_list, name='Service', price='120.50', status='reserved'),
+            Gift(list=gift_list, name='Cafetière', price='80.00', status='reserved'),
+            Gift(list=gift_list, name='Lampe', price='40.00', status='purchased'),
+            Gift(list=gift_list, name='Tapis'),
+        ])
+        album = Album.objects.create(name='Cérémonie', event=cls.event, created_by=cls.user)
+        Album.objects.create(name='Soirée', event=cls.event, created_by=cls.user)
+        Photo.objects.bulk_create([
+            Photo(album=album, image=f'event_photos/{index}.jpg', uploaded_by=cls.user) for index in range(3)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_summary(self):
+        response = self.measure('events-summary', 'get', f'/api/events/events/{self.event.pk}/summary/')
+        self.assertEqual(response.data['guests'], {
+            'total': 4, 'pending': 1, 'accepted': 2, 'declined': 1, 'plus_ones': 4, 'headcount': 5,
+        })
+        self.assertEqual(response.data['tasks'], {
+            'total': 3, 'not_started': 1, 'in_progress': 1, 'completed': 1, 'overdue': 1,
+        })
+        self.assertEqual(response.data['gifts'], {
+            'total': 4, 'available': 1, 'reserved': 2, 'purchased': 1, 'reserved_value': '200.50',
+        })
+        self.assertEqual(response.data['photos'], {'albums': 2, 'photos': 3})
 
-# Create your tests here.
+    def test_summary_of_another_users_event_is_not_found(self):
+        other = User.objects.create_user(username='curieux', email='curieux@example.com', password='secret')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/events/events/{self.event.pk}/summary/').status_code, 404)
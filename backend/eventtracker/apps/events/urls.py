@@ -8,5 +8,9 @@ router.register(r'events', views.EventViewSet, basename='event')
 router.register(r'reminders', views.ReminderViewSet, basename='reminder')
 
 urlpatterns = [
+    # Flux iCalendar sans barre finale, comme l'attendent les applications de calendrier
+    path('events/feed.ics', views.EventViewSet.as_view(
+        {'get': 'feed'}, basename='event', detail=False, **views.EventViewSet.feed.kwargs
+    ), name='event-feed-ics'),
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
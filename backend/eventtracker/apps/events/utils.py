@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from django.utils import timezone
+
+
+def month_bounds(year, month):
+    """Début et fin (exclue) d'un mois dans le fuseau horaire courant"""
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1))
+    return start, end
+
+
+def months_between(start, end=None):
+    """Mois (année, mois) couverts par la période [start, end] dans le fuseau horaire courant"""
+    first = timezone.localtime(start)
+    last = timezone.localtime(end) if end and end > start else first
+    year, month = first.year, first.month
+    months = []
+    while (year, month) <= (last.year, last.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
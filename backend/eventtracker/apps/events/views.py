@@ -1,10 +1,22 @@
-from rest_framework import viewsets, permissions, filters
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import EventType, Event, Reminder
 from .serializers import EventTypeSerializer, EventSerializer, EventDetailSerializer, ReminderSerializer
 from .permissions import IsEventOwner
+from .pagination import EventCursorPagination, UpcomingEventPagination
+from .conditional import ConditionalGetMixin
+from .filters import EventSearchFilter
+from .utils import month_bounds
+from .cache import get_month_page, set_month_page
+from . import ical
+from .renderers import ICalendarRenderer
+from .summary import event_summary
 
 class EventTypeViewSet(viewsets.ReadOnlyModelViewSet):
     """Vue pour les types d'événements"""
@@ -12,19 +24,37 @@ class EventTypeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = EventTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
     
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Vue pour les événements"""
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated, IsEventOwner]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = EventCursorPagination
+    # La recherche vient après le tri par défaut pour pouvoir classer par pertinence
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, EventSearchFilter]
     filterset_fields = ['event_type', 'start_date', 'is_private']
     search_fields = ['title', 'description', 'location']
     ordering_fields = ['start_date', 'created_at']
     ordering = ['-start_date']
     
     def get_queryset(self):
-        """Retourne les événements de l'utilisateur connecté"""
-        return Event.objects.filter(created_by=self.request.user)
+        """Retourne les événements de l'utilisateur connecté, préchargés selon l'action"""
+        queryset = Event.objects.owned_by(self.request.user)
+        if self.action == 'retrieve':
+            return queryset.for_detail()
+        if self.action in ('list', 'upcoming', 'by_month', 'feed'):
+            return queryset.for_list()
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        fingerprint = self.filter_queryset(self.get_queryset()).fingerprint()
+        return self.not_modified(request, fingerprint) or super().list(request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            fingerprint = self.get_queryset().filter(pk=kwargs['pk']).detail_fingerprint()
+        except (TypeError, ValueError):
+            fingerprint = None
+        return self.not_modified(request, fingerprint) or super().retrieve(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         """Associe l'utilisateur connecté à l'événement lors de la création"""
@@ -36,36 +66,80 @@ class EventViewSet(viewsets.ModelViewSet):
             return EventDetailSerializer
         return self.serializer_class
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=UpcomingEventPagination)
     def upcoming(self, request):
-        """Endpoint pour récupérer les événements à venir"""
-        from django.utils import timezone
+        """Endpoint pour récupérer les événements à venir, les plus proches en premier"""
         events = self.get_queryset().filter(start_date__gte=timezone.now())
-        serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        not_modified = self.not_modified(request, events.fingerprint())
+        if not_modified:
+            return not_modified
+        page = self.paginate_queryset(events)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def by_month(self, request):
         """Endpoint pour récupérer les événements d'un mois spécifique"""
-        year = int(request.query_params.get('year', timezone.now().year))
-        month = int(request.query_params.get('month', timezone.now().month))
-        
-        from django.db.models import Q
-        from datetime import datetime
-        
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime(year, month + 1, 1)
+        now = timezone.localtime()
+        try:
+            year = int(request.query_params.get('year', now.year))
+            month = int(request.query_params.get('month', now.month))
+            start_date, end_date = month_bounds(year, month)
+        except ValueError:
+            raise ValidationError({'month': "Année ou mois invalide."})
         
-        events = self.get_queryset().filter(
-            Q(start_date__gte=start_date, start_date__lt=end_date) |
-            Q(end_date__gte=start_date, end_date__lt=end_date)
+        # Les pages du mois sont servies depuis le cache tant qu'aucun événement du mois ne change
+        cache_key, entry = get_month_page(
+            request.user.pk, year, month, f'{request.build_absolute_uri()}|{request.accepted_media_type}'
         )
+        if entry is not None:
+            validators, data = entry
+            response = self.check_validators(request, validators) or Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
         
-        serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        # Un seul prédicat de chevauchement, servi par les index (created_by, start_date/end_date)
+        events = self.get_queryset().overlapping(start_date, end_date)
+        validators = self.get_validators(request, events.fingerprint())
+        response = self.check_validators(request, validators)
+        if response is None:
+            page = self.paginate_queryset(events)
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            set_month_page(cache_key, (validators, response.data))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Tableau de bord de l'événement : invités, tâches, cadeaux et photos en une requête"""
+        try:
+            summary = event_summary(self.get_queryset().filter(pk=pk))
+        except (TypeError, ValueError):
+            summary = None
+        if summary is None:
+            raise NotFound()
+        return Response(summary)
+    
+    @action(detail=False, methods=['get'], url_path='feed.ics', renderer_classes=[ICalendarRenderer])
+    def feed(self, request):
+        """Flux iCalendar des événements et de leurs rappels (VALARM), envoyé au fil de la lecture"""
+        events = self.get_queryset().order_by('start_date', 'id').iterator(chunk_size=500)
+        response = StreamingHttpResponse(ical.iter_calendar(events), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="evenements.ics"'
+        return response
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_calendar(self, request):
+        """Importe un fichier .ics (champ « file ») : événements et rappels, typés par catégorie"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': "Un fichier .ics est requis."})
+        try:
+            counts = ical.import_calendar(request.user, upload)
+        except ical.ICalendarError as error:
+            raise ValidationError({'file': str(error)})
+        return Response(counts, status=status.HTTP_201_CREATED)
 
 class ReminderViewSet(viewsets.ModelViewSet):
     """Vue pour les rappels"""
@@ -85,4 +159,14 @@ class ReminderViewSet(viewsets.ModelViewSet):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Vous n'êtes pas autorisé à ajouter un rappel à cet événement.")
             
-        serializer.save()
\ No newline at end of file
+        serializer.save(event=event)
+        Event.objects.filter(pk=event.pk).touch()
+    
+    def perform_update(self, serializer):
+        """Les rappels font partie de la représentation de l'événement (ETag, Last-Modified)"""
+        reminder = serializer.save()
+        Event.objects.filter(pk=reminder.event_id).touch()
+    
+    def perform_destroy(self, instance):
+        instance.delete()
+        Event.objects.filter(pk=instance.event_id).touch()
\ No newline at end of file
@@ -0,0 +1,15 @@
+import django_filters
+
+from .models import Guest
+
+
+class GuestFilter(django_filters.FilterSet):
+    """Filtres de la liste des invités ; ``name`` est un préfixe (sans casse)"""
+    # Filtres par identifiant : pas de requête de validation, le queryset est déjà limité à l'utilisateur
+    event = django_filters.NumberFilter()
+    group = django_filters.NumberFilter()
+    name = django_filters.CharFilter(lookup_expr='istartswith')
+
+    class Meta:
+        model = Guest
+        fields = ['event', 'group', 'response_status', 'name']
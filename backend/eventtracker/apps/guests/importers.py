@@ -0,0 +1,184 @@
+import csv
+import io
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from apps.users.models import User
+from .models import Guest, GuestGroup
+
+try:
+    import openpyxl
+except ImportError:  # XLSX facultatif : seul le CSV est alors accepté
+    openpyxl = None
+
+# En-têtes acceptées (sans accents ni casse) pour chaque champ de Guest
+COLUMNS = {
+    'name': 'name', 'nom': 'name', 'nom complet': 'name',
+    'email': 'email', 'e-mail': 'email', 'courriel': 'email', 'mail': 'email',
+    'phone': 'phone', 'telephone': 'phone', 'tel': 'phone', 'portable': 'phone',
+    'group': 'group', 'groupe': 'group',
+    'plus_ones': 'plus_ones', 'plus ones': 'plus_ones', 'accompagnants': 'plus_ones',
+    'note': 'note', 'notes': 'note', 'remarque': 'note',
+}
+
+
+class GuestImportError(ValueError):
+    pass
+
+
+def _normalize_header(header):
+    header = unicodedata.normalize('NFKD', str(header or '')).encode('ascii', 'ignore').decode('ascii')
+    return COLUMNS.get(header.strip().lower())
+
+
+def _records(header, rows):
+    fields = [_normalize_header(column) for column in header]
+    if 'name' not in fields:
+        raise GuestImportError("La colonne « nom » (ou « name ») est obligatoire.")
+    for line, row in rows:
+        record = {}
+        for field, value in zip(fields, row):
+            if field and value is not None:
+                record[field] = str(value).strip()
+        if any(record.values()):
+            yield line, record
+
+
+def iter_csv(upload):
+    """Lignes d'un CSV (séparateur , ou ; détecté), lues au fil du fichier"""
+    text = io.TextIOWrapper(upload, encoding='utf-8-sig', errors='replace', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(text, dialect)
+    header = next(reader, None)
+    if header is None:
+        raise GuestImportError("Le fichier est vide.")
+    yield from _records(header, ((reader.line_num, row) for row in reader))
+
+
+def iter_xlsx(upload):
+    """Lignes de la première feuille d'un classeur XLSX, en mode lecture seule (flux)"""
+    if openpyxl is None:
+        raise GuestImportError("L'import XLSX nécessite openpyxl ; utilisez un fichier CSV.")
+    try:
+        workbook = openpyxl.load_workbook(upload, read_only=True, data_only=True)
+    except Exception:
+        raise GuestImportError("Classeur XLSX illisible.")
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise GuestImportError("Le fichier est vide.")
+        yield from _records(header, enumerate(rows, start=2))
+    finally:
+        workbook.close()
+
+
+def iter_upload(upload):
+    if upload.name.lower().endswith('.xlsx'):
+        return iter_xlsx(upload)
+    return iter_csv(upload)
+
+
+def _clean(record):
+    """Valide une ligne ; retourne les champs de Guest ou lève ValidationError"""
+    name = record.get('name', '')
+    if not name:
+        raise ValidationError("Nom manquant.")
+    email = record.get('email', '').lower()
+    if email:
+        validate_email(email)
+    phone = ''.join(char for char in record.get('phone', '') if char.isdigit() or char == '+')
+    if len(phone) > 15:
+        raise ValidationError("Numéro de téléphone trop long.")
+    # Decimal plutôt que float : « inf » ou « 1e400 » restent des valeurs comparables, refusées par la borne
+    try:
+        plus_ones = Decimal(str(record.get('plus_ones') or 0))
+    except InvalidOperation:
+        plus_ones = None
+    if plus_ones is None or not plus_ones.is_finite() or not 0 <= plus_ones <= Guest.MAX_PLUS_ONES:
+        raise ValidationError(f"Nombre d'accompagnants invalide (0 à {Guest.MAX_PLUS_ONES}).")
+    plus_ones = int(plus_ones)
+    return {
+        'name': name[:255], 'email': email, 'phone': phone, 'plus_ones': plus_ones,
+        'note': record.get('note', ''), 'group': record.get('group', '')[:100],
+    }
+
+
+def import_guests(event, records, chunk_size=500):
+    """Crée les invités par lots de ``chunk_size``, dans une seule transaction.
+
+    Les doublons (même email, ou même téléphone sans email) sont ignorés, qu'ils existent
+    déjà pour l'événement ou apparaissent plusieurs fois dans le fichier. Les groupes sont
+    créés au besoin et les comptes User sont rattachés par email (une requête par lot).
+    """
+    summary = {'created': 0, 'duplicates': 0, 'groups_created': 0, 'errors': []}
+    groups = {group.name.lower(): group for group in GuestGroup.objects.filter(event=event)}
+    seen_emails, seen_phones = set(), set()
+
+    with transaction.atomic():
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            rows = []
+            for line, record in chunk:
+                try:
+                    rows.append(_clean(record))
+                except ValidationError as error:
+                    summary['errors'].append({'line': line, 'error': ' '.join(error.messages)})
+
+            emails = {row['email'] for row in rows if row['email']}
+            phones = {row['phone'] for row in rows if row['phone'] and not row['email']}
+            existing = Guest.objects.filter(event=event).annotate(email_lower=Lower('email')).filter(
+                Q(email_lower__in=emails) | Q(email='', phone__in=phones)
+            ).values_list('email_lower', 'phone')
+            for email, phone in existing:
+                if email:
+                    seen_emails.add(email)
+                else:
+                    seen_phones.add(phone)
+            users = {user.email_lower: user
+                     for user in User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)}
+
+            missing_groups = {row['group'] for row in rows if row['group'] and row['group'].lower() not in groups}
+            missing_groups = {name.lower(): name for name in missing_groups}.values()
+            if missing_groups:
+                for group in GuestGroup.objects.bulk_create([GuestGroup(event=event, name=name) for name in missing_groups]):
+                    groups[group.name.lower()] = group
+                summary['groups_created'] += len(missing_groups)
+
+            guests = []
+            for row in rows:
+                key_set, key = (seen_emails, row['email']) if row['email'] else (seen_phones, row['phone'])
+                if key and key in key_set:
+                    summary['duplicates'] += 1
+                    continue
+                if key:
+                    key_set.add(key)
+                guests.append(Guest(
+                    event=event,
+                    group=groups.get(row['group'].lower()) if row['group'] else None,
+                    user=users.get(row['email']),
+                    name=row['name'],
+                    email=row['email'],
+                    phone=row['phone'],
+                    plus_ones=row['plus_ones'],
+                    note=row['note'],
+                ))
+            Guest.objects.bulk_create(guests)
+            summary['created'] += len(guests)
+    return summary
@@ -0,0 +1,235 @@
+import atexit
+import secrets
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import Case, DateTimeField, Exists, OuterRef, Value, When
+from django.utils import timezone
+
+from .models import Guest, Invitation
+
+# Les liens d'invitation sont ouverts en rafale par des visiteurs anonymes : la page est servie
+# depuis le cache et la première consultation (viewed_at) est gardée en mémoire puis écrite par
+# lots, en un seul UPDATE, au lieu d'une écriture par visite.
+# Chaque page en cache porte les versions de son événement et de son invité, changées à la
+# validation de toute modification : une page dont une version a changé est relue en base.
+INVITATION_TIMEOUT = 5 * 60
+MISSING_TIMEOUT = 60
+FLUSH_SIZE = 200
+FLUSH_INTERVAL = 10
+MISSING = 'missing'
+CODE_BYTES = 12  # 16 caractères URL-safe, 96 bits d'aléa
+
+
+def _key(code):
+    return f'invitation:{code}'
+
+
+def _version_keys(event_id, guest_id):
+    return [f'invitation:event:{event_id}:version', f'invitation:guest:{guest_id}:version']
+
+
+def _versions(event_id, guest_id):
+    keys = _version_keys(event_id, guest_id)
+    versions = cache.get_many(keys)
+    return [versions.get(key, 0) for key in keys]
+
+
+def touch_invitations(event_ids=(), guest_ids=()):
+    """Périme, à la validation de la transaction, les pages des événements et invités modifiés"""
+    keys = [f'invitation:event:{pk}:version' for pk in event_ids]
+    keys += [f'invitation:guest:{pk}:version' for pk in guest_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), INVITATION_TIMEOUT))
+
+
+def _payload(invitation):
+    guest, event = invitation.guest, invitation.guest.event
+    return {
+        'id': invitation.pk,
+        'code': invitation.unique_code,
+        'message': invitation.message,
+        'viewed_at': invitation.viewed_at,
+        'guest': {
+            'id': guest.pk,
+            'name': guest.name,
+            'response_status': guest.response_status,
+            'plus_ones': guest.plus_ones,
+            'responded_at': guest.responded_at,
+        },
+        'event': {
+            'title': event.title,
+            'type': event.event_type.name,
+            'description': event.description,
+            'location': event.location,
+            'start_date': event.start_date,
+            'end_date': event.end_date,
+        },
+    }
+
+
+def get_invitation(code):
+    """Invitation, invité et événement d'un code, lus dans le cache (ou None si le code est inconnu)"""
+    entry = cache.get(_key(code))
+    if entry == MISSING:
+        return None
+    if entry is not None and entry['versions'] == _versions(*entry['ids']):
+        return entry['payload']
+    started = time.time_ns()
+    invitation = (Invitation.objects.select_related('guest__event__event_type').only(
+        'unique_code', 'message', 'viewed_at',
+        'guest__name', 'guest__response_status', 'guest__plus_ones', 'guest__responded_at',
+        'guest__event__title', 'guest__event__description', 'guest__event__location',
+        'guest__event__start_date', 'guest__event__end_date', 'guest__event__event_type__name',
+    ).filter(unique_code=code).first())
+    if invitation is None:
+        # Les codes inconnus sont aussi mis en cache pour ne pas solliciter la base à chaque essai
+        cache.set(_key(code), MISSING, MISSING_TIMEOUT)
+        return None
+    entry = {'payload': _payload(invitation), 'ids': (invitation.guest.event_id, invitation.guest_id)}
+    entry['versions'] = _versions(*entry['ids'])
+    # Une modification validée pendant la lecture (réponse RSVP concurrente) a pu être manquée :
+    # la page n'est alors pas mise en cache
+    if max(entry['versions']) < started:
+        cache.set(_key(code), entry, INVITATION_TIMEOUT)
+    return entry['payload']
+
+
+class ViewBuffer:
+    """Premières consultations en attente d'écriture, regroupées par processus"""
+
+    def __init__(self, size=FLUSH_SIZE, interval=FLUSH_INTERVAL):
+        self.size = size
+        self.interval = interval
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def record(self, invitation_id, viewed_at):
+        with self.lock:
+            self.pending.setdefault(invitation_id, viewed_at)
+            full = len(self.pending) >= self.size
+            if not full and self.timer is None:
+                # Un lot incomplet est tout de même écrit au bout de ``interval`` secondes
+                self.timer = threading.Timer(self.interval, self._flush_in_background)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            self.flush()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """Écrit les consultations en attente en un seul UPDATE ; retourne le nombre de lignes modifiées"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            if self.timer is not None and self.timer is not threading.current_thread():
+                self.timer.cancel()
+            self.timer = None
+        if not pending:
+            return 0
+        # Seule la première consultation compte : une date déjà enregistrée n'est pas écrasée
+        try:
+            return Invitation.objects.filter(pk__in=pending, viewed_at__isnull=True).update(viewed_at=Case(
+                *[When(pk=pk, then=Value(viewed_at)) for pk, viewed_at in pending.items()],
+                output_field=DateTimeField(),
+            ))
+        except DatabaseError:
+            # Le lot est remis en attente pour la prochaine écriture
+            with self.lock:
+                for pk, viewed_at in pending.items():
+                    self.pending.setdefault(pk, viewed_at)
+            raise
+
+
+view_buffer = ViewBuffer()
+atexit.register(view_buffer.flush)
+
+
+def record_view(code, payload):
+    """Note la première consultation d'une invitation sans écrire en base à chaque visite"""
+    if payload['viewed_at'] is not None:
+        return
+    payload['viewed_at'] = timezone.now()
+    # Les visites suivantes lisent la date dans le cache et ne repassent pas par le tampon
+    entry = cache.get(_key(code))
+    if isinstance(entry, dict) and entry['payload']['id'] == payload['id']:
+        entry['payload']['viewed_at'] = payload['viewed_at']
+        cache.set(_key(code), entry, INVITATION_TIMEOUT)
+    view_buffer.record(payload['id'], payload['viewed_at'])
+
+
+def respond(code, payload, response_status, plus_ones=None):
+    """Enregistre la réponse de l'invité par GuestQuerySet.update, qui tient aussi à jour les
+    compteurs de réponses et périme la page en cache (quelques requêtes, indépendantes du volume)"""
+    changes = {'response_status': response_status, 'responded_at': timezone.now()}
+    if plus_ones is not None:
+        changes['plus_ones'] = plus_ones
+    Guest.objects.filter(pk=payload['guest']['id']).update(**changes)
+    return changes
+
+
+def generate_code():
+    return secrets.token_urlsafe(CODE_BYTES)
+
+
+def unique_codes(count):
+    """``count`` codes absents de la base, vérifiés en une requête par tirage"""
+    codes, collisions = set(), 0
+    while len(codes) < count:
+        candidates = {generate_code() for _ in range(count - len(codes))} - codes
+        taken = set(Invitation.objects.filter(unique_code__in=candidates).values_list('unique_code', flat=True))
+        collisions += len(taken)
+        codes |= candidates - taken
+    return list(codes), collisions
+
+
+def issue_invitations(event, group=None, message='', chunk_size=1000):
+    """Crée une invitation pour chaque invité de l'événement (ou du groupe) qui n'en a pas encore.
+
+    Les invités sont parcourus par lots de ``chunk_size`` dans l'ordre des clés ; chaque lot reçoit
+    des codes dont l'unicité est vérifiée d'avance, puis un seul bulk_create. La contrainte d'unicité
+    sur l'invité écarte les invitations déjà créées par une génération concurrente. Retourne le bilan.
+    """
+    guests = Guest.objects.filter(event=event)
+    if group is not None:
+        guests = guests.filter(group=group)
+    invited = Exists(Invitation.objects.filter(guest=OuterRef('pk')))
+    summary = {'created': 0, 'already_invited': guests.filter(invited).count(), 'collisions': 0}
+    pending = guests.filter(~invited).order_by('pk').values_list('pk', flat=True)
+
+    last = 0
+    while True:
+        guest_ids = list(pending.filter(pk__gt=last)[:chunk_size])
+        if not guest_ids:
+            break
+        last = guest_ids[-1]
+        for attempt in range(3):
+            codes, collisions = unique_codes(len(guest_ids))
+            summary['collisions'] += collisions
+            # Conflits ignorés : invité déjà invité par un autre processus, ou code pris entre la
+            # vérification et l'insertion
+            Invitation.objects.bulk_create([
+                Invitation(guest_id=guest_id, message=message, unique_code=code)
+                for guest_id, code in zip(guest_ids, codes)
+            ], ignore_conflicts=True)
+            created = set(Invitation.objects.filter(unique_code__in=codes)
+                          .values_list('guest_id', flat=True))
+            summary['created'] += len(created)
+            guest_ids = [guest_id for guest_id in guest_ids if guest_id not in created]
+            if not guest_ids:
+                break
+            invited_meanwhile = set(Invitation.objects.filter(guest_id__in=guest_ids).values_list('guest_id', flat=True))
+            summary['already_invited'] += len(invited_meanwhile)
+            guest_ids = [guest_id for guest_id in guest_ids if guest_id not in invited_meanwhile]
+            if not guest_ids:
+                break
+            if attempt == 2:
+                raise IntegrityError("Codes d'invitation en collision après trois tirages")
+    return summary
@@ -0,0 +1,296 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import formats, timezone
+
+from .models import Invitation
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {'WORKERS': 4, 'RATE': 0, 'RETRIES': 3, 'BACKOFF': 1.0, 'BATCH_SIZE': 500, 'BACKGROUND': True,
+            'TIMEOUT': 120, 'CLAIM_EXPIRY': 3600}
+
+
+def mailer_setting(name):
+    return {**DEFAULTS, **getattr(settings, 'INVITATION_MAILER', {})}[name]
+
+
+def render_invitation(invitation):
+    """Message d'une invitation : texte de l'organisateur (ou texte par défaut) et lien de réponse"""
+    guest, event = invitation.guest, invitation.guest.event
+    link = settings.INVITATION_LINK.format(code=invitation.unique_code)
+    when = formats.date_format(timezone.localtime(event.start_date), 'DATETIME_FORMAT')
+    intro = invitation.message or (
+        f"Vous êtes invité(e) à « {event.title} » le {when}" + (f" ({event.location})" if event.location else '') + '.'
+    )
+    body = f"Bonjour {guest.name},\n\n{intro}\n\nMerci de répondre à l'invitation :\n{link}\n"
+    # Un titre importé (.ics) peut contenir des retours à la ligne, interdits dans un en-tête
+    subject = ' '.join(f"Invitation : {event.title}".split())
+    return EmailMessage(subject=subject, body=body, to=[guest.email])
+
+
+class Throttle:
+    """Limite le débit global (messages par seconde) partagé par tous les workers"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Résultats de SMTPPool.send() pour les messages sans issue connue au délai d'attente
+NOT_ATTEMPTED = "Envoi abandonné avant la première tentative."
+NO_RESPONSE = "Pas de réponse du worker d'envoi."
+
+
+class _Batch:
+    """Messages d'un appel à send() : file de résultats et annulation, partagées avec les workers"""
+
+    def __init__(self):
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.cancelled = False
+        self.started = set()
+
+    def start(self, invitation):
+        """Marque le message comme commencé ; False si l'appel a été abandonné entre-temps"""
+        with self.lock:
+            if not self.cancelled:
+                self.started.add(id(invitation))
+            return not self.cancelled
+
+    def cancel(self):
+        """Abandonne les messages pas encore commencés ; retourne ceux qui l'ont été"""
+        with self.lock:
+            self.cancelled = True
+            return set(self.started)
+
+
+class SMTPPool:
+    """Workers d'envoi, chacun avec sa connexion SMTP gardée ouverte d'un lot à l'autre.
+
+    Les workers n'accèdent pas à la base : ils reçoivent des messages déjà rendus et
+    renvoient (invitation, erreur, tentatives) au thread appelant, qui enregistre l'état.
+    """
+
+    def __init__(self, workers=None, rate=None, retries=None, backoff=None, connection_factory=None, timeout=None):
+        self.retries = mailer_setting('RETRIES') if retries is None else retries
+        self.backoff = mailer_setting('BACKOFF') if backoff is None else backoff
+        self.throttle = Throttle(mailer_setting('RATE') if rate is None else rate)
+        self.timeout = mailer_setting('TIMEOUT') if timeout is None else timeout
+        self.connection_factory = connection_factory or get_connection
+        self.tasks = queue.Queue()
+        self.threads = [
+            threading.Thread(target=self._work, daemon=True)
+            for _ in range(mailer_setting('WORKERS') if workers is None else workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def send(self, items):
+        """Envoie [(invitation, message)] et attend les résultats [(invitation, erreur, tentatives)].
+
+        Sans nouveau résultat pendant ``timeout`` secondes (worker bloqué), l'appel est abandonné :
+        les workers ne commencent plus ses messages restants, rendus avec l'erreur NOT_ATTEMPTED,
+        et ceux déjà commencés, à l'issue inconnue, avec NO_RESPONSE. Un résultat tardif est ignoré.
+        """
+        batch = _Batch()
+        for invitation, message in items:
+            self.tasks.put((invitation, message, batch))
+        received = {}
+        while len(received) < len(items):
+            try:
+                invitation, error, attempts = batch.results.get(timeout=self.timeout)
+            except queue.Empty:
+                break
+            received[id(invitation)] = (invitation, error, attempts)
+        if len(received) < len(items):
+            started = batch.cancel()
+            # Un résultat arrivé entre le délai et l'annulation reste valable
+            while not batch.results.empty():
+                invitation, error, attempts = batch.results.get()
+                received[id(invitation)] = (invitation, error, attempts)
+        else:
+            started = set()
+        return [
+            received.get(id(invitation)) or (
+                (invitation, NO_RESPONSE, 0) if id(invitation) in started else (invitation, NOT_ATTEMPTED, 0)
+            )
+            for invitation, _ in items
+        ]
+
+    def close(self):
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _work(self):
+        connection = None
+        try:
+            while True:
+                item = self.tasks.get()
+                if item is None:
+                    return
+                invitation, message, batch = item
+                if not batch.start(invitation):
+                    # Appel abandonné au délai d'attente : le message ne part pas
+                    continue
+                error, attempts = None, 0
+                while True:
+                    attempts += 1
+                    self.throttle.wait()
+                    try:
+                        if connection is None:
+                            connection = self.connection_factory(fail_silently=False)
+                            connection.open()
+                        message.connection = connection
+                        message.send()
+                        error = None
+                        break
+                    except (smtplib.SMTPException, OSError) as exc:
+                        error = str(exc) or exc.__class__.__name__
+                        if isinstance(exc, (smtplib.SMTPServerDisconnected, OSError)) and connection is not None:
+                            # Connexion perdue : elle est rouverte à la tentative suivante
+                            self._close(connection)
+                            connection = None
+                        # Adresse refusée par le serveur : inutile de réessayer
+                        if isinstance(exc, smtplib.SMTPRecipientsRefused) or attempts > self.retries or batch.cancelled:
+                            break
+                        time.sleep(self.backoff * 2 ** (attempts - 1))
+                    except Exception as exc:
+                        # Message invalide (en-tête, encodage…) : échec définitif, le worker continue
+                        error = str(exc) or exc.__class__.__name__
+                        break
+                batch.results.put((invitation, error, attempts))
+        finally:
+            if connection is not None:
+                self._close(connection)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+
+def _skip_reason(invitation):
+    guest = invitation.guest
+    if not guest.email:
+        return "Invité sans adresse email."
+    user = guest.user
+    preferences = getattr(user, 'preferences', None) if user is not None else None
+    if preferences is not None and not preferences.notification_email:
+        return "L'invité a désactivé les notifications par email."
+    return None
+
+
+def send_invitations(event, pool, batch_size=None, include_failed=False):
+    """Envoie les invitations en attente de l'événement par lots, via ``pool``.
+
+    Chaque lot est réclamé dans une courte transaction : SELECT ... FOR UPDATE SKIP LOCKED puis
+    passage à « sending » (plusieurs envois peuvent tourner en parallèle sans doublon). Les messages
+    partent hors transaction, sans verrou, puis l'état de livraison est enregistré en un bulk_update.
+    Un envoi interrompu laisse ses invitations « sending » : elles ne repartent pas d'elles-mêmes,
+    seulement avec ``include_failed`` une fois la réclamation expirée. Il en va de même d'un message
+    commencé par un worker resté sans réponse ; ceux que le pool n'a pas tentés redeviennent
+    « pending ». Retourne les compteurs sent/failed/skipped/pending/sending.
+    """
+    batch_size = batch_size or mailer_setting('BATCH_SIZE')
+    claimable = Q(delivery_status='pending')
+    if include_failed:
+        expired = timezone.now() - timedelta(seconds=mailer_setting('CLAIM_EXPIRY'))
+        claimable |= Q(delivery_status='failed') | Q(delivery_status='sending', claimed_at__lt=expired)
+    counts = {'sent': 0, 'failed': 0, 'skipped': 0, 'pending': 0, 'sending': 0}
+    last = 0
+    while True:
+        with transaction.atomic():
+            invitations = list(
+                Invitation.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('guest__event', 'guest__user__preferences')
+                .filter(claimable, guest__event=event, pk__gt=last)
+                .order_by('pk')[:batch_size]
+            )
+            if not invitations:
+                break
+            Invitation.objects.filter(pk__in=[invitation.pk for invitation in invitations]).update(
+                delivery_status='sending', claimed_at=timezone.now(),
+            )
+        # Les échecs restent « failed » : ils ne sont pas repris dans le même envoi
+        last = invitations[-1].pk
+        outgoing = []
+        for invitation in invitations:
+            reason = _skip_reason(invitation)
+            if reason:
+                invitation.delivery_status, invitation.delivery_error = 'skipped', reason
+            else:
+                outgoing.append((invitation, render_invitation(invitation)))
+        now = timezone.now()
+        for invitation, error, attempts in pool.send(outgoing):
+            invitation.delivery_attempts += attempts
+            if error == NOT_ATTEMPTED:
+                # Jamais parti : repris au prochain envoi
+                invitation.delivery_status, invitation.delivery_error = 'pending', ''
+            elif error == NO_RESPONSE:
+                # Peut-être parti : reste réclamé, comme un envoi interrompu
+                invitation.delivery_status, invitation.delivery_error = 'sending', error
+            elif error:
+                invitation.delivery_status, invitation.delivery_error = 'failed', error[:255]
+            else:
+                invitation.delivery_status, invitation.delivery_error = 'sent', ''
+                invitation.delivered_at = now
+        Invitation.objects.bulk_update(
+            invitations, ['delivery_status', 'delivery_attempts', 'delivered_at', 'delivery_error'],
+        )
+        for invitation in invitations:
+            counts[invitation.delivery_status] += 1
+    return counts
+
+
+def run_mailout(event, **pool_options):
+    with SMTPPool(**pool_options) as pool:
+        counts = send_invitations(event, pool)
+    logger.info("Invitations de l'événement %s : %s", event.pk, counts)
+    return counts
+
+
+def start_mailout(event):
+    """Lance l'envoi hors du thread de la requête, après la validation de la transaction"""
+    if not mailer_setting('BACKGROUND'):
+        transaction.on_commit(lambda: run_mailout(event))
+        return
+
+    def target():
+        try:
+            run_mailout(event)
+        except Exception:
+            logger.exception("Échec de l'envoi des invitations de l'événement %s", event.pk)
+        finally:
+            connections.close_all()
+
+    transaction.on_commit(lambda: threading.Thread(target=target, daemon=True).start())
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.events.models import EventType, Event
+from apps.guests.invitations import issue_invitations
+from apps.guests.models import Guest
+from apps.users.models import User
+
+class Command(BaseCommand):
+    help = 'Mesure la génération en masse des invitations pour une grande liste d\'invités'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=50000, help='Nombre d\'invités à inviter')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        user, _ = User.objects.get_or_create(email='bench-invitations@example.com',
+                                             defaults={'username': 'bench-invitations'})
+        event_type, _ = EventType.objects.get_or_create(name='Benchmark')
+        event = Event.objects.create(title='Benchmark invitations', event_type=event_type,
+                                     start_date=timezone.now(), created_by=user)
+
+        start = time.perf_counter()
+        for offset in range(0, count, 10000):
+            Guest.objects.bulk_create(
+                Guest(event=event, name=f'Invité {index}', email=f'invite{index}@example.com')
+                for index in range(offset, min(offset + 10000, count))
+            )
+        self.stdout.write(f'{count} invités créés en {time.perf_counter() - start:.1f} s')
+
+        try:
+            start = time.perf_counter()
+            summary = issue_invitations(event, chunk_size=options['chunk_size'])
+            elapsed = time.perf_counter() - start
+        finally:
+            user.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary["created"]} invitations générées en {elapsed:.2f} s '
+            f'({summary["created"] / elapsed:.0f} invitations/s, lots de {options["chunk_size"]}, '
+            f'{summary["collisions"]} collision(s))'
+        ))
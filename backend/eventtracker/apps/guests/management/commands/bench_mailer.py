@@ -0,0 +1,73 @@
+import time
+from functools import partial
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.events.models import EventType, Event
+from apps.guests.invitations import issue_invitations
+from apps.guests.mailer import SMTPPool, send_invitations
+from apps.guests.models import Guest
+from apps.users.models import User
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 Message accepted for delivery'
+
+
+class Command(BaseCommand):
+    help = 'Mesure le débit d\'envoi des invitations vers un serveur SMTP local (aiosmtpd)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=2000, help='Nombre d\'invitations à envoyer')
+        parser.add_argument('--workers', type=int, default=8, help='Connexions SMTP simultanées')
+        parser.add_argument('--rate', type=float, default=0, help='Débit maximal (messages par seconde)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--port', type=int, default=8025, help='Port du serveur SMTP local')
+
+    def handle(self, *args, **options):
+        if Controller is None:
+            raise CommandError('aiosmtpd est requis : pip install aiosmtpd')
+        count = options['count']
+        handler = CountingHandler()
+        controller = Controller(handler, hostname='127.0.0.1', port=options['port'])
+        controller.start()
+
+        user, _ = User.objects.get_or_create(email='bench-mailer@example.com', defaults={'username': 'bench-mailer'})
+        event_type, _ = EventType.objects.get_or_create(name='Benchmark')
+        event = Event.objects.create(title='Benchmark envoi', event_type=event_type,
+                                     start_date=timezone.now(), created_by=user)
+        try:
+            for offset in range(0, count, 10000):
+                Guest.objects.bulk_create(
+                    Guest(event=event, name=f'Invité {index}', email=f'invite{index}@example.com')
+                    for index in range(offset, min(offset + 10000, count))
+                )
+            issue_invitations(event)
+
+            connection_factory = partial(get_connection, 'django.core.mail.backends.smtp.EmailBackend',
+                                         host='127.0.0.1', port=options['port'], use_tls=False, use_ssl=False,
+                                         username='', password='')
+            start = time.perf_counter()
+            with SMTPPool(workers=options['workers'], rate=options['rate'], retries=1, backoff=0.1,
+                          connection_factory=connection_factory) as pool:
+                counts = send_invitations(event, pool, batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - start
+        finally:
+            controller.stop()
+            user.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{counts["sent"]} invitations envoyées en {elapsed:.2f} s ({counts["sent"] / elapsed:.0f} messages/s, '
+            f'{options["workers"]} connexions, {counts["failed"]} échec(s), {handler.received} reçues)'
+        ))
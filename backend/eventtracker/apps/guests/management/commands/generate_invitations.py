@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.events.models import Event
+from apps.guests.invitations import issue_invitations
+from apps.guests.models import GuestGroup
+
+class Command(BaseCommand):
+    help = 'Crée les invitations manquantes des invités d\'un événement (ou d\'un de ses groupes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event', type=int, help='Identifiant de l\'événement')
+        parser.add_argument('--group', help='Nom du groupe d\'invités')
+        parser.add_argument('--message', default='', help='Message joint aux invitations')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Nombre d\'invitations par insertion')
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.get(pk=options['event'])
+        except Event.DoesNotExist:
+            raise CommandError(f'Événement {options["event"]} introuvable')
+        group = None
+        if options['group']:
+            group = GuestGroup.objects.filter(event=event, name__iexact=options['group']).first()
+            if group is None:
+                raise CommandError(f'Groupe « {options["group"]} » introuvable pour cet événement')
+
+        summary = issue_invitations(event, group=group, message=options['message'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary["created"]} invitation(s) créée(s), {summary["already_invited"]} invité(s) déjà invité(s)'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from apps.events.models import Event
+from apps.guests.models import EventRSVPStats
+from apps.guests.stats import COUNTERS, recompute_stats
+
+class Command(BaseCommand):
+    help = 'Recalcule en masse les compteurs de réponses (EventRSVPStats) depuis les invités'
+
+    def add_arguments(self, parser):
+        parser.add_argument('events', nargs='*', type=int, help='Événements à recalculer (tous par défaut)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Nombre d\'événements par lot')
+
+    def handle(self, *args, **options):
+        events = Event.objects.order_by('pk').values_list('pk', flat=True)
+        if options['events']:
+            events = events.filter(pk__in=options['events'])
+        event_ids = list(events)
+
+        repaired = drifted = 0
+        for start in range(0, len(event_ids), options['batch_size']):
+            batch = event_ids[start:start + options['batch_size']]
+            before = {
+                row[0]: row[1:] for row in EventRSVPStats.objects.filter(event_id__in=batch).values_list('event_id', *COUNTERS)
+            }
+            for stats in recompute_stats(batch):
+                if before.get(stats.event_id) != tuple(getattr(stats, field) for field in COUNTERS):
+                    drifted += 1
+            repaired += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{repaired} événement(s) recalculé(s), {drifted} compteur(s) corrigé(s)')
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.events.models import Event
+from apps.guests.mailer import SMTPPool, send_invitations
+
+class Command(BaseCommand):
+    help = 'Envoie par email les invitations en attente d\'un événement (connexions SMTP en parallèle)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event', type=int, help='Identifiant de l\'événement')
+        parser.add_argument('--workers', type=int, help='Connexions SMTP simultanées')
+        parser.add_argument('--rate', type=float, help='Débit maximal (messages par seconde, 0 : sans limite)')
+        parser.add_argument('--retries', type=int, help='Nouvelles tentatives par message')
+        parser.add_argument('--batch-size', type=int, help='Invitations réclamées par lot')
+        parser.add_argument('--retry-failed', action='store_true', help='Reprend aussi les invitations en échec')
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.get(pk=options['event'])
+        except Event.DoesNotExist:
+            raise CommandError(f'Événement {options["event"]} introuvable')
+
+        with SMTPPool(workers=options['workers'], rate=options['rate'], retries=options['retries']) as pool:
+            counts = send_invitations(event, pool, batch_size=options['batch_size'],
+                                      include_failed=options['retry_failed'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{counts["sent"]} invitation(s) envoyée(s), {counts["failed"]} échec(s), '
+            f'{counts["skipped"]} ignorée(s), {counts["pending"]} non tentée(s), '
+            f'{counts["sending"]} sans réponse du worker'
+        ))
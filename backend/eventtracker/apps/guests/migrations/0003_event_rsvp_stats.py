@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:07
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def backfill_rsvp_stats(apps, schema_editor):
+    # Compteurs initiaux des événements qui ont déjà des invités, en une requête groupée
+    Guest = apps.get_model('guests', 'Guest')
+    EventRSVPStats = apps.get_model('guests', 'EventRSVPStats')
+    rows = Guest.objects.order_by().values('event_id').annotate(
+        pending_count=Count('pk', filter=Q(response_status='pending')),
+        accepted_count=Count('pk', filter=Q(response_status='accepted')),
+        declined_count=Count('pk', filter=Q(response_status='declined')),
+        plus_ones_sum=Sum('plus_ones'),
+        accepted_plus_ones_sum=Sum('plus_ones', filter=Q(response_status='accepted')),
+    )
+    EventRSVPStats.objects.bulk_create([
+        EventRSVPStats(
+            event_id=row['event_id'], pending=row['pending_count'], accepted=row['accepted_count'],
+            declined=row['declined_count'], plus_ones=row['plus_ones_sum'] or 0,
+            accepted_plus_ones=row['accepted_plus_ones_sum'] or 0,
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_search_vector'),
+        ('guests', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRSVPStats',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rsvp_stats', serialize=False, to='events.event')),
+                ('pending', models.IntegerField(default=0)),
+                ('accepted', models.IntegerField(default=0)),
+                ('declined', models.IntegerField(default=0)),
+                ('plus_ones', models.IntegerField(default=0)),
+                ('accepted_plus_ones', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_rsvp_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0003_event_rsvp_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['event', 'response_status'], name='guest_event_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['event', 'group'], name='guest_event_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['event', 'name', 'id'], name='guest_event_name_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0004_guest_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitation',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='invitation',
+            name='delivery_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='invitation',
+            name='delivery_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='invitation',
+            name='delivery_status',
+            field=models.CharField(choices=[('pending', 'À envoyer'), ('sent', 'Envoyée'), ('failed', 'Échec'), ('skipped', 'Non envoyée')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(condition=models.Q(('delivery_status', 'pending')), fields=['guest'], name='invitation_pending_idx'),
+        ),
+    ]
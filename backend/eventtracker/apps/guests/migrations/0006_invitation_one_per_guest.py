@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:50
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_invitations(apps, schema_editor):
+    # La plus ancienne invitation de chaque invité est conservée
+    Invitation = apps.get_model('guests', 'Invitation')
+    kept = Invitation.objects.order_by().values('guest_id').annotate(first=Min('pk')).values('first')
+    Invitation.objects.exclude(pk__in=kept).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0005_invitation_delivery'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_invitations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='invitation',
+            constraint=models.UniqueConstraint(fields=('guest',), name='invitation_one_per_guest'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0006_invitation_one_per_guest'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='guest',
+            name='guest_event_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='guest',
+            name='guest_event_group_idx',
+        ),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['event', 'response_status', 'name', 'id'], name='guest_event_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['event', 'group', 'name', 'id'], name='guest_event_group_name_idx'),
+        ),
+    ]
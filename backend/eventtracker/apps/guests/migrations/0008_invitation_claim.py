@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0007_guest_filtered_page_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitation',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='invitation',
+            name='delivery_status',
+            field=models.CharField(choices=[('pending', 'À envoyer'), ('sending', "En cours d'envoi"), ('sent', 'Envoyée'), ('failed', 'Échec'), ('skipped', 'Non envoyée')], default='pending', max_length=10),
+        ),
+    ]
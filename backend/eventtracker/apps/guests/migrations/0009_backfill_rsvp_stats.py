@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rsvp_stats(apps, schema_editor):
+    # Chaque événement a désormais sa ligne de compteurs, même sans invité (0003 ne créait que
+    # celles des événements qui en avaient) ; les lignes manquantes sont calculées depuis Guest
+    Event = apps.get_model('events', 'Event')
+    Guest = apps.get_model('guests', 'Guest')
+    EventRSVPStats = apps.get_model('guests', 'EventRSVPStats')
+    missing = Event.objects.filter(rsvp_stats__isnull=True).values_list('pk', flat=True)
+    stats = {event_id: EventRSVPStats(event_id=event_id) for event_id in missing.iterator()}
+    rows = Guest.objects.filter(event_id__in=list(stats)).order_by().values('event_id').annotate(
+        pending_count=Count('pk', filter=Q(response_status='pending')),
+        accepted_count=Count('pk', filter=Q(response_status='accepted')),
+        declined_count=Count('pk', filter=Q(response_status='declined')),
+        plus_ones_sum=Sum('plus_ones'),
+        accepted_plus_ones_sum=Sum('plus_ones', filter=Q(response_status='accepted')),
+    )
+    for row in rows:
+        item = stats[row['event_id']]
+        item.pending, item.accepted, item.declined = row['pending_count'], row['accepted_count'], row['declined_count']
+        item.plus_ones = row['plus_ones_sum'] or 0
+        item.accepted_plus_ones = row['accepted_plus_ones_sum'] or 0
+    EventRSVPStats.objects.bulk_create(stats.values(), batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0008_invitation_claim'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rsvp_stats, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,46 @@
-from django.db import models
+from django.db import models, transaction
 
 # Create your models here.
-from django.db import models
 from apps.users.models import User
 from apps.events.models import Event
 
+class GuestQuerySet(models.QuerySet):
+    """Les écritures en masse tiennent aussi à jour EventRSVPStats (sans signaux Django)"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .stats import apply_deltas, contribution, recompute_stats
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            # Les lignes ignorées ou mises à jour ne sont pas identifiables : recalcul des événements touchés
+            recompute_stats({guest.event_id for guest in objs})
+            return objs
+        deltas = {}
+        for guest in objs:
+            contribution(guest.event_id, guest.response_status, guest.plus_ones, deltas)
+        apply_deltas(deltas)
+        return objs
+
+    def update(self, **kwargs):
+        from .invitations import touch_invitations
+        from .stats import RSVP_FIELDS, apply_deltas, grouped_contributions
+
+        if not RSVP_FIELDS.intersection(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # Les lignes ciblées peuvent ne plus correspondre au filtre après la mise à jour
+            ids = list(self.select_for_update().values_list('pk', flat=True))
+            if not ids:
+                return 0
+            targets = Guest.objects.using(self.db).filter(pk__in=ids)
+            deltas = grouped_contributions(targets, sign=-1)
+            rows = super().update(**kwargs)
+            grouped_contributions(targets, deltas=deltas)
+            apply_deltas(deltas)
+            touch_invitations(guest_ids=ids)
+        return rows
+
+
 class GuestGroup(models.Model):
     name = models.CharField(max_length=100)
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='guest_groups')
@@ -18,6 +54,8 @@ class Guest(models.Model):
         ('accepted', 'Accepté'),
         ('declined', 'Refusé'),
     ]
+    # Accompagnants acceptés par invité (réponse à l'invitation, import)
+    MAX_PLUS_ONES = 20
     
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='guests')
     group = models.ForeignKey(GuestGroup, on_delete=models.SET_NULL, null=True, blank=True, related_name='guests')
@@ -30,16 +68,72 @@ class Guest(models.Model):
     note = models.TextField(blank=True)
     invited_at = models.DateTimeField(auto_now_add=True)
     responded_at = models.DateTimeField(null=True, blank=True)
+
+    objects = GuestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Liste des invités d'un événement, paginée sur (name, id) : chaque filtre (réponse, groupe)
+            # a son index terminé par (name, id), qui sert à la fois le filtre et l'ordre des pages
+            models.Index(fields=['event', 'response_status', 'name', 'id'], name='guest_event_status_name_idx'),
+            models.Index(fields=['event', 'group', 'name', 'id'], name='guest_event_group_name_idx'),
+            models.Index(fields=['event', 'name', 'id'], name='guest_event_name_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
 class Invitation(models.Model):
+    DELIVERY_CHOICES = [
+        ('pending', 'À envoyer'),
+        ('sending', "En cours d'envoi"),
+        ('sent', 'Envoyée'),
+        ('failed', 'Échec'),
+        ('skipped', 'Non envoyée'),
+    ]
+
     guest = models.ForeignKey(Guest, on_delete=models.CASCADE, related_name='invitations')
     message = models.TextField(blank=True)
     sent_at = models.DateTimeField(auto_now_add=True)
     viewed_at = models.DateTimeField(null=True, blank=True)
     unique_code = models.CharField(max_length=100, unique=True)
+    delivery_status = models.CharField(max_length=10, choices=DELIVERY_CHOICES, default='pending')
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    delivery_error = models.CharField(max_length=255, blank=True)
+    # Réclamée par un envoi (statut « sending ») : une réclamation ancienne signale un envoi interrompu
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # File d'envoi : seules les invitations à envoyer sont indexées
+            models.Index(fields=['guest'], name='invitation_pending_idx', condition=models.Q(delivery_status='pending')),
+        ]
+        constraints = [
+            # Une invitation par invité, même si deux générations tournent en même temps
+            models.UniqueConstraint(fields=['guest'], name='invitation_one_per_guest'),
+        ]
     
     def __str__(self):
-        return f"Invitation pour {self.guest.name}"
\ No newline at end of file
+        return f"Invitation pour {self.guest.name}"
+
+class EventRSVPStats(models.Model):
+    """Compteurs de réponses d'un événement, maintenus par incréments (voir stats.py)"""
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='rsvp_stats')
+    pending = models.IntegerField(default=0)
+    accepted = models.IntegerField(default=0)
+    declined = models.IntegerField(default=0)
+    plus_ones = models.IntegerField(default=0)
+    accepted_plus_ones = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def total(self):
+        return self.pending + self.accepted + self.declined
+
+    @property
+    def headcount(self):
+        return self.accepted + self.accepted_plus_ones
+
+    def __str__(self):
+        return f"Réponses - {self.event_id}"
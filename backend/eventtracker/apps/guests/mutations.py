@@ -0,0 +1,34 @@
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import Guest
+
+
+def update_guests(event, changes, ids=None, queryset=None):
+    """Applique ``changes`` aux invités de l'événement en un seul UPDATE.
+
+    Les invités sont désignés par ``ids`` (les identifiants absents de l'événement sont
+    signalés un par un) ou par ``queryset``. Changer la réponse met à jour responded_at :
+    effacée pour « pending », conservée si la réponse ne change pas, datée sinon.
+    Retourne (nombre de lignes modifiées, échecs).
+    """
+    guests = Guest.objects.filter(event=event) if queryset is None else queryset.filter(event=event)
+    failures = []
+    if ids is not None:
+        found = set(guests.filter(pk__in=ids).values_list('pk', flat=True))
+        failures = [{'id': pk, 'error': "Invité introuvable pour cet événement."}
+                    for pk in dict.fromkeys(ids) if pk not in found]
+        guests = Guest.objects.filter(pk__in=found)
+        if not found:
+            return 0, failures
+
+    changes = dict(changes)
+    status = changes.get('response_status')
+    if status == 'pending':
+        changes['responded_at'] = None
+    elif status is not None:
+        changes['responded_at'] = Case(
+            When(response_status=status, then=F('responded_at')),
+            default=Value(timezone.now()),
+        )
+    return guests.update(**changes), failures
@@ -0,0 +1,8 @@
+from apps.events.pagination import KeysetPagination
+
+
+class GuestCursorPagination(KeysetPagination):
+    """Pagination des invités sur (name, id), servie par l'index (event, name, id)"""
+    ordering = ('name', 'id')
+    page_size = 50
+    max_page_size = 500
@@ -0,0 +1,127 @@
+from rest_framework import serializers
+from apps.events.models import Event
+from .filters import GuestFilter
+from .models import EventRSVPStats, Guest, GuestGroup
+
+
+class GuestSerializer(serializers.ModelSerializer):
+    group_name = serializers.CharField(source='group.name', read_only=True, default=None)
+
+    class Meta:
+        model = Guest
+        fields = ['id', 'event', 'group', 'group_name', 'user', 'name', 'email', 'phone',
+                  'response_status', 'plus_ones', 'note', 'invited_at', 'responded_at']
+        read_only_fields = ['user', 'invited_at', 'responded_at']
+
+    def validate_event(self, event):
+        if event.created_by_id != self.context['request'].user.pk:
+            raise serializers.ValidationError("Vous ne pouvez gérer que les invités de vos événements.")
+        return event
+
+    def validate(self, attrs):
+        event = attrs.get('event', getattr(self.instance, 'event', None))
+        group = attrs.get('group')
+        if group is not None and group.event_id != event.pk:
+            raise serializers.ValidationError({'group': "Ce groupe n'appartient pas à l'événement."})
+        return attrs
+
+
+class GuestStatusSerializer(serializers.Serializer):
+    """Réponse d'un invité ; « confirmed » (application mobile) vaut « accepted »"""
+    status = serializers.ChoiceField(choices=['pending', 'accepted', 'confirmed', 'declined'])
+
+    def validate_status(self, value):
+        return 'accepted' if value == 'confirmed' else value
+
+
+class OwnedEventSerializer(serializers.Serializer):
+    """Opération en masse sur les invités d'un événement de l'utilisateur connecté"""
+    event = serializers.PrimaryKeyRelatedField(queryset=Event.objects.all())
+
+    def validate_event(self, event):
+        if event.created_by_id != self.context['request'].user.pk:
+            raise serializers.ValidationError("Vous ne pouvez gérer que les invités de vos événements.")
+        return event
+
+
+class GuestImportSerializer(OwnedEventSerializer):
+    """Import d'invités depuis un fichier CSV ou XLSX"""
+    file = serializers.FileField()
+
+    def validate_file(self, upload):
+        if not upload.name.lower().endswith(('.csv', '.txt', '.xlsx')):
+            raise serializers.ValidationError("Format accepté : CSV ou XLSX.")
+        return upload
+
+
+class EventRSVPStatsSerializer(serializers.ModelSerializer):
+    total = serializers.IntegerField(read_only=True)
+    headcount = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = EventRSVPStats
+        fields = ['event', 'pending', 'accepted', 'declined', 'total', 'plus_ones',
+                  'accepted_plus_ones', 'headcount', 'updated_at']
+
+
+class InvitationResponseSerializer(serializers.Serializer):
+    """Réponse d'un invité depuis le lien public de son invitation"""
+    response_status = serializers.ChoiceField(choices=['accepted', 'declined'])
+    plus_ones = serializers.IntegerField(min_value=0, max_value=Guest.MAX_PLUS_ONES, required=False)
+
+
+class InvitationGenerateSerializer(OwnedEventSerializer):
+    """Génération des invitations manquantes d'un événement, éventuellement d'un seul groupe"""
+    group = serializers.PrimaryKeyRelatedField(queryset=GuestGroup.objects.all(), required=False, allow_null=True)
+    message = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        group = attrs.get('group')
+        if group is not None and group.event_id != attrs['event'].pk:
+            raise serializers.ValidationError({'group': "Ce groupe n'appartient pas à l'événement."})
+        return attrs
+
+
+class GuestChangeSetSerializer(serializers.Serializer):
+    """Modifications applicables en masse à des invités"""
+    group = serializers.PrimaryKeyRelatedField(queryset=GuestGroup.objects.all(), required=False, allow_null=True)
+    response_status = serializers.ChoiceField(choices=[choice for choice, _ in Guest.RESPONSE_CHOICES], required=False)
+    plus_ones = serializers.IntegerField(min_value=0, required=False)
+    note = serializers.CharField(required=False, allow_blank=True)
+
+
+class GuestBulkUpdateSerializer(OwnedEventSerializer):
+    """Mise à jour en masse : liste d'identifiants (``ids``) ou filtres (``filter``) et modifications.
+
+    Tous les invités de l'événement ne sont visés que sur demande explicite (``all``) : un filtre
+    vide ou mal orthographié ne doit pas modifier toute la liste.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False,
+                                allow_empty=False, max_length=10000)
+    filter = serializers.DictField(child=serializers.CharField(), required=False)
+    all = serializers.BooleanField(required=False, default=False)
+    changes = GuestChangeSetSerializer()
+
+    def validate_filter(self, value):
+        unknown = sorted(set(value) - set(GuestFilter.base_filters))
+        if unknown:
+            raise serializers.ValidationError(f"Filtres inconnus : {', '.join(unknown)}.")
+        return value
+
+    def validate(self, attrs):
+        by_filter = 'filter' in attrs or attrs['all']
+        if ('ids' in attrs) == by_filter:
+            raise serializers.ValidationError("Indiquez soit « ids », soit « filter » (ou « all »).")
+        # L'événement est déjà imposé : un filtre sur « event » ou sans valeur ne restreint rien
+        if by_filter and not attrs['all'] and not any(
+            value for name, value in attrs.get('filter', {}).items() if name != 'event'
+        ):
+            raise serializers.ValidationError(
+                {'filter': "Aucun filtre effectif : précisez-en un ou indiquez « all » pour tous les invités."}
+            )
+        if not attrs['changes']:
+            raise serializers.ValidationError({'changes': "Aucune modification demandée."})
+        group = attrs['changes'].get('group')
+        if group is not None and group.event_id != attrs['event'].pk:
+            raise serializers.ValidationError({'changes': {'group': "Ce groupe n'appartient pas à l'événement."}})
+        return attrs
@@ -0,0 +1,75 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.events.models import Event
+from .invitations import touch_invitations
+from .models import EventRSVPStats, Guest
+from .stats import RSVP_FIELDS, apply_deltas, contribution, recompute_stats
+
+
+def _rsvp_state(instance):
+    return tuple(instance.__dict__.get(field) for field in ('event_id', 'response_status', 'plus_ones'))
+
+
+@receiver(post_init, sender=Guest)
+def remember_rsvp_state(sender, instance, **kwargs):
+    """Mémorise la réponse chargée pour n'appliquer que l'écart à l'enregistrement"""
+    instance._rsvp_loaded = _rsvp_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Guest)
+def update_rsvp_stats(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not RSVP_FIELDS.intersection(update_fields):
+        return
+    loaded = None if created else instance._rsvp_loaded
+    if created or (loaded and None not in loaded):
+        deltas = {}
+        if loaded:
+            contribution(*loaded, deltas, sign=-1)
+        contribution(instance.event_id, instance.response_status, instance.plus_ones, deltas)
+        apply_deltas(deltas)
+    else:
+        # Instance chargée avec only()/defer() : l'ancienne réponse est inconnue, on recalcule
+        recompute_stats({event_id for event_id in (loaded[0] if loaded else None, instance.event_id) if event_id})
+    instance._rsvp_loaded = _rsvp_state(instance)
+
+
+@receiver(pre_delete, sender=Event)
+def remember_deleted_event(sender, instance, origin=None, **kwargs):
+    # origin est partagé par tous les signaux d'une même suppression en cascade
+    if origin is not None:
+        origin.__dict__.setdefault('_deleted_event_ids', set()).add(instance.pk)
+
+
+@receiver(post_delete, sender=Guest)
+def remove_rsvp_stats(sender, instance, origin=None, **kwargs):
+    # L'événement est supprimé dans la même cascade (depuis lui-même, son organisateur, etc.) :
+    # ses compteurs disparaissent avec lui
+    if instance.event_id in getattr(origin, '_deleted_event_ids', ()):
+        return
+    state = _rsvp_state(instance)
+    if None not in state:
+        apply_deltas(contribution(*state, {}, sign=-1), create_missing=False)
+    elif state[0]:
+        recompute_stats([state[0]])
+
+
+@receiver(post_save, sender=Event)
+def create_rsvp_stats(sender, instance, created, raw=False, **kwargs):
+    # Ligne à zéro dès la création : les premiers invités l'incrémentent sans la recompter
+    if created and not raw:
+        EventRSVPStats.objects.bulk_create([EventRSVPStats(event_id=instance.pk)], ignore_conflicts=True)
+
+
+@receiver(post_save, sender=Event)
+def touch_event_invitations(sender, instance, created, **kwargs):
+    # Titre, date et lieu figurent dans les pages d'invitation en cache
+    if not created:
+        touch_invitations(event_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Guest)
+@receiver(post_delete, sender=Guest)
+def touch_guest_invitations(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_invitations(guest_ids=[instance.pk])
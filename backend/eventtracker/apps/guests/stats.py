@@ -0,0 +1,74 @@
+from django.db.models import Count, F, Q, Sum, Value
+from django.utils import timezone
+
+from .models import EventRSVPStats, Guest
+
+RSVP_FIELDS = {'event', 'event_id', 'response_status', 'plus_ones'}
+STATUSES = ('pending', 'accepted', 'declined')
+COUNTERS = (*STATUSES, 'plus_ones', 'accepted_plus_ones')
+
+
+def contribution(event_id, status, plus_ones, deltas, sign=1, count=1):
+    """Ajoute à ``deltas`` la part d'un invité (ou de ``count`` invités) dans les compteurs de l'événement"""
+    delta = deltas.setdefault(event_id, dict.fromkeys(COUNTERS, 0))
+    # Un statut hors des choix (écrit par update()) n'a pas de compteur, comme dans recompute_stats
+    if status in STATUSES:
+        delta[status] += sign * count
+    delta['plus_ones'] += sign * plus_ones
+    if status == 'accepted':
+        delta['accepted_plus_ones'] += sign * plus_ones
+    return deltas
+
+
+def grouped_contributions(queryset, sign=1, deltas=None):
+    """Part cumulée des invités d'un queryset, par événement, en une requête groupée"""
+    deltas = {} if deltas is None else deltas
+    rows = (queryset.order_by().values('event_id', 'response_status')
+            .annotate(guests=Count('pk'), extra=Sum('plus_ones')))
+    for row in rows:
+        contribution(row['event_id'], row['response_status'], row['extra'] or 0, deltas,
+                     sign=sign, count=row['guests'])
+    return deltas
+
+
+def apply_deltas(deltas, create_missing=True):
+    """Applique les écarts par des UPDATE atomiques (F).
+
+    Chaque événement reçoit sa ligne à sa création ; une ligne encore absente (événement créé par
+    bulk_create) est insérée à zéro (ON CONFLICT DO NOTHING) avant l'UPDATE. Les incréments ne
+    dépendent ainsi jamais d'un recomptage, qui perdrait les invités d'une transaction concurrente.
+    """
+    for event_id, delta in deltas.items():
+        changes = {field: F(field) + Value(value) for field, value in delta.items() if value}
+        if not changes:
+            continue
+        stats = EventRSVPStats.objects.filter(event_id=event_id)
+        # Pas de création après une suppression : l'événement lui-même peut avoir disparu
+        if stats.update(**changes, updated_at=timezone.now()) or not create_missing:
+            continue
+        EventRSVPStats.objects.bulk_create([EventRSVPStats(event_id=event_id)], ignore_conflicts=True)
+        stats.update(**changes, updated_at=timezone.now())
+
+
+def recompute_stats(event_ids):
+    """Recalcule les compteurs des événements donnés depuis Guest et les enregistre (upsert)"""
+    stats = {event_id: EventRSVPStats(event_id=event_id) for event_id in event_ids}
+    rows = (Guest.objects.filter(event_id__in=stats).order_by().values('event_id').annotate(
+        pending=Count('pk', filter=Q(response_status='pending')),
+        accepted=Count('pk', filter=Q(response_status='accepted')),
+        declined=Count('pk', filter=Q(response_status='declined')),
+        total_plus_ones=Sum('plus_ones'),
+        total_accepted_plus_ones=Sum('plus_ones', filter=Q(response_status='accepted')),
+    ))
+    for row in rows:
+        item = stats[row['event_id']]
+        item.pending, item.accepted, item.declined = row['pending'], row['accepted'], row['declined']
+        item.plus_ones = row['total_plus_ones'] or 0
+        item.accepted_plus_ones = row['total_accepted_plus_ones'] or 0
+    now = timezone.now()
+    for item in stats.values():
+        item.updated_at = now
+    return EventRSVPStats.objects.bulk_create(
+        stats.values(), update_conflicts=True, unique_fields=['event'],
+        update_fields=[*COUNTERS, 'updated_at'],
+    )
@@ -1,3 +1,723 @@
-from django.test import TestCase
+import socket
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from smtplib import SMTPServerDisconnected
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.events.models import EventType, Event
+from apps.users.models import User, UserPreference
+from eventtracker.testing import EndpointBudgetMixin
+from .importers import openpyxl
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+from . import invitations
+from .invitations import issue_invitations, view_buffer
+from .mailer import SMTPPool, send_invitations
+from .models import EventRSVPStats, GuestGroup, Guest, Invitation
+
+# Budgets par endpoint : nombre maximal de requêtes SQL et durée maximale (ms).
+# Toute régression (N+1, sérialisation plus lente) fait échouer la suite.
+ENDPOINT_BUDGETS = {
+    'guests-list': {'queries': 2, 'ms': 300},
+    'guests-list-filtered': {'queries': 2, 'ms': 300},
+    'guests-list-next': {'queries': 1, 'ms': 300},
+    'guests-status': {'queries': 3, 'ms': 200},
+    'guests-bulk': {'queries': 10, 'ms': 300},
+}
+
+
+class GuestImportTests(TestCase):
+    """Import en masse des invités depuis un CSV ou un XLSX"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='hote', email='hote@example.com', password='secret')
+        cls.friend = User.objects.create_user(username='amie', email='Awa@example.com', password='secret')
+        event_type = EventType.objects.create(name='Mariage')
+        cls.event = Event.objects.create(title='Mariage', event_type=event_type, start_date=timezone.now(),
+                                         created_by=cls.user)
+        cls.family = GuestGroup.objects.create(event=cls.event, name='Famille')
+        Guest.objects.create(event=cls.event, name='Déjà invité', email='deja@example.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, name, content):
+        upload = SimpleUploadedFile(name, content)
+        return self.client.post('/api/guests/import/', {'event': self.event.pk, 'file': upload}, format='multipart')
+
+    def test_csv_import_resolves_groups_users_and_duplicates(self):
+        content = (
+            'Nom;Courriel;Téléphone;Groupe;Accompagnants\n'
+            'Awa Diallo;awa@example.com;+237 600 000 001;famille;1\n'
+            'Jean;DEJA@example.com;;Amis;0\n'
+            'Paul;;600000002;Amis;2\n'
+            'Paul bis;;600 000 002;;0\n'
+            ';sans-nom@example.com;;;\n'
+            'Marie;marie@example;;;\n'
+            'Infini;infini@example.com;;;inf\n'
+            'Immense;immense@example.com;;;1e400\n'
+            'Foule;foule@example.com;;;21\n'
+            'Nul;nul@example.com;;;nan\n'
+        ).encode('utf-8')
+        response = self.post('invites.csv', content)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['duplicates'], 2)
+        self.assertEqual(response.data['groups_created'], 1)
+        self.assertEqual([error['line'] for error in response.data['errors']], [6, 7, 8, 9, 10, 11])
+
+        awa = Guest.objects.get(name='Awa Diallo')
+        self.assertEqual((awa.group, awa.user, awa.phone, awa.plus_ones), (self.family, self.friend, '+237600000001', 1))
+        self.assertEqual(Guest.objects.get(name='Paul').group.name, 'Amis')
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        def run(rows, offset):
+            lines = ['name,email,group'] + [f'Invité {i},invite{i}@example.com,Table {offset}-{i % 3}'
+                                            for i in range(offset, offset + rows)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post('invites.csv', '\n'.join(lines).encode('utf-8'))
+            self.assertEqual(response.data['created'], rows)
+            return len(queries)
+
+        # 80 lignes tiennent dans un seul INSERT, même sous SQLite (999 paramètres)
+        self.assertEqual(run(5, 0), run(80, 5))
+        self.assertEqual(Guest.objects.filter(event=self.event).count(), 86)
+
+    def test_import_is_limited_to_own_events(self):
+        self.client.force_authenticate(self.friend)
+        response = self.post('invites.csv', b'name\nIntrus\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('event', response.data)
+
+    def test_missing_name_column_is_rejected(self):
+        response = self.post('invites.csv', b'email\nx@example.com\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file', response.data)
+
+    @skipUnless(openpyxl, 'openpyxl non installé')
+    def test_xlsx_import(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['Name', 'Email', 'Plus ones'])
+        sheet.append(['Ngono', 'ngono@example.com', 2])
+        sheet.append(['Ngono', 'NGONO@example.com', 0])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        response = self.post('invites.xlsx', buffer.getvalue())
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['created'], response.data['duplicates']), (1, 1))
+        self.assertEqual(Guest.objects.get(email='ngono@example.com').plus_ones, 2)
+
+
+class RSVPStatsTests(TestCase):
+    """Compteurs de réponses maintenus par incréments"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='rsvp', email='rsvp@example.com', password='secret')
+        event_type = EventType.objects.create(name='Conférence')
+        cls.event = Event.objects.create(title='Conférence', event_type=event_type, start_date=timezone.now(),
+                                         created_by=cls.user)
+        cls.other = Event.objects.create(title='Atelier', event_type=event_type, start_date=timezone.now(),
+                                         created_by=cls.user)
+
+    def counters(self, event=None):
+        stats = EventRSVPStats.objects.get(event=event or self.event)
+        return stats.pending, stats.accepted, stats.declined, stats.plus_ones, stats.accepted_plus_ones
+
+    def test_single_saves_and_deletes(self):
+        guest = Guest.objects.create(event=self.event, name='Awa', plus_ones=2)
+        Guest.objects.create(event=self.event, name='Paul', response_status='declined')
+        self.assertEqual(self.counters(), (1, 0, 1, 2, 0))
+
+        guest.response_status = 'accepted'
+        guest.save()
+        self.assertEqual(self.counters(), (0, 1, 1, 2, 2))
+
+        guest = Guest.objects.only('pk', 'event', 'plus_ones').get(pk=guest.pk)
+        guest.plus_ones = 3
+        guest.save()
+        self.assertEqual(self.counters(), (0, 1, 1, 3, 3))
+
+        guest.event = self.other
+        guest.save()
+        self.assertEqual(self.counters(), (0, 0, 1, 0, 0))
+        self.assertEqual(self.counters(self.other), (0, 1, 0, 3, 3))
+
+        guest.delete()
+        self.assertEqual(self.counters(self.other), (0, 0, 0, 0, 0))
+
+    def test_bulk_operations(self):
+        Guest.objects.bulk_create([Guest(event=self.event, name=f'Invité {i}', plus_ones=1) for i in range(10)])
+        self.assertEqual(self.counters(), (10, 0, 0, 10, 0))
+
+        with self.assertNumQueries(7):
+            # Savepoint, ids, avant, UPDATE, après, compteurs : le coût ne dépend pas du nombre d'invités
+            Guest.objects.filter(event=self.event, name__lt='Invité 4').update(response_status='accepted')
+        self.assertEqual(self.counters(), (6, 4, 0, 10, 4))
+
+        Guest.objects.filter(response_status='accepted').update(response_status='declined', plus_ones=0)
+        self.assertEqual(self.counters(), (6, 0, 4, 6, 0))
+
+        guests = list(Guest.objects.filter(response_status='pending')[:2])
+        for guest in guests:
+            guest.response_status = 'accepted'
+        Guest.objects.bulk_update(guests, ['response_status'])
+        self.assertEqual(self.counters(), (4, 2, 4, 6, 2))
+
+        Guest.objects.filter(response_status='declined').delete()
+        self.assertEqual(self.counters(), (4, 2, 0, 6, 2))
+
+    def test_cascades_and_conflicts(self):
+        guests = Guest.objects.bulk_create([Guest(event=self.event, name=f'Invité {i}') for i in range(5)])
+        # Conflits ignorés : les lignes déjà présentes ne sont pas recomptées
+        Guest.objects.bulk_create([Guest(pk=guests[0].pk, event=self.event, name='Doublon'),
+                                   Guest(event=self.event, name='Nouveau')], ignore_conflicts=True)
+        self.assertEqual(self.counters(), (6, 0, 0, 0, 0))
+        Guest.objects.filter(pk=guests[1].pk).update(response_status='inconnu')
+        self.assertEqual(self.counters(), (5, 0, 0, 0, 0))
+
+        # Suppression de l'organisateur : pas une mise à jour des compteurs par invité
+        with CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+        self.assertFalse([query for query in queries if 'UPDATE "guests_eventrsvpstats"' in query['sql']])
+        self.assertFalse(EventRSVPStats.objects.exists())
+
+    def test_rows_exist_from_creation_and_missing_rows_start_at_zero(self):
+        self.assertEqual(self.counters(self.other), (0, 0, 0, 0, 0))
+        # Ligne absente (événement créé par bulk_create) : insérée à zéro puis incrémentée, sans recompter
+        EventRSVPStats.objects.filter(event=self.other).delete()
+        with mock.patch('apps.guests.stats.recompute_stats') as recompute:
+            Guest.objects.create(event=self.other, name='Awa', response_status='accepted', plus_ones=1)
+        recompute.assert_not_called()
+        self.assertEqual(self.counters(self.other), (0, 1, 0, 1, 1))
+
+    def test_repair_command_and_endpoint(self):
+        Guest.objects.bulk_create([
+            Guest(event=self.event, name='Awa', response_status='accepted', plus_ones=2),
+            Guest(event=self.event, name='Paul'),
+        ])
+        EventRSVPStats.objects.filter(event=self.event).update(accepted=40, pending=0)
+        out = StringIO()
+        call_command('repair_rsvp_stats', stdout=out)
+        # L'autre événement a sa ligne à zéro depuis sa création : seul le premier est corrigé
+        self.assertIn('2 événement(s) recalculé(s), 1 compteur(s) corrigé(s)', out.getvalue())
+        self.assertEqual(self.counters(), (1, 1, 0, 2, 2))
+        self.assertEqual(self.counters(self.other), (0, 0, 0, 0, 0))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = client.get(f'/api/guests/stats/{self.event.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total'], response.data['headcount']), (2, 3))
+
+
+@skipUnless(connection.vendor == 'postgresql', "Transactions concurrentes (READ COMMITTED) de PostgreSQL")
+class RSVPStatsRaceTests(TransactionTestCase):
+    """Premiers invités d'un événement ajoutés par deux transactions concurrentes"""
+
+    def test_concurrent_first_guests_are_both_counted(self):
+        user = User.objects.create_user(username='course', email='course@example.com', password='secret')
+        event = Event.objects.create(title='Course', event_type=EventType.objects.create(name='Course'),
+                                     start_date=timezone.now(), created_by=user)
+        # Événement importé par bulk_create : pas encore de ligne de compteurs
+        EventRSVPStats.objects.filter(event=event).delete()
+        inserted = threading.Event()
+
+        def add_guest():
+            # Le premier invité reste non validé pendant que le second est ajouté
+            try:
+                with transaction.atomic():
+                    Guest.objects.create(event=event, name='Awa')
+                    inserted.set()
+                    time.sleep(0.3)
+            finally:
+                connections.close_all()
+
+        other = threading.Thread(target=add_guest)
+        other.start()
+        inserted.wait(5)
+        Guest.objects.create(event=event, name='Paul')
+        other.join()
+        self.assertEqual(EventRSVPStats.objects.get(event=event).pending, 2)
+
+
+class PublicInvitationTests(TestCase):
+    """Lien public d'invitation : lecture en cache et consultations écrites par lots"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='invite', email='invite@example.com', password='secret')
+        event = Event.objects.create(title='Baptême', event_type=EventType.objects.create(name='Baptême'),
+                                     start_date=timezone.now(), location='Yaoundé', created_by=user)
+        cls.guest = Guest.objects.create(event=event, name='Awa')
+        cls.invitation = Invitation.objects.create(guest=cls.guest, unique_code='abc123')
+        cls.other = Invitation.objects.create(guest=Guest.objects.create(event=event, name='Paul'), unique_code='xyz789')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.addCleanup(view_buffer.flush)
+
+    def test_opens_are_served_from_cache_and_views_written_in_one_batch(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/guests/invitations/abc123/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['guest']['name'], response.data['event']['location']), ('Awa', 'Yaoundé'))
+        self.client.get('/api/guests/invitations/xyz789/')
+        with self.assertNumQueries(0):
+            for _ in range(20):
+                self.client.get('/api/guests/invitations/abc123/')
+                self.client.get('/api/guests/invitations/xyz789/')
+        self.assertIsNone(Invitation.objects.get(pk=self.invitation.pk).viewed_at)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(view_buffer.flush(), 2)
+        self.assertEqual(Invitation.objects.filter(viewed_at__isnull=False).count(), 2)
+
+    def test_unknown_codes_are_cached(self):
+        self.assertEqual(self.client.get('/api/guests/invitations/inconnu/').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/guests/invitations/inconnu/').status_code, 404)
+
+    def test_rsvp_updates_guest_and_counters(self):
+        self.client.get('/api/guests/invitations/abc123/')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/guests/invitations/abc123/',
+                                        {'response_status': 'accepted', 'plus_ones': 2})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.guest.refresh_from_db()
+        self.assertEqual((self.guest.response_status, self.guest.plus_ones), ('accepted', 2))
+        self.assertIsNotNone(self.guest.responded_at)
+        stats = EventRSVPStats.objects.get(event=self.guest.event)
+        self.assertEqual((stats.accepted, stats.accepted_plus_ones), (1, 2))
+        self.assertEqual(self.client.get('/api/guests/invitations/abc123/').data['guest']['response_status'], 'accepted')
+
+        response = self.client.post('/api/guests/invitations/abc123/', {'response_status': 'maybe'})
+        self.assertEqual(response.status_code, 400)
+
+
+    def test_edits_to_event_or_guest_refresh_the_cached_page(self):
+        self.client.get('/api/guests/invitations/abc123/')
+        event = self.guest.event
+        with self.captureOnCommitCallbacks(execute=True):
+            event.title = 'Baptême de Léa'
+            event.save()
+            Guest.objects.filter(pk=self.other.guest_id).update(plus_ones=1)
+        data = self.client.get('/api/guests/invitations/abc123/').data
+        self.assertEqual(data['event']['title'], 'Baptême de Léa')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.guest.name = 'Awa Ngo'
+            self.guest.save()
+        self.assertEqual(self.client.get('/api/guests/invitations/abc123/').data['guest']['name'], 'Awa Ngo')
+        with self.assertNumQueries(0):
+            self.client.get('/api/guests/invitations/abc123/')
+
+    def test_page_read_during_a_response_is_not_cached(self):
+        read_versions = invitations._versions
+
+        def respond_meanwhile(*ids):
+            # Réponse validée entre la lecture en base et la mise en cache de la page
+            with self.captureOnCommitCallbacks(execute=True):
+                Guest.objects.filter(pk=self.guest.pk).update(response_status='declined')
+            return read_versions(*ids)
+
+        with mock.patch.object(invitations, '_versions', respond_meanwhile):
+            stale = self.client.get('/api/guests/invitations/abc123/').data
+        self.assertEqual(stale['guest']['response_status'], 'pending')
+        data = self.client.get('/api/guests/invitations/abc123/').data
+        self.assertEqual(data['guest']['response_status'], 'declined')
+
+
+class InvitationGenerationTests(TestCase):
+    """Génération en masse des invitations"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='emetteur', email='emetteur@example.com', password='secret')
+        cls.event = Event.objects.create(title='Gala', event_type=EventType.objects.create(name='Gala'),
+                                         start_date=timezone.now(), created_by=cls.user)
+        cls.vip = GuestGroup.objects.create(event=cls.event, name='VIP')
+        Guest.objects.bulk_create(
+            [Guest(event=cls.event, name=f'Invité {i}', group=cls.vip if i < 3 else None) for i in range(12)]
+        )
+        Invitation.objects.create(guest=Guest.objects.get(name='Invité 0'), unique_code='existant')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_generate_for_group_then_everyone(self):
+        response = self.client.post('/api/guests/invitations/generate/',
+                                    {'event': self.event.pk, 'group': self.vip.pk, 'message': 'Bienvenue'})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['created'], response.data['already_invited']), (2, 1))
+
+        response = self.client.post('/api/guests/invitations/generate/', {'event': self.event.pk})
+        self.assertEqual((response.data['created'], response.data['already_invited']), (9, 3))
+        codes = list(Invitation.objects.values_list('unique_code', flat=True))
+        self.assertEqual(len(set(codes)), 12)
+        self.assertEqual(Guest.objects.filter(invitations__isnull=True).count(), 0)
+
+        out = StringIO()
+        call_command('generate_invitations', self.event.pk, '--chunk-size', '4', stdout=out)
+        self.assertIn('0 invitation(s) créée(s), 12 invité(s)', out.getvalue())
+
+    def test_queries_grow_per_chunk_not_per_guest(self):
+        with CaptureQueriesContext(connection) as queries:
+            summary = issue_invitations(self.event, chunk_size=4)
+        self.assertEqual(summary['created'], 11)
+        # Comptage, puis par lot : ids, vérification des codes, INSERT, invitations créées ; puis lot vide
+        self.assertLessEqual(len(queries), 2 + 3 * 4)
+
+    def test_concurrent_generation_does_not_duplicate(self):
+        draw = invitations.unique_codes
+
+        def invite_meanwhile(count):
+            # Une génération concurrente invite « Invité 5 » entre la sélection et l'insertion
+            Invitation.objects.get_or_create(guest=Guest.objects.get(name='Invité 5'),
+                                             defaults={'unique_code': 'concurrent'})
+            return draw(count)
+
+        with mock.patch.object(invitations, 'unique_codes', invite_meanwhile):
+            summary = issue_invitations(self.event)
+        self.assertEqual((summary['created'], summary['already_invited']), (10, 2))
+        self.assertEqual(Invitation.objects.count(), 12)
+
+    def test_group_of_another_event_is_rejected(self):
+        other = Event.objects.create(title='Autre', event_type=self.event.event_type, start_date=timezone.now(),
+                                     created_by=self.user)
+        group = GuestGroup.objects.create(event=other, name='Autre')
+        response = self.client.post('/api/guests/invitations/generate/', {'event': self.event.pk, 'group': group.pk})
+        self.assertEqual(response.status_code, 400)
+
+
+class GuestListTests(EndpointBudgetMixin, TestCase):
+    """Liste des invités : filtres, pagination keyset sur (name, id) et compteurs"""
+    budgets = ENDPOINT_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='liste', email='liste@example.com', password='secret')
+        cls.event = Event.objects.create(title='Congrès', event_type=EventType.objects.create(name='Congrès'),
+                                         start_date=timezone.now(), created_by=cls.user)
+        cls.speakers = GuestGroup.objects.create(event=cls.event, name='Intervenants')
+        statuses = ['pending', 'accepted', 'declined']
+        Guest.objects.bulk_create([
+            Guest(event=cls.event, name=f'{"Ab" if i % 2 else "Ba"}{i:03d}', response_status=statuses[i % 3],
+                  group=cls.speakers if i < 30 else None)
+            for i in range(120)
+        ])
+        # Homonymes : l'id départage les lignes de même nom
+        Guest.objects.bulk_create([Guest(event=cls.event, name='Ab001') for _ in range(3)])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_follow_name_then_id_with_constant_queries(self):
+        url = f'/api/guests/?event={self.event.pk}&page_size=25'
+        response = self.measure('guests-list', 'get', url)
+        self.assertEqual(response.data['counts'], {'pending': 43, 'accepted': 40, 'declined': 40})
+        seen = [(guest['name'], guest['id']) for guest in response.data['results']]
+        while response.data['next']:
+            response = self.measure('guests-list-next', 'get', response.data['next'])
+            self.assertNotIn('counts', response.data)
+            seen += [(guest['name'], guest['id']) for guest in response.data['results']]
+        self.assertEqual(len(seen), 123)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_filters_and_counts(self):
+        url = f'/api/guests/?event={self.event.pk}&group={self.speakers.pk}&name=ab&response_status=accepted'
+        response = self.measure('guests-list-filtered', 'get', url)
+        names = [guest['name'] for guest in response.data['results']]
+        self.assertTrue(names and all(name.startswith('Ab') for name in names))
+        self.assertTrue(all(guest['group_name'] == 'Intervenants' for guest in response.data['results']))
+        # Les compteurs ignorent le filtre de réponse pour afficher les trois onglets
+        self.assertEqual(response.data['counts'], {'pending': 5, 'accepted': 5, 'declined': 5})
+
+    def test_status_action_accepts_mobile_values(self):
+        guest = Guest.objects.filter(response_status='pending').first()
+        response = self.measure('guests-status', 'put', f'/api/guests/{guest.pk}/status/', {'status': 'confirmed'})
+        self.assertEqual(response.data['response_status'], 'accepted')
+        self.assertIsNotNone(response.data['responded_at'])
+        self.assertEqual(EventRSVPStats.objects.get(event=self.event).accepted, 41)
+
+    def test_other_users_cannot_see_or_add_guests(self):
+        other = User.objects.create_user(username='autre', email='autre@example.com', password='secret')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get('/api/guests/').data['results'], [])
+        response = self.client.post('/api/guests/', {'event': self.event.pk, 'name': 'Intrus'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class GuestBulkUpdateTests(EndpointBudgetMixin, TestCase):
+    """Modification en masse des invités"""
+    budgets = ENDPOINT_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='masse', email='masse@example.com', password='secret')
+        cls.event = Event.objects.create(title='Fête', event_type=EventType.objects.create(name='Fête'),
+                                         start_date=timezone.now(), created_by=cls.user)
+        cls.table = GuestGroup.objects.create(event=cls.event, name='Table 1')
+        cls.guests = Guest.objects.bulk_create([
+            Guest(event=cls.event, name=f'Invité {i}', plus_ones=1) for i in range(40)
+        ])
+        cls.answered = timezone.now() - timedelta(days=3)
+        Guest.objects.filter(pk=cls.guests[0].pk).update(response_status='declined', responded_at=cls.answered)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ids_with_failures_in_one_update(self):
+        ids = [guest.pk for guest in self.guests[:30]] + [999999]
+        response = self.measure('guests-bulk', 'post', '/api/guests/bulk/', {
+            'event': self.event.pk, 'ids': ids,
+            'changes': {'group': self.table.pk, 'response_status': 'declined', 'plus_ones': 0},
+        })
+        self.assertEqual(response.data['updated'], 30)
+        self.assertEqual(response.data['failures'], [{'id': 999999, 'error': "Invité introuvable pour cet événement."}])
+        self.assertEqual(Guest.objects.filter(group=self.table, response_status='declined', plus_ones=0).count(), 30)
+        # Une réponse déjà donnée garde sa date
+        self.assertEqual(Guest.objects.get(pk=self.guests[0].pk).responded_at, self.answered)
+        self.assertEqual(Guest.objects.filter(responded_at__isnull=False).count(), 30)
+        stats = EventRSVPStats.objects.get(event=self.event)
+        self.assertEqual((stats.pending, stats.declined, stats.plus_ones), (10, 30, 10))
+
+    def test_filter_selection(self):
+        response = self.client.post('/api/guests/bulk/', {
+            'event': self.event.pk, 'filter': {'response_status': 'declined'},
+            'changes': {'response_status': 'pending'},
+        }, format='json')
+        self.assertEqual(response.data, {'updated': 1, 'failures': []})
+        self.assertEqual(Guest.objects.filter(response_status='pending', responded_at__isnull=True).count(), 40)
+
+    def test_filter_must_restrict_the_selection(self):
+        for selection in ({'filter': {'status': 'declined'}}, {'filter': {}}, {'filter': {'event': str(self.event.pk)}}):
+            response = self.client.post('/api/guests/bulk/', {
+                'event': self.event.pk, **selection, 'changes': {'plus_ones': 3},
+            }, format='json')
+            self.assertEqual(response.status_code, 400, selection)
+        self.assertEqual(Guest.objects.filter(plus_ones=3).count(), 0)
+
+        response = self.client.post('/api/guests/bulk/', {
+            'event': self.event.pk, 'all': True, 'changes': {'plus_ones': 3},
+        }, format='json')
+        self.assertEqual(response.data['updated'], 40)
+
+    def test_rejects_foreign_event_and_empty_changes(self):
+        other = User.objects.create_user(username='voisin', email='voisin@example.com', password='secret')
+        self.client.force_authenticate(other)
+        response = self.client.post('/api/guests/bulk/', {
+            'event': self.event.pk, 'ids': [self.guests[1].pk], 'changes': {'plus_ones': 3},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('event', response.data)
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/guests/bulk/', {'event': self.event.pk, 'ids': [1], 'changes': {}},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Guest.objects.filter(plus_ones=3).count(), 0)
+
+
+class FlakyBackend(EmailBackend):
+    """Perd la connexion lors des ``failures`` premiers envois, puis délivre normalement"""
+    lock = threading.Lock()
+    failures = 0
+    opened = 0
+
+    def open(self):
+        with self.lock:
+            FlakyBackend.opened += 1
+
+    def send_messages(self, messages):
+        with self.lock:
+            fail = FlakyBackend.failures > 0
+            FlakyBackend.failures -= fail
+        if fail:
+            raise SMTPServerDisconnected('Connexion perdue')
+        return super().send_messages(messages)
+
+
+class InvitationMailerTests(TestCase):
+    """Envoi des invitations par email hors du thread de la requête"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='postier', email='postier@example.com', password='secret')
+        cls.event = Event.objects.create(title='Anniversaire', event_type=EventType.objects.create(name='Fête'),
+                                         start_date=timezone.now(), location='Kribi', created_by=cls.user)
+        quiet = User.objects.create_user(username='discret', email='discret@example.com', password='secret')
+        UserPreference.objects.create(user=quiet, notification_email=False)
+        Guest.objects.bulk_create([
+            Guest(event=cls.event, name=f'Invité {i}', email=f'invite{i}@example.com') for i in range(10)
+        ] + [
+            Guest(event=cls.event, name='Discret', email='discret@example.com', user=quiet),
+            Guest(event=cls.event, name='Sans email'),
+        ])
+        issue_invitations(cls.event, message='Venez fêter mes 30 ans !')
+
+    def test_pipeline_sends_respects_preferences_and_records_delivery(self):
+        with SMTPPool(workers=3, retries=0) as pool:
+            counts = send_invitations(self.event, pool, batch_size=4)
+        self.assertEqual(counts, {'sent': 10, 'failed': 0, 'skipped': 2, 'pending': 0, 'sending': 0})
+        self.assertEqual(len(mail.outbox), 10)
+        message = mail.outbox[0]
+        self.assertEqual(message.subject, 'Invitation : Anniversaire')
+        self.assertIn('Venez fêter mes 30 ans !', message.body)
+        code = Invitation.objects.get(guest__email=message.to[0]).unique_code
+        self.assertIn(f'/api/guests/invitations/{code}/', message.body)
+        self.assertEqual(Invitation.objects.filter(delivery_status='sent', delivered_at__isnull=False).count(), 10)
+        self.assertEqual(
+            set(Invitation.objects.filter(delivery_status='skipped').values_list('guest__name', flat=True)),
+            {'Discret', 'Sans email'},
+        )
+
+        # Un second passage ne renvoie rien
+        with SMTPPool(workers=1) as pool:
+            self.assertEqual(send_invitations(self.event, pool),
+                             {'sent': 0, 'failed': 0, 'skipped': 0, 'pending': 0, 'sending': 0})
+
+    def test_lost_connections_are_reopened_and_retried(self):
+        FlakyBackend.failures, FlakyBackend.opened = 2, 0
+        with SMTPPool(workers=2, retries=2, backoff=0, connection_factory=FlakyBackend) as pool:
+            counts = send_invitations(self.event, pool)
+        self.assertEqual(counts['sent'], 10)
+        self.assertEqual(len(mail.outbox), 10)
+        # Chaque perte de connexion entraîne une réouverture et une tentative de plus
+        self.assertGreaterEqual(FlakyBackend.opened, 3)
+        self.assertEqual(sum(Invitation.objects.values_list('delivery_attempts', flat=True)), 12)
+
+    def test_failures_are_recorded_after_retries(self):
+        class DownBackend(EmailBackend):
+            def open(self):
+                raise ConnectionRefusedError('Serveur injoignable')
+
+        with SMTPPool(workers=2, retries=1, backoff=0, connection_factory=DownBackend) as pool:
+            counts = send_invitations(self.event, pool)
+        self.assertEqual(counts['failed'], 10)
+        invitation = Invitation.objects.filter(delivery_status='failed').first()
+        self.assertEqual((invitation.delivery_attempts, invitation.delivery_error), (2, 'Serveur injoignable'))
+
+    def test_unexpected_errors_and_stuck_workers_affect_only_their_messages(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        class PickyBackend(EmailBackend):
+            def send_messages(self, messages):
+                if messages[0].to == ['invite3@example.com']:
+                    raise ValueError('En-tête invalide')
+                if messages[0].to == ['invite7@example.com']:
+                    release.wait(5)
+                return super().send_messages(messages)
+
+        Event.objects.filter(pk=self.event.pk).update(title='Anniversaire\nsurprise')
+        with SMTPPool(workers=2, retries=0, connection_factory=PickyBackend, timeout=0.5) as pool:
+            counts = send_invitations(self.event, pool)
+            release.set()
+        self.assertEqual(counts, {'sent': 8, 'failed': 1, 'skipped': 2, 'pending': 0, 'sending': 1})
+        self.assertEqual(mail.outbox[0].subject, 'Invitation : Anniversaire surprise')
+        errors = dict(Invitation.objects.exclude(delivery_error='').exclude(delivery_status='skipped')
+                      .values_list('guest__email', 'delivery_error'))
+        self.assertEqual(errors, {'invite3@example.com': 'En-tête invalide',
+                                  'invite7@example.com': "Pas de réponse du worker d'envoi."})
+        # Message bloqué, peut-être parti : il reste réclamé et n'est pas repris comme un échec
+        self.assertEqual(Invitation.objects.get(guest__email='invite7@example.com').delivery_status, 'sending')
+
+    def test_messages_left_after_a_timeout_are_not_sent(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        class StuckBackend(EmailBackend):
+            def send_messages(self, messages):
+                release.wait(5)
+                return super().send_messages(messages)
+
+        with SMTPPool(workers=1, retries=0, connection_factory=StuckBackend, timeout=0.3) as pool:
+            counts = send_invitations(self.event, pool)
+            release.set()
+        # Le worker libéré termine le premier message puis abandonne les autres, sans les envoyer
+        self.assertEqual(counts, {'sent': 0, 'failed': 0, 'skipped': 2, 'pending': 9, 'sending': 1})
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Le prochain envoi part des messages non tentés, une seule fois chacun
+        with SMTPPool(workers=2) as pool:
+            self.assertEqual(send_invitations(self.event, pool)['sent'], 9)
+        self.assertEqual(len(mail.outbox), 10)
+        self.assertEqual(len({message.to[0] for message in mail.outbox}), 10)
+
+    def test_batches_are_claimed_then_sent_outside_any_transaction(self):
+        test, depth = self, len(connection.atomic_blocks)
+
+        class CrashingPool:
+            def send(self, items):
+                # Lot réclamé et validé : aucun verrou n'est tenu pendant l'envoi
+                test.assertEqual(Invitation.objects.filter(delivery_status='sending').count(), 12)
+                test.assertEqual(len(connection.atomic_blocks), depth)
+                raise RuntimeError('Processus interrompu')
+
+        with self.assertRaises(RuntimeError):
+            send_invitations(self.event, CrashingPool())
+        # Un envoi interrompu n'est pas repris automatiquement (les messages ont pu partir)...
+        with SMTPPool(workers=1) as pool:
+            self.assertEqual(send_invitations(self.event, pool, include_failed=True)['sent'], 0)
+        # ... sauf sur demande, une fois la réclamation expirée
+        Invitation.objects.update(claimed_at=timezone.now() - timedelta(days=1))
+        with SMTPPool(workers=1) as pool:
+            self.assertEqual(send_invitations(self.event, pool, include_failed=True)['sent'], 10)
+
+    @override_settings(INVITATION_MAILER={'BACKGROUND': False, 'WORKERS': 2})
+    def test_api_trigger_sends_after_commit(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/guests/invitations/send/', {'event': self.event.pk})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {'queued': 12})
+        self.assertEqual(len(mail.outbox), 10)
+
+    @skipUnless(Controller, 'aiosmtpd non installé')
+    def test_real_smtp_delivery(self):
+        from functools import partial
+        from django.core.mail import get_connection
+
+        received = []
+
+        class Handler:
+            async def handle_DATA(self, server, session, envelope):
+                received.append(envelope.rcpt_tos[0])
+                return '250 OK'
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        controller = Controller(Handler(), hostname='127.0.0.1', port=port)
+        controller.start()
+        self.addCleanup(controller.stop)
+        factory = partial(get_connection, 'django.core.mail.backends.smtp.EmailBackend',
+                          host='127.0.0.1', port=port, use_tls=False, use_ssl=False, username='', password='')
+        with SMTPPool(workers=3, retries=0, connection_factory=factory) as pool:
+            counts = send_invitations(self.event, pool)
+        self.assertEqual(counts['sent'], 10)
+        self.assertEqual(sorted(received), sorted(f'invite{i}@example.com' for i in range(10)))
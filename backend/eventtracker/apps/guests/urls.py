@@ -1,7 +1,16 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
 from . import views
 
+# Les invités sont à la racine de l'application (api/guests/<id>/), comme l'attend l'application mobile
+router = SimpleRouter()
+router.register(r'', views.GuestViewSet, basename='guest')
+
 urlpatterns = [
-    # Vos URLs ici
-    # Exemple : path('gifts/', views.GiftListView.as_view(), name='gift-list'),
-]
\ No newline at end of file
+    path('stats/<int:event_id>/', views.EventRSVPStatsView.as_view(), name='guest-rsvp-stats'),
+    path('invitations/generate/', views.InvitationGenerateView.as_view(), name='invitation-generate'),
+    path('invitations/send/', views.InvitationSendView.as_view(), name='invitation-send'),
+    path('invitations/<str:code>/', views.PublicInvitationView.as_view(), name='public-invitation'),
+    path('import/', views.GuestImportView.as_view(), name='guest-import'),
+    path('', include(router.urls)),
+]
@@ -1,3 +1,170 @@
-from django.shortcuts import render
+from django.db.models import Count
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from apps.events.models import Event
+from .filters import GuestFilter
+from .importers import GuestImportError, import_guests, iter_upload
+from .invitations import get_invitation, issue_invitations, record_view, respond
+from .mailer import start_mailout
+from .models import EventRSVPStats, Guest, Invitation
+from .mutations import update_guests
+from .pagination import GuestCursorPagination
+from .serializers import (
+    EventRSVPStatsSerializer, OwnedEventSerializer, GuestBulkUpdateSerializer, GuestImportSerializer, GuestSerializer, GuestStatusSerializer,
+    InvitationGenerateSerializer, InvitationResponseSerializer,
+)
+
+
+class GuestViewSet(viewsets.ModelViewSet):
+    """Vue pour les invités des événements de l'utilisateur connecté"""
+    serializer_class = GuestSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = GuestCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = GuestFilter
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        """Retourne les invités des événements de l'utilisateur connecté"""
+        return Guest.objects.filter(event__created_by=self.request.user).select_related('group')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Les compteurs accompagnent la première page seulement
+        if not request.query_params.get(self.paginator.cursor_query_param):
+            response.data['counts'] = self.get_counts(request)
+        return response
+
+    def get_counts(self, request):
+        """Invités par réponse pour les filtres courants (hors filtre de réponse)"""
+        params = request.query_params
+        filters = {key for key in ('group', 'name') if params.get(key)}
+        event = params.get('event')
+        if event and event.isdigit() and not filters:
+            # Événement entier : compteurs maintenus, sans parcourir les invités
+            stats = EventRSVPStats.objects.filter(event_id=event, event__created_by=request.user).first()
+            stats = stats or EventRSVPStats()
+            return {'pending': stats.pending, 'accepted': stats.accepted, 'declined': stats.declined}
+        data = params.copy()
+        data.pop('response_status', None)
+        queryset = GuestFilter(data, queryset=self.get_queryset(), request=request).qs
+        # Une seule requête groupée, servie par les index (event, response_status) et (event, group)
+        rows = queryset.order_by().values_list('response_status').annotate(total=Count('pk'))
+        counts = dict.fromkeys(['pending', 'accepted', 'declined'], 0)
+        counts.update(rows)
+        return counts
+
+    @action(detail=True, methods=['put', 'patch'])
+    def status(self, request, pk=None):
+        """Met à jour la réponse d'un invité (et la date de réponse)"""
+        guest = self.get_object()
+        serializer = GuestStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        guest.response_status = serializer.validated_data['status']
+        guest.responded_at = None if guest.response_status == 'pending' else timezone.now()
+        guest.save(update_fields=['response_status', 'responded_at'])
+        return Response(self.get_serializer(guest).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Modifie en un seul UPDATE les invités d'un événement désignés par ids ou par filtres"""
+        serializer = GuestBulkUpdateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        queryset = None
+        if 'filter' in data or data['all']:
+            filterset = GuestFilter(data.get('filter', {}), queryset=Guest.objects.all(), request=request)
+            if not filterset.is_valid():
+                raise ValidationError({'filter': filterset.errors})
+            queryset = filterset.qs
+        updated, failures = update_guests(data['event'], data['changes'], ids=data.get('ids'), queryset=queryset)
+        return Response({'updated': updated, 'failures': failures})
+
+
+class GuestImportView(APIView):
+    """Import en masse des invités d'un événement (champs « event » et « file »)"""
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        serializer = GuestImportSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        event, upload = serializer.validated_data['event'], serializer.validated_data['file']
+        try:
+            summary = import_guests(event, iter_upload(upload))
+        except GuestImportError as error:
+            raise ValidationError({'file': str(error)})
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+
+class InvitationGenerateView(APIView):
+    """Crée en masse les invitations des invités qui n'en ont pas encore"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = InvitationGenerateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        summary = issue_invitations(**serializer.validated_data)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+
+class InvitationSendView(APIView):
+    """Lance en arrière-plan l'envoi par email des invitations en attente d'un événement"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = OwnedEventSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        event = serializer.validated_data['event']
+        pending = Invitation.objects.filter(guest__event=event, delivery_status='pending').count()
+        if pending:
+            start_mailout(event)
+        return Response({'queued': pending}, status=status.HTTP_202_ACCEPTED)
+
+
+class EventRSVPStatsView(APIView):
+    """Compteurs de réponses d'un événement, lus dans EventRSVPStats sans parcourir les invités"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, event_id):
+        event = get_object_or_404(
+            Event.objects.owned_by(request.user).select_related('rsvp_stats').only('pk', 'rsvp_stats'),
+            pk=event_id,
+        )
+        # Événement sans invité : aucune ligne de compteurs n'a encore été créée
+        stats = getattr(event, 'rsvp_stats', None) or EventRSVPStats(event=event)
+        return Response(EventRSVPStatsSerializer(stats).data)
+
+
+class PublicInvitationView(APIView):
+    """Page publique d'une invitation (lien envoyé à l'invité) et réponse RSVP"""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get_invitation(self, code):
+        payload = get_invitation(code)
+        if payload is None:
+            raise NotFound("Invitation introuvable")
+        return payload
+
+    def get(self, request, code):
+        payload = self.get_invitation(code)
+        record_view(code, payload)
+        return Response(payload)
+
+    def post(self, request, code):
+        payload = self.get_invitation(code)
+        serializer = InvitationResponseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        record_view(code, payload)
+        changes = respond(code, payload, **serializer.validated_data)
+        payload['guest'].update(changes)
+        return Response(payload)
@@ -0,0 +1,72 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.db import DatabaseError
+
+from .ingest import get_coalescer
+from .models import MessageGroupMember
+
+MAX_MESSAGE_LENGTH = 4000
+
+
+def group_channel(group_id):
+    return f'messaging.group.{group_id}'
+
+
+class GroupChatConsumer(AsyncJsonWebsocketConsumer):
+    """Discussion en temps réel d'un MessageGroup.
+
+    Seuls les membres du groupe peuvent se connecter ; un membre retiré est déconnecté (voir
+    signals). Chaque message reçu est enregistré une seule fois (par lots lors des rafales, voir
+    ingest) puis diffusé à toutes les connexions du groupe par la couche de canaux.
+    """
+
+    async def connect(self):
+        self.user = self.scope['user']
+        self.group_id = int(self.scope['url_route']['kwargs']['group_id'])
+        if not self.user.is_authenticated:
+            await self.close(code=4401)
+            return
+        if not await self.is_member():
+            await self.close(code=4403)
+            return
+        self.channel_group = group_channel(self.group_id)
+        await self.channel_layer.group_add(self.channel_group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'channel_group'):
+            await self.channel_layer.group_discard(self.channel_group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if getattr(self, 'removed', False):
+            # Trames arrivées avant la fermeture du socket d'un membre retiré
+            return
+        text = content.get('content') if isinstance(content, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            await self.send_json({'type': 'error', 'error': "Le message est vide."})
+            return
+        if len(text) > MAX_MESSAGE_LENGTH:
+            await self.send_json({'type': 'error', 'error': f"Message limité à {MAX_MESSAGE_LENGTH} caractères."})
+            return
+        try:
+            message = await get_coalescer().submit(self.group_id, self.user, text)
+        except DatabaseError:
+            await self.send_json({'type': 'error', 'error': "Message non enregistré, veuillez réessayer."})
+            return
+        if 'client_id' in content:
+            # Accusé de réception : l'expéditeur associe son brouillon à l'id définitif
+            await self.send_json({'type': 'ack', 'client_id': content['client_id'], 'id': message['id']})
+        await self.channel_layer.group_send(self.channel_group, {'type': 'chat.message', 'message': message})
+
+    async def chat_message(self, event):
+        await self.send_json({'type': 'message', 'message': event['message']})
+
+    async def member_removed(self, event):
+        if event['user_id'] == self.user.pk:
+            self.removed = True
+            await self.channel_layer.group_discard(self.channel_group, self.channel_name)
+            await self.close(code=4403)
+
+    @database_sync_to_async
+    def is_member(self):
+        return MessageGroupMember.objects.filter(group_id=self.group_id, user=self.user).exists()
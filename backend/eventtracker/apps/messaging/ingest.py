@@ -0,0 +1,115 @@
+import asyncio
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import Message
+from .receipts import count_sent
+from .serializers import MessageSerializer
+
+DEFAULTS = {'DELAY': 0.005, 'MAX_BATCH': 200}
+
+
+def ingestion_setting(name):
+    return {**DEFAULTS, **getattr(settings, 'MESSAGE_INGESTION', {})}[name]
+
+
+def persist_messages(group_id, items):
+    """Insère les messages [(expéditeur, texte)] d'un groupe en une transaction et retourne leurs données.
+
+    Un seul bulk_create : les ids et les dates suivent l'ordre de ``items``, qui est donc aussi
+    l'ordre de l'historique (sent_at, id). Les compteurs de non-lus sont mis à jour en un UPDATE.
+    """
+    with transaction.atomic():
+        messages = Message.objects.bulk_create([
+            Message(group_id=group_id, sender=sender, content=content) for sender, content in items
+        ])
+        count_sent(group_id, [sender.pk for sender, _ in items])
+    return MessageSerializer(messages, many=True).data
+
+
+class MessageCoalescer:
+    """Regroupe les messages reçus pour un même groupe pendant ``delay`` secondes.
+
+    Lors d'une rafale, les messages d'un groupe partent en un seul lot au lieu d'une transaction
+    chacun. Chaque expéditeur attend le futur de son message, résolu avec les données
+    enregistrées (id définitif compris). Les lots passent par le thread unique de
+    database_sync_to_async : ils sont écrits dans leur ordre d'arrivée.
+    """
+
+    def __init__(self, delay=None, max_batch=None):
+        self.delay = ingestion_setting('DELAY') if delay is None else delay
+        self.max_batch = ingestion_setting('MAX_BATCH') if max_batch is None else max_batch
+        self.pending = {}
+        self.timers = {}
+        self.writes = set()
+
+    async def submit(self, group_id, sender, content):
+        if not self.delay:
+            return (await database_sync_to_async(persist_messages)(group_id, [(sender, content)]))[0]
+        future = asyncio.get_running_loop().create_future()
+        batch = self.pending.setdefault(group_id, [])
+        batch.append((sender, content, future))
+        if len(batch) >= self.max_batch:
+            self.flush(group_id)
+        elif group_id not in self.timers:
+            self.timers[group_id] = asyncio.get_running_loop().call_later(self.delay, self.flush, group_id)
+        return await future
+
+    def flush(self, group_id):
+        """Lance l'écriture du lot en attente du groupe"""
+        timer = self.timers.pop(group_id, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self.pending.pop(group_id, None)
+        if batch:
+            write = asyncio.ensure_future(self._write(group_id, batch))
+            self.writes.add(write)
+            write.add_done_callback(self.writes.discard)
+
+    async def drain(self):
+        """Écrit tous les lots en attente et attend la fin des écritures"""
+        for group_id in list(self.pending):
+            self.flush(group_id)
+        await asyncio.gather(*self.writes, return_exceptions=True)
+
+    async def _write(self, group_id, batch):
+        try:
+            messages = await database_sync_to_async(persist_messages)(
+                group_id, [(sender, content) for sender, content, _ in batch],
+            )
+        except IntegrityError as exc:
+            if len(batch) == 1:
+                self._fail(batch, exc)
+                return
+            # Un message fautif (expéditeur supprimé pendant la rafale…) annule tout le lot :
+            # les messages sont réécrits un par un, seul son expéditeur reçoit l'erreur
+            for item in batch:
+                await self._write(group_id, [item])
+            return
+        except Exception as exc:
+            self._fail(batch, exc)
+            return
+        # Un expéditeur déconnecté entre-temps a abandonné son futur : le message reste enregistré
+        for (*_, future), message in zip(batch, messages):
+            if not future.done():
+                future.set_result(message)
+
+    @staticmethod
+    def _fail(batch, exc):
+        for *_, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+
+_coalescers = weakref.WeakKeyDictionary()
+
+
+def get_coalescer():
+    """Regroupeur de la boucle asyncio courante (les futurs sont propres à une boucle)"""
+    loop = asyncio.get_running_loop()
+    if loop not in _coalescers:
+        _coalescers[loop] = MessageCoalescer()
+    return _coalescers[loop]
@@ -0,0 +1,74 @@
+import json
+import statistics
+import time
+from base64 import b64encode
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.events.models import EventType, Event
+from apps.events.pagination import CursorEncoder
+from apps.messaging.models import Message, MessageGroup
+from apps.messaging.pagination import MessageCursorPagination
+from apps.users.models import User
+
+class Command(BaseCommand):
+    help = 'Mesure la latence d\'une page d\'historique selon sa profondeur (curseur contre OFFSET)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000000, help='Messages dans le groupe')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20, help='Mesures par profondeur (médiane affichée)')
+
+    def handle(self, *args, **options):
+        count, page_size = options['messages'], options['page_size']
+        user, _ = User.objects.get_or_create(email='bench-history@example.com', defaults={'username': 'bench-history'})
+        event_type, _ = EventType.objects.get_or_create(name='Benchmark')
+        event = Event.objects.create(title='Benchmark historique', event_type=event_type,
+                                     start_date=timezone.now(), created_by=user)
+        group = MessageGroup.objects.create(name='Benchmark', event=event, created_by=user)
+        try:
+            start = time.perf_counter()
+            for offset in range(0, count, 10000):
+                Message.objects.bulk_create(
+                    Message(group=group, sender=user, content=f'Message {index}')
+                    for index in range(offset, min(offset + 10000, count))
+                )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE messaging_message')
+            self.stdout.write(f'{count} messages créés en {time.perf_counter() - start:.1f} s')
+
+            queryset = (Message.objects.filter(group=group).select_related('sender')
+                        .only('group', 'content', 'sent_at', 'sender__username'))
+            ordered = queryset.order_by('-sent_at', '-id')
+            factory = APIRequestFactory()
+            for depth in sorted({0, count // 100, count // 10, count // 2, count * 9 // 10, count - page_size}):
+                if depth < 0 or depth >= count:
+                    continue
+                params = {'page_size': page_size}
+                if depth:
+                    # Position de la ligne précédant la page (requête hors mesure)
+                    position = list(ordered.values_list('sent_at', 'id')[depth - 1])
+                    payload = json.dumps({'p': position, 'r': 0}, cls=CursorEncoder)
+                    params['cursor'] = b64encode(payload.encode('utf-8')).decode('ascii')
+                request = Request(factory.get('/history/', params, SERVER_NAME='localhost'))
+
+                keyset = self.median(options['repeat'], lambda: MessageCursorPagination().paginate_queryset(queryset, request))
+                offset = self.median(options['repeat'], lambda: list(ordered[depth:depth + page_size]))
+                self.stdout.write(f'profondeur {depth:>9} : curseur {keyset:7.2f} ms   OFFSET {offset:8.2f} ms')
+        finally:
+            # Aucune cascade depuis Message : la suppression part en un seul DELETE
+            Message.objects.filter(group=group).delete()
+            user.delete()
+
+    @staticmethod
+    def median(repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
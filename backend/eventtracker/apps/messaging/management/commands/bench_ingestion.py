@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.events.models import EventType, Event
+from apps.messaging.ingest import MessageCoalescer
+from apps.messaging.models import Message, MessageGroup, MessageGroupMember
+from apps.users.models import User
+
+class Command(BaseCommand):
+    help = 'Compare le débit d\'écriture des messages en rafale : une insertion par message contre lots regroupés'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--senders', type=int, default=300, help='Expéditeurs simultanés dans le groupe')
+        parser.add_argument('--messages', type=int, default=10, help='Messages par expéditeur')
+        parser.add_argument('--delay', type=float, default=0.005, help='Fenêtre de regroupement (s)')
+        parser.add_argument('--max-batch', type=int, default=200)
+
+    def handle(self, *args, **options):
+        owner, _ = User.objects.get_or_create(email='bench-ingest@example.com', defaults={'username': 'bench-ingest'})
+        event_type, _ = EventType.objects.get_or_create(name='Benchmark')
+        event = Event.objects.create(title='Benchmark rafale', event_type=event_type,
+                                     start_date=timezone.now(), created_by=owner)
+        users = User.objects.bulk_create([
+            User(username=f'bench-ingest-{index}', email=f'bench-ingest-{index}@example.com')
+            for index in range(options['senders'])
+        ])
+        try:
+            group = MessageGroup.objects.create(name='Benchmark', event=event, created_by=owner)
+            MessageGroupMember.objects.bulk_create([MessageGroupMember(group=group, user=user) for user in users])
+            total = len(users) * options['messages']
+            for label, coalescer in (
+                ('une insertion par message', lambda: MessageCoalescer(delay=0)),
+                ('lots regroupés', lambda: MessageCoalescer(delay=options['delay'], max_batch=options['max_batch'])),
+            ):
+                elapsed = asyncio.run(self.burst(coalescer(), group.pk, users, options['messages']))
+                stored = Message.objects.filter(group=group).count()
+                if stored != total:
+                    raise RuntimeError(f'{stored} messages enregistrés sur {total}')
+                Message.objects.filter(group=group).delete()
+                self.stdout.write(f'{label:>26} : {total} messages en {elapsed:.2f} s ({total / elapsed:.0f} messages/s)')
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            owner.delete()
+
+    @staticmethod
+    async def burst(coalescer, group_id, users, messages):
+        # Comme un socket, chaque expéditeur attend l'accusé d'un message avant d'envoyer le suivant
+        async def sender(user):
+            for index in range(messages):
+                await coalescer.submit(group_id, user, f'Message {index} de {user.username}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(sender(user) for user in users))
+        return time.perf_counter() - start
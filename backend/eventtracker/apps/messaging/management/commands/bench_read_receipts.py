@@ -0,0 +1,110 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from apps.events.models import EventType, Event
+from apps.messaging.models import Message, MessageGroup, MessageGroupMember
+from apps.messaging.receipts import mark_read, readers
+from apps.users.models import User
+
+# Ancien schéma (une ligne par message et par lecteur), recréé dans une table temporaire
+RECEIPTS_TABLE = '''
+    CREATE TEMPORARY TABLE bench_readreceipt (
+        id bigserial PRIMARY KEY,
+        read_at timestamptz NOT NULL,
+        message_id bigint NOT NULL,
+        user_id bigint NOT NULL,
+        UNIQUE (message_id, user_id)
+    )
+'''
+
+class Command(BaseCommand):
+    help = 'Compare stockage et latence des confirmations de lecture par message et du filigrane par membre'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=300, help='Membres du groupe')
+        parser.add_argument('--messages', type=int, default=10000, help='Messages dans le groupe')
+        parser.add_argument('--unread', type=int, default=1000, help='Messages non lus rattrapés à chaque « marquer comme lu »')
+        parser.add_argument('--repeat', type=int, default=20, help='Mesures par opération (médiane affichée)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Ce benchmark mesure la taille des tables : PostgreSQL requis.')
+        members_count, count, unread = options['members'], options['messages'], options['unread']
+        owner, _ = User.objects.get_or_create(email='bench-read@example.com', defaults={'username': 'bench-read'})
+        event_type, _ = EventType.objects.get_or_create(name='Benchmark')
+        event = Event.objects.create(title='Benchmark lecture', event_type=event_type,
+                                     start_date=timezone.now(), created_by=owner)
+        users = User.objects.bulk_create([
+            User(username=f'bench-read-{index}', email=f'bench-read-{index}@example.com') for index in range(members_count)
+        ])
+        try:
+            group = MessageGroup.objects.create(name='Benchmark', event=event, created_by=owner)
+            MessageGroupMember.objects.bulk_create([MessageGroupMember(group=group, user=user) for user in users])
+            for offset in range(0, count, 10000):
+                Message.objects.bulk_create(
+                    Message(group=group, sender=owner, content=f'Message {index}')
+                    for index in range(offset, min(offset + 10000, count))
+                )
+            ids = list(Message.objects.filter(group=group).order_by('pk').values_list('pk', flat=True))
+            read_up_to = ids[max(count - unread, 1) - 1]
+            self.stdout.write(f'{members_count} membres, {count} messages, {unread} non lus par membre')
+
+            with connection.cursor() as cursor:
+                # Avant : une confirmation par message déjà lu, pour chaque membre
+                cursor.execute(RECEIPTS_TABLE)
+                start = time.perf_counter()
+                cursor.execute('''
+                    INSERT INTO bench_readreceipt (read_at, message_id, user_id)
+                    SELECT now(), message.id, member.user_id
+                    FROM messaging_message message JOIN messaging_messagegroupmember member
+                        ON member.group_id = message.group_id
+                    WHERE message.group_id = %s AND message.id <= %s
+                ''', [group.pk, read_up_to])
+                cursor.execute('ANALYZE bench_readreceipt')
+                cursor.execute("SELECT count(*), pg_total_relation_size('bench_readreceipt') FROM bench_readreceipt")
+                rows, receipts_size = cursor.fetchone()
+                self.stdout.write(f'avant : {rows} confirmations, {receipts_size / 2 ** 20:.1f} Mio '
+                                  f'(remplies en {time.perf_counter() - start:.1f} s)')
+
+                # Après : le filigrane est porté par les lignes de membres existantes
+                MessageGroupMember.objects.filter(group=group).update(
+                    last_read_message_id=read_up_to, last_read_at=timezone.now())
+                cursor.execute('ANALYZE messaging_messagegroupmember')
+                cursor.execute(
+                    "SELECT pg_column_size(ROW(last_read_message_id, last_read_at)) FROM messaging_messagegroupmember "
+                    "WHERE group_id = %s LIMIT 1", [group.pk])
+                watermark_bytes = cursor.fetchone()[0] * members_count
+                self.stdout.write(f'après : {members_count} filigranes, ~{watermark_bytes / 2 ** 10:.1f} Kio '
+                                  f'dans messaging_messagegroupmember')
+
+                sample = users[:options['repeat']]
+                old_mark = self.timed(sample, lambda user: cursor.execute('''
+                    INSERT INTO bench_readreceipt (read_at, message_id, user_id)
+                    SELECT now(), id, %s FROM messaging_message WHERE group_id = %s
+                    ON CONFLICT (message_id, user_id) DO NOTHING
+                ''', [user.pk, group.pk]))
+                new_mark = self.timed(sample, lambda user: mark_read(group.pk, user))
+                self.stdout.write(f'marquer comme lu : confirmations {old_mark:8.2f} ms   filigrane {new_mark:8.2f} ms')
+
+                messages = list(Message.objects.filter(pk__in=ids[::max(count // options['repeat'], 1)]))
+                old_readers = self.timed(messages, lambda message: cursor.execute(
+                    'SELECT user_id, read_at FROM bench_readreceipt WHERE message_id = %s', [message.pk]
+                ) or cursor.fetchall())
+                new_readers = self.timed(messages, lambda message: list(readers(message).values_list('user_id', 'last_read_at')))
+                self.stdout.write(f'qui a lu le message : confirmations {old_readers:8.2f} ms   filigrane {new_readers:8.2f} ms')
+                cursor.execute('DROP TABLE bench_readreceipt')
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            owner.delete()
+
+    @staticmethod
+    def timed(items, func):
+        timings = []
+        for item in items:
+            start = time.perf_counter()
+            func(item)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
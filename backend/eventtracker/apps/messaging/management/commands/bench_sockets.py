@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from apps.events.models import EventType, Event
+from apps.messaging.models import MessageGroup, MessageGroupMember
+from apps.users.models import User
+
+class Command(BaseCommand):
+    help = 'Ouvre de nombreux WebSockets de discussion dans un seul processus et mesure la diffusion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', type=int, default=1000, help='Connexions simultanées')
+        parser.add_argument('--groups', type=int, default=10, help='Groupes de discussion (sockets répartis)')
+        parser.add_argument('--messages', type=int, default=5, help='Messages envoyés par groupe')
+
+    def handle(self, *args, **options):
+        sockets, groups_count = options['sockets'], options['groups']
+        owner, _ = User.objects.get_or_create(email='bench-sockets@example.com', defaults={'username': 'bench-sockets'})
+        event_type, _ = EventType.objects.get_or_create(name='Benchmark')
+        event = Event.objects.create(title='Benchmark discussion', event_type=event_type,
+                                     start_date=timezone.now(), created_by=owner)
+        users = User.objects.bulk_create([
+            User(username=f'bench-socket-{index}', email=f'bench-socket-{index}@example.com') for index in range(sockets)
+        ])
+        try:
+            groups = MessageGroup.objects.bulk_create([
+                MessageGroup(name=f'Groupe {index}', event=event, created_by=owner) for index in range(groups_count)
+            ])
+            MessageGroupMember.objects.bulk_create([
+                MessageGroupMember(group=groups[index % groups_count], user=user) for index, user in enumerate(users)
+            ])
+            tokens = Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+            plan = [(groups[index % groups_count].pk, token.key) for index, token in enumerate(tokens)]
+            results = asyncio.run(self.run(plan, groups_count, options['messages']))
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            owner.delete()
+
+        connect_time, fanout_time, delivered = results
+        self.stdout.write(self.style.SUCCESS(
+            f'{sockets} sockets connectés en {connect_time:.2f} s ({sockets / connect_time:.0f}/s) ; '
+            f'{delivered} messages livrés en {fanout_time:.2f} s ({delivered / fanout_time:.0f} livraisons/s)'
+        ))
+
+    async def run(self, plan, groups_count, messages):
+        from eventtracker.asgi import application
+
+        communicators = [
+            WebsocketCommunicator(application, f'/ws/messaging/groups/{group_id}/?token={key}')
+            for group_id, key in plan
+        ]
+        start = time.perf_counter()
+        connected = await asyncio.gather(*(communicator.connect(timeout=60) for communicator in communicators))
+        connect_time = time.perf_counter() - start
+        if not all(ok for ok, _ in connected):
+            raise RuntimeError('Certaines connexions ont été refusées')
+
+        # Un émetteur par groupe ; chaque membre doit recevoir tous les messages de son groupe
+        senders = {}
+        for communicator, (group_id, _) in zip(communicators, plan):
+            senders.setdefault(group_id, communicator)
+
+        async def drain(communicator):
+            for _ in range(messages):
+                await communicator.receive_json_from(timeout=60)
+            return messages
+
+        start = time.perf_counter()
+        receivers = [asyncio.ensure_future(drain(communicator)) for communicator in communicators]
+        for index in range(messages):
+            await asyncio.gather(*(sender.send_json_to({'content': f'Message {index}'}) for sender in senders.values()))
+        delivered = sum(await asyncio.gather(*receivers))
+        fanout_time = time.perf_counter() - start
+
+        await asyncio.gather(*(communicator.disconnect() for communicator in communicators))
+        return connect_time, fanout_time, delivered
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apps.messaging.models import MessageGroupMember
+from apps.messaging.receipts import repair_unread_counts
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de messages non lus des membres depuis leurs filigranes de lecture'
+
+    def add_arguments(self, parser):
+        parser.add_argument('groups', nargs='*', type=int, help='Groupes à recalculer (tous par défaut)')
+
+    def handle(self, *args, **options):
+        members = MessageGroupMember.objects.all()
+        if options['groups']:
+            members = members.filter(group_id__in=options['groups'])
+        drifted = repair_unread_counts(members)
+        self.stdout.write(self.style.SUCCESS(f'{members.count()} membre(s) vérifié(s), {drifted} compteur(s) corrigé(s)'))
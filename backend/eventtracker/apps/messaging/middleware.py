@@ -0,0 +1,35 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authtoken.models import Token
+
+
+@database_sync_to_async
+def get_token_user(key):
+    token = Token.objects.select_related('user').filter(key=key).first()
+    if token is None or not token.user.is_active:
+        return AnonymousUser()
+    return token.user
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """Authentifie les WebSockets avec le jeton DRF existant.
+
+    Le jeton est lu dans l'en-tête « Authorization: Token <clé> » ou, pour les clients qui ne
+    peuvent pas fixer d'en-tête à l'ouverture du socket, dans le paramètre ``?token=<clé>``.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        key = None
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                keyword, _, credentials = value.decode('latin-1').partition(' ')
+                if keyword.lower() == 'token':
+                    key = credentials.strip()
+        if key is None:
+            key = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token', [None])[0]
+        scope['user'] = await get_token_user(key) if key else AnonymousUser()
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['group', 'sent_at', 'id'], name='message_group_sent_idx'),
+        ),
+    ]
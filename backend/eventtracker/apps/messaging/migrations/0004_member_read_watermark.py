@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:21
+
+from django.db import migrations, models
+from django.db.models import Max
+import django.db.models.deletion
+
+
+def collapse_read_receipts(apps, schema_editor):
+    # Un filigrane par membre : le plus grand message lu dans le groupe et la dernière lecture.
+    # Les messages antérieurs non lus sont désormais considérés comme lus.
+    ReadReceipt = apps.get_model('messaging', 'ReadReceipt')
+    MessageGroupMember = apps.get_model('messaging', 'MessageGroupMember')
+    rows = ReadReceipt.objects.order_by().values('message__group_id', 'user_id').annotate(
+        last_message=Max('message_id'), last_read=Max('read_at'),
+    )
+    watermarks = {(row['message__group_id'], row['user_id']): row for row in rows}
+    members = []
+    queryset = MessageGroupMember.objects.filter(group_id__in={group_id for group_id, _ in watermarks})
+    for member in queryset.only('group_id', 'user_id').iterator(chunk_size=2000):
+        row = watermarks.get((member.group_id, member.user_id))
+        if row is not None:
+            member.last_read_message_id, member.last_read_at = row['last_message'], row['last_read']
+            members.append(member)
+    MessageGroupMember.objects.bulk_update(members, ['last_read_message', 'last_read_at'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_message_group_sent_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagegroupmember',
+            name='last_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='messagegroupmember',
+            name='last_read_message',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='messaging.message'),
+        ),
+        migrations.RunPython(collapse_read_receipts, migrations.RunPython.noop),
+    ]
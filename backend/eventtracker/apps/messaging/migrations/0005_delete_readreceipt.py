@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_member_read_watermark'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ReadReceipt',
+        ),
+    ]
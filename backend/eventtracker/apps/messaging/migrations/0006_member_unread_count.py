@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    # Messages des autres membres au-delà du filigrane de chaque membre, en un UPDATE
+    Message = apps.get_model('messaging', 'Message')
+    MessageGroupMember = apps.get_model('messaging', 'MessageGroupMember')
+    unread = (Message.objects.filter(group_id=OuterRef('group_id'),
+                                     pk__gt=Coalesce(OuterRef('last_read_message_id'), Value(0)))
+              .exclude(sender_id=OuterRef('user_id'))
+              .order_by().values('group_id').annotate(count=Count('pk')).values('count'))
+    MessageGroupMember.objects.update(unread_count=Coalesce(Subquery(unread), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_delete_readreceipt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagegroupmember',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
@@ -14,11 +14,34 @@ class MessageGroup(models.Model):
     def __str__(self):
         return self.name
 
+class MessageGroupMemberQuerySet(models.QuerySet):
+    """Les membres ajoutés en masse partent, comme les autres, du dernier message du groupe"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .receipts import latest_messages
+
+        objs = list(objs)
+        joining = [member for member in objs if member.last_read_message_id is None]
+        if joining:
+            latest = latest_messages(member.group_id for member in joining)
+            for member in joining:
+                member.last_read_message_id = latest.get(member.group_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
 class MessageGroupMember(models.Model):
     group = models.ForeignKey(MessageGroup, on_delete=models.CASCADE, related_name='members')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     joined_at = models.DateTimeField(auto_now_add=True)
     is_admin = models.BooleanField(default=False)
+    # Filigrane de lecture : tous les messages du groupe d'id inférieur ou égal sont lus.
+    # Sans contrainte en base : la suppression d'un message ne fait pas reculer le filigrane.
+    last_read_message = models.ForeignKey('Message', on_delete=models.DO_NOTHING, db_constraint=False,
+                                          null=True, blank=True, related_name='+')
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    # Messages des autres membres au-delà du filigrane, tenu à jour à l'envoi et à la lecture
+    unread_count = models.PositiveIntegerField(default=0)
+
+    objects = MessageGroupMemberQuerySet.as_manager()
     
     class Meta:
         unique_together = ('group', 'user')
@@ -31,17 +54,12 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     sent_at = models.DateTimeField(auto_now_add=True)
-    
-    def __str__(self):
-        return f"Message de {self.sender.username} dans {self.group.name}"
 
-class ReadReceipt(models.Model):
-    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='read_receipts')
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    read_at = models.DateTimeField(auto_now_add=True)
-    
     class Meta:
-        unique_together = ('message', 'user')
+        indexes = [
+            # Historique d'un groupe paginé par curseur sur (sent_at, id), dans les deux sens
+            models.Index(fields=['group', 'sent_at', 'id'], name='message_group_sent_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} a lu le message {self.message.id}"
\ No newline at end of file
+        return f"Message de {self.sender.username} dans {self.group.name}"
@@ -0,0 +1,8 @@
+from apps.events.pagination import KeysetPagination
+
+
+class MessageCursorPagination(KeysetPagination):
+    """Historique du plus récent au plus ancien : « next » remonte le temps, « previous » revient vers le présent"""
+    ordering = ('-sent_at', '-id')
+    page_size = 50
+    max_page_size = 200
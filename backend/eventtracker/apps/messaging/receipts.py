@@ -0,0 +1,92 @@
+from collections import Counter
+
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Message, MessageGroup, MessageGroupMember
+
+# Une confirmation de lecture par (message, membre) grossit comme messages × membres ; chaque
+# membre garde à la place un filigrane, le dernier message lu du groupe. Les ids croissent
+# avec l'envoi : un message est lu par un membre si son id ne dépasse pas le filigrane.
+# Le nombre de non-lus est un compteur du membre, incrémenté à l'envoi et remis à jour à la
+# lecture : la liste des discussions ne compte jamais les messages.
+
+
+def _unread_after(watermark, upto=None):
+    """Nombre de messages des autres membres d'id supérieur à ``watermark`` (et au plus ``upto``),
+    pour le membre de la requête externe"""
+    unread = (Message.objects.filter(group_id=OuterRef('group_id'), pk__gt=watermark)
+              .exclude(sender_id=OuterRef('user_id')))
+    if upto is not None:
+        unread = unread.filter(pk__lte=upto)
+    return Coalesce(Subquery(
+        unread.order_by().values('group_id').annotate(count=Count('pk')).values('count')
+    ), Value(0))
+
+
+def mark_read(group_id, user, message_id=None):
+    """Avance le filigrane du membre jusqu'à ``message_id`` (par défaut le dernier message), en un UPDATE.
+
+    Le filigrane ne recule jamais. Le compteur de non-lus perd les messages passés sous le
+    filigrane (entre l'ancien et le nouveau) plutôt que d'être recalculé : si l'UPDATE attend le
+    verrou d'un envoi concurrent (count_sent), les sous-requêtes voient l'état du début de
+    l'instruction, mais le compteur relu après l'attente garde l'incrément du nouveau message.
+    Retourne 1 si le filigrane a avancé, 0 sinon (message inconnu, déjà lu ou utilisateur non membre).
+    """
+    messages = Message.objects.filter(group_id=group_id)
+    if message_id is not None:
+        messages = messages.filter(pk=message_id)
+    # Dernier message dans l'ordre de l'historique : lu par l'index (group, sent_at, id)
+    target = Subquery(messages.order_by('-sent_at', '-pk').values('pk')[:1])
+    read_now = _unread_after(Coalesce(OuterRef('last_read_message_id'), Value(0)), upto=target)
+    return MessageGroupMember.objects.filter(
+        Exists(messages), Q(last_read_message__isnull=True) | Q(last_read_message__lt=target),
+        group_id=group_id, user=user,
+    ).update(
+        last_read_message=target, last_read_at=timezone.now(),
+        unread_count=Greatest(F('unread_count') - read_now, Value(0)),
+    )
+
+
+def latest_messages(group_ids):
+    """Dernier message de chaque groupe : filigrane d'un nouveau membre, pour qui l'historique
+    antérieur à son arrivée n'est pas « non lu » (comme le compteur, parti de zéro)"""
+    latest = Message.objects.filter(group_id=OuterRef('pk')).order_by('-sent_at', '-pk').values('pk')[:1]
+    return dict(MessageGroup.objects.filter(pk__in=set(group_ids)).annotate(latest=Subquery(latest))
+                .values_list('pk', 'latest'))
+
+
+def count_sent(group_id, sender_ids):
+    """Ajoute des messages envoyés (un expéditeur par message) aux compteurs des autres membres, en un UPDATE"""
+    per_sender, total = Counter(sender_ids), len(sender_ids)
+    # Chaque membre compte les messages du lot, sauf les siens
+    increment = Case(*[When(user_id=sender_id, then=Value(total - count)) for sender_id, count in per_sender.items()],
+                     default=Value(total))
+    return (MessageGroupMember.objects.filter(group_id=group_id)
+            .exclude(user_id__in=[sender_id for sender_id, count in per_sender.items() if count == total])
+            .update(unread_count=F('unread_count') + increment))
+
+
+def unread_counts(user):
+    """Non-lus de chaque groupe de l'utilisateur, lus dans les compteurs en une requête"""
+    return (MessageGroupMember.objects.filter(user=user)
+            .values('group_id', 'group__name', 'unread_count', 'last_read_message_id')
+            .order_by('group_id'))
+
+
+def repair_unread_counts(members=None):
+    """Recalcule les compteurs depuis les filigranes ; retourne le nombre de compteurs corrigés"""
+    members = MessageGroupMember.objects.all() if members is None else members
+    # Sans filigrane, tous les messages des autres membres sont non lus
+    actual = _unread_after(Coalesce(OuterRef('last_read_message_id'), Value(0)))
+    return members.alias(actual=actual).exclude(unread_count=F('actual')).update(unread_count=actual)
+
+
+def readers(message):
+    """Membres du groupe (hors expéditeur) dont le filigrane a atteint ``message``"""
+    return (MessageGroupMember.objects
+            .filter(group_id=message.group_id, last_read_message__gte=message.pk)
+            .exclude(user_id=message.sender_id)
+            .select_related('user').only('last_read_at', 'user__username')
+            .order_by('-last_read_at', 'pk'))
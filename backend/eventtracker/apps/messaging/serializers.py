@@ -0,0 +1,30 @@
+from rest_framework import serializers
+from .models import Message, MessageGroupMember
+
+
+class MessageSerializer(serializers.ModelSerializer):
+    sender_name = serializers.CharField(source='sender.username', read_only=True)
+
+    class Meta:
+        model = Message
+        fields = ['id', 'group', 'sender', 'sender_name', 'content', 'sent_at']
+        read_only_fields = ['group', 'sender', 'sent_at']
+
+
+class MarkReadSerializer(serializers.Serializer):
+    message = serializers.IntegerField(required=False, min_value=1)
+
+
+class MessageReaderSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = MessageGroupMember
+        fields = ['user', 'username', 'last_read_at']
+
+
+class UnreadCountSerializer(serializers.Serializer):
+    group = serializers.IntegerField(source='group_id')
+    name = serializers.CharField(source='group__name')
+    unread = serializers.IntegerField(source='unread_count')
+    last_read_message = serializers.IntegerField(source='last_read_message_id', allow_null=True)
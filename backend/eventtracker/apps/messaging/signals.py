@@ -0,0 +1,28 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from .consumers import group_channel
+from .models import MessageGroupMember
+from .receipts import latest_messages
+
+
+@receiver(pre_save, sender=MessageGroupMember)
+def start_watermark_at_join(sender, instance, **kwargs):
+    # L'historique antérieur à l'arrivée du membre n'est pas compté comme non lu
+    if instance._state.adding and instance.last_read_message_id is None:
+        instance.last_read_message_id = latest_messages([instance.group_id]).get(instance.group_id)
+
+
+@receiver(post_delete, sender=MessageGroupMember)
+def close_removed_member_sockets(sender, instance, **kwargs):
+    """Ferme les WebSockets d'un membre retiré du groupe : il ne lit ni n'écrit plus"""
+    group_id, user_id = instance.group_id, instance.user_id
+
+    def notify():
+        async_to_sync(get_channel_layer().group_send)(
+            group_channel(group_id), {'type': 'member.removed', 'user_id': user_id},
+        )
+    transaction.on_commit(notify)
@@ -1,3 +1,375 @@
-from django.test import TestCase
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from apps.events.models import EventType, Event
+from apps.users.models import User
+from eventtracker.testing import EndpointBudgetMixin
+from eventtracker.asgi import application
+from .ingest import MessageCoalescer, persist_messages
+from .receipts import mark_read, repair_unread_counts
+from .models import Message, MessageGroup, MessageGroupMember
+
+# Budgets par endpoint : nombre maximal de requêtes SQL et durée maximale (ms).
+# Toute régression (N+1, sérialisation plus lente) fait échouer la suite.
+ENDPOINT_BUDGETS = {
+    'messages-history': {'queries': 2, 'ms': 300},
+    'messages-history-next': {'queries': 2, 'ms': 300},
+    'messages-create': {'queries': 5, 'ms': 200},
+    'messages-read': {'queries': 1, 'ms': 200},
+    'messages-unread': {'queries': 1, 'ms': 200},
+    'messages-readers': {'queries': 3, 'ms': 200},
+}
+
+
+class GroupChatSocketTests(TransactionTestCase):
+    """Discussion de groupe par WebSocket : authentification par jeton, adhésion et diffusion"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='secret')
+        self.eve = User.objects.create_user(username='eve', email='eve@example.com', password='secret')
+        event = Event.objects.create(title='Mariage', event_type=EventType.objects.create(name='Mariage'),
+                                     start_date=timezone.now(), created_by=self.alice)
+        self.group = MessageGroup.objects.create(name='Témoins', event=event, created_by=self.alice)
+        MessageGroupMember.objects.bulk_create([
+            MessageGroupMember(group=self.group, user=self.alice, is_admin=True),
+            MessageGroupMember(group=self.group, user=self.bob),
+        ])
+        self.tokens = {user.username: Token.objects.create(user=user).key for user in (self.alice, self.bob, self.eve)}
+
+    def communicator(self, token=None, header=False):
+        path = f'/ws/messaging/groups/{self.group.pk}/'
+        headers = []
+        if token and header:
+            headers = [(b'authorization', f'Token {token}'.encode())]
+        elif token:
+            path += f'?token={token}'
+        return WebsocketCommunicator(application, path, headers=headers)
+
+    async def test_members_receive_each_message_once(self):
+        alice = self.communicator(self.tokens['alice'])
+        bob = self.communicator(self.tokens['bob'], header=True)
+        self.assertTrue((await alice.connect())[0])
+        self.assertTrue((await bob.connect())[0])
+
+        await alice.send_json_to({'content': 'Rendez-vous à 15 h'})
+        for communicator in (alice, bob):
+            event = await communicator.receive_json_from()
+            self.assertEqual(event['type'], 'message')
+            self.assertEqual((event['message']['content'], event['message']['sender_name']),
+                             ('Rendez-vous à 15 h', 'alice'))
+        self.assertTrue(await bob.receive_nothing())
+
+        unread = await database_sync_to_async(lambda: dict(
+            MessageGroupMember.objects.filter(group=self.group).values_list('user__username', 'unread_count')))()
+        self.assertEqual(unread, {'alice': 0, 'bob': 1})
+
+        await bob.send_json_to({'content': '   '})
+        self.assertEqual((await bob.receive_json_from())['type'], 'error')
+        self.assertTrue(await alice.receive_nothing())
+
+        await alice.disconnect()
+        await bob.disconnect()
+        count = await Message.objects.filter(group=self.group).acount()
+        self.assertEqual(count, 1)
+
+    async def test_burst_is_written_in_one_batch_and_acknowledged(self):
+        sockets = [self.communicator(self.tokens[name]) for name in ('alice', 'bob') * 3]
+        for socket in sockets:
+            self.assertTrue((await socket.connect())[0])
+
+        with mock.patch('apps.messaging.ingest.persist_messages', wraps=persist_messages) as persist:
+            for index, socket in enumerate(sockets):
+                await socket.send_json_to({'content': f'Rafale {index}', 'client_id': f'c{index}'})
+            acks = {}
+            for socket in sockets:
+                # Chaque socket reçoit son accusé puis les six messages diffusés
+                events = [await socket.receive_json_from() for _ in range(7)]
+                for event in events:
+                    if event['type'] == 'ack':
+                        acks[event['client_id']] = event['id']
+                self.assertEqual([event['type'] for event in events].count('message'), 6)
+        self.assertEqual(persist.call_count, 1)
+
+        # Chaque accusé porte l'id définitif, et l'historique (sent_at, id) suit l'ordre des ids
+        stored = [message async for message in Message.objects.filter(group=self.group).order_by('sent_at', 'id')
+                  .values_list('id', 'content')]
+        self.assertEqual(sorted(stored), stored)
+        self.assertEqual(dict(stored), {acks[f'c{index}']: f'Rafale {index}' for index in range(6)})
+        unread = await database_sync_to_async(lambda: dict(
+            MessageGroupMember.objects.filter(group=self.group).values_list('user__username', 'unread_count')))()
+        self.assertEqual(unread, {'alice': 3, 'bob': 3})
+        for socket in sockets:
+            await socket.disconnect()
+
+    async def test_failing_message_does_not_fail_its_batch(self):
+        ghost = User(pk=self.eve.pk + 1000, username='fantome')
+        coalescer = MessageCoalescer(delay=0.01)
+        with mock.patch('apps.messaging.ingest.persist_messages', wraps=persist_messages) as persist:
+            results = await asyncio.gather(
+                coalescer.submit(self.group.pk, self.alice, 'Premier'),
+                coalescer.submit(self.group.pk, ghost, 'Expéditeur supprimé'),
+                coalescer.submit(self.group.pk, self.bob, 'Second'),
+                return_exceptions=True,
+            )
+        # Le lot échoue, puis chaque message est réécrit seul
+        self.assertEqual(persist.call_count, 4)
+        self.assertIsInstance(results[1], IntegrityError)
+        self.assertEqual([results[0]['content'], results[2]['content']], ['Premier', 'Second'])
+        contents = [content async for content in Message.objects.filter(group=self.group)
+                    .order_by('id').values_list('content', flat=True)]
+        self.assertEqual(contents, ['Premier', 'Second'])
+
+    async def test_removed_member_is_disconnected(self):
+        alice, bob = self.communicator(self.tokens['alice']), self.communicator(self.tokens['bob'])
+        self.assertTrue((await alice.connect())[0])
+        self.assertTrue((await bob.connect())[0])
+        await MessageGroupMember.objects.filter(group=self.group, user=self.bob).adelete()
+        self.assertEqual(await bob.receive_output(), {'type': 'websocket.close', 'code': 4403})
+
+        await alice.send_json_to({'content': 'Bob est parti'})
+        self.assertEqual((await alice.receive_json_from())['type'], 'message')
+        await alice.disconnect()
+
+    async def test_anonymous_and_non_members_are_rejected(self):
+        connected, code = await self.communicator().connect()
+        self.assertEqual((connected, code), (False, 4401))
+        connected, code = await self.communicator('jeton-invalide').connect()
+        self.assertEqual((connected, code), (False, 4401))
+        connected, code = await self.communicator(self.tokens['eve']).connect()
+        self.assertEqual((connected, code), (False, 4403))
+
+
+class MessageHistoryTests(EndpointBudgetMixin, TestCase):
+    """Historique paginé par curseur (sent_at, id) dans les deux sens"""
+    budgets = ENDPOINT_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='lecteur', email='lecteur@example.com', password='secret')
+        event = Event.objects.create(title='Salon', event_type=EventType.objects.create(name='Salon'),
+                                     start_date=timezone.now(), created_by=cls.user)
+        cls.group = MessageGroup.objects.create(name='Exposants', event=event, created_by=cls.user)
+        MessageGroupMember.objects.create(group=cls.group, user=cls.user)
+        messages = Message.objects.bulk_create([
+            Message(group=cls.group, sender=cls.user, content=f'Message {index}') for index in range(120)
+        ])
+        # Quelques messages partagent la même date : l'id départage
+        start = timezone.now() - timedelta(days=1)
+        for index, message in enumerate(messages):
+            message.sent_at = start + timedelta(seconds=index // 3)
+        Message.objects.bulk_update(messages, ['sent_at'])
+        cls.ids = [message.pk for message in messages]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_backward_then_forward(self):
+        url = f'/api/messaging/groups/{self.group.pk}/messages/?page_size=25'
+        response = self.measure('messages-history', 'get', url)
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(set(response.data['results'][0]), {'id', 'group', 'sender', 'sender_name', 'content', 'sent_at'})
+        pages = [response.data]
+        while response.data['next']:
+            response = self.measure('messages-history-next', 'get', response.data['next'])
+            pages.append(response.data)
+        seen = [message['id'] for page in pages for message in page['results']]
+        self.assertEqual(seen, self.ids[::-1])
+
+        # Retour vers les messages récents depuis la dernière page
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual([message['id'] for message in response.data['results']],
+                         [message['id'] for message in pages[-2]['results']])
+
+    def test_send_and_membership(self):
+        url = f'/api/messaging/groups/{self.group.pk}/messages/'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.measure('messages-create', 'post', url, {'content': 'Bonjour'}, expected_status=201)
+        self.assertEqual(response.data['sender_name'], 'lecteur')
+
+        outsider = User.objects.create_user(username='dehors', email='dehors@example.com', password='secret')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.post(url, {'content': 'Intrus'}).status_code, 404)
+
+
+class ReadWatermarkTests(EndpointBudgetMixin, TestCase):
+    """Lecture suivie par un filigrane par membre au lieu d'une confirmation par message"""
+    budgets = ENDPOINT_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        cls.bob = User.objects.create_user(username='bob', email='bob@example.com', password='secret')
+        cls.carol = User.objects.create_user(username='carol', email='carol@example.com', password='secret')
+        event = Event.objects.create(title='Gala', event_type=EventType.objects.create(name='Gala'),
+                                     start_date=timezone.now(), created_by=cls.alice)
+        cls.group = MessageGroup.objects.create(name='Bénévoles', event=event, created_by=cls.alice)
+        MessageGroupMember.objects.bulk_create([
+            MessageGroupMember(group=cls.group, user=user) for user in (cls.alice, cls.bob, cls.carol)
+        ])
+        cls.messages = Message.objects.bulk_create([
+            Message(group=cls.group, sender=cls.alice, content=f'Consigne {index}') for index in range(5)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+        self.read_url = f'/api/messaging/groups/{self.group.pk}/read/'
+
+    def watermark(self, user):
+        return MessageGroupMember.objects.get(group=self.group, user=user).last_read_message_id
+
+    def test_mark_read_moves_watermark_forward_only(self):
+        self.measure('messages-read', 'post', self.read_url, {'message': self.messages[3].pk}, expected_status=204)
+        self.assertEqual(self.watermark(self.bob), self.messages[3].pk)
+
+        # Un message plus ancien ne fait pas reculer le filigrane
+        self.assertEqual(self.client.post(self.read_url, {'message': self.messages[1].pk}).status_code, 204)
+        self.assertEqual(self.watermark(self.bob), self.messages[3].pk)
+
+        # Sans message précisé, tout le groupe est lu
+        self.measure('messages-read', 'post', self.read_url, expected_status=204)
+        self.assertEqual(self.watermark(self.bob), self.messages[-1].pk)
+        self.assertIsNone(self.watermark(self.carol))
+
+    def test_mark_read_rejects_foreign_message_and_outsiders(self):
+        other = MessageGroup.objects.create(name='Autre', event=self.group.event, created_by=self.alice)
+        foreign = Message.objects.create(group=other, sender=self.alice, content='Ailleurs')
+        self.assertEqual(self.client.post(self.read_url, {'message': foreign.pk}).status_code, 400)
+        self.assertIsNone(self.watermark(self.bob))
+
+        self.client.force_authenticate(User.objects.create_user(username='dehors', email='dehors@example.com'))
+        self.assertEqual(self.client.post(self.read_url).status_code, 404)
+
+    def test_readers_compare_watermarks(self):
+        target = self.messages[2]
+        MessageGroupMember.objects.filter(group=self.group, user=self.bob).update(
+            last_read_message=self.messages[4], last_read_at=timezone.now())
+        MessageGroupMember.objects.filter(group=self.group, user=self.carol).update(
+            last_read_message=self.messages[1], last_read_at=timezone.now())
+        url = f'/api/messaging/groups/{self.group.pk}/messages/{target.pk}/readers/'
+        response = self.measure('messages-readers', 'get', url)
+        self.assertEqual([reader['username'] for reader in response.data], ['bob'])
+
+        # Un message supprimé ne fait pas reculer le filigrane qui le désigne
+        last = self.messages[4].pk
+        Message.objects.filter(pk=last).delete()
+        self.assertEqual(self.watermark(self.bob), last)
+        self.assertEqual(self.client.get(url).data[0]['username'], 'bob')
+
+
+class UnreadCountTests(EndpointBudgetMixin, TestCase):
+    """Compteurs de non-lus par membre : incrémentés à l'envoi, remis à jour à la lecture"""
+    budgets = ENDPOINT_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        cls.bob = User.objects.create_user(username='bob', email='bob@example.com', password='secret')
+        event = Event.objects.create(title='Gala', event_type=EventType.objects.create(name='Gala'),
+                                     start_date=timezone.now(), created_by=cls.alice)
+        cls.groups = MessageGroup.objects.bulk_create([
+            MessageGroup(name=name, event=event, created_by=cls.alice) for name in ('Bénévoles', 'Traiteur', 'Son')
+        ])
+        MessageGroupMember.objects.bulk_create([
+            MessageGroupMember(group=group, user=user) for group in cls.groups for user in (cls.alice, cls.bob)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def send(self, group, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [self.client.post(f'/api/messaging/groups/{group.pk}/messages/', {'content': f'Message {index}'}).data['id']
+                    for index in range(count)]
+
+    def unread(self, user):
+        self.client.force_authenticate(user)
+        return self.measure('messages-unread', 'get', '/api/messaging/groups/unread/').data
+
+    def test_counts_follow_sends_and_reads(self):
+        ids = self.send(self.groups[0], 4)
+        self.send(self.groups[1], 2)
+        data = self.unread(self.bob)
+        self.assertEqual(data['total'], 6)
+        self.assertEqual([(group['name'], group['unread']) for group in data['groups']],
+                         [('Bénévoles', 4), ('Traiteur', 2), ('Son', 0)])
+        self.assertEqual(self.unread(self.alice)['total'], 0)
+
+        # Lecture jusqu'au deuxième message : il en reste deux
+        self.client.force_authenticate(self.bob)
+        self.client.post(f'/api/messaging/groups/{self.groups[0].pk}/read/', {'message': ids[1]})
+        self.client.post(f'/api/messaging/groups/{self.groups[1].pk}/read/')
+        self.assertEqual([group['unread'] for group in self.unread(self.bob)['groups']], [2, 0, 0])
+
+    def test_repair_command_recomputes_from_watermarks(self):
+        ids = self.send(self.groups[0], 3)
+        MessageGroupMember.objects.filter(user=self.bob, group=self.groups[0]).update(last_read_message=ids[0])
+        MessageGroupMember.objects.update(unread_count=7)
+        out = StringIO()
+        call_command('repair_unread_counts', stdout=out)
+        self.assertIn('6 compteur(s) corrigé(s)', out.getvalue())
+        counts = dict(MessageGroupMember.objects.filter(group=self.groups[0]).values_list('user__username', 'unread_count'))
+        self.assertEqual(counts, {'alice': 0, 'bob': 2})
+        self.assertEqual(set(MessageGroupMember.objects.exclude(group=self.groups[0]).values_list('unread_count', flat=True)), {0})
+
+    def test_new_members_start_at_the_latest_message(self):
+        self.send(self.groups[0], 3)
+        carol = User.objects.create_user(username='carol', email='carol@example.com', password='secret')
+        dave = User.objects.create_user(username='dave', email='dave@example.com', password='secret')
+        MessageGroupMember.objects.create(group=self.groups[0], user=carol)
+        MessageGroupMember.objects.bulk_create([MessageGroupMember(group=group, user=dave) for group in self.groups])
+        self.send(self.groups[0], 1)
+        self.assertEqual(self.unread(carol)['total'], 1)
+        self.assertEqual(self.unread(dave)['total'], 1)
+        # Compteurs et filigranes concordent : la réparation ne change rien
+        self.assertEqual(repair_unread_counts(), 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Verrous de ligne PostgreSQL')
+class UnreadRaceTests(TransactionTestCase):
+    """Lecture concurrente d'un envoi : le compteur ne perd pas le nouveau message"""
+
+    def test_mark_read_waiting_on_a_send_keeps_the_new_message_unread(self):
+        alice = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        bob = User.objects.create_user(username='bob', email='bob@example.com', password='secret')
+        event = Event.objects.create(title='Gala', event_type=EventType.objects.create(name='Gala'),
+                                     start_date=timezone.now(), created_by=alice)
+        group = MessageGroup.objects.create(name='Bénévoles', event=event, created_by=alice)
+        MessageGroupMember.objects.bulk_create([MessageGroupMember(group=group, user=user) for user in (alice, bob)])
+        first = persist_messages(group.pk, [(alice, 'Premier')])[0]['id']
+        locked = threading.Event()
+
+        def send():
+            # L'envoi verrouille la ligne de bob (count_sent) et valide après le début de mark_read
+            try:
+                with transaction.atomic():
+                    persist_messages(group.pk, [(alice, 'Second')])
+                    locked.set()
+                    time.sleep(0.3)
+            finally:
+                connections.close_all()
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        locked.wait(5)
+        mark_read(group.pk, bob)
+        sender.join()
+        member = MessageGroupMember.objects.get(group=group, user=bob)
+        self.assertEqual((member.last_read_message_id, member.unread_count), (first, 1))
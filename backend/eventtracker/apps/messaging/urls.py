@@ -2,6 +2,9 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    # Vos URLs ici
-    # Exemple : path('gifts/', views.GiftListView.as_view(), name='gift-list'),
-]
\ No newline at end of file
+    path('groups/<int:group_id>/messages/', views.GroupMessageListView.as_view(), name='group-messages'),
+    path('groups/<int:group_id>/messages/<int:message_id>/readers/', views.MessageReadersView.as_view(),
+         name='message-readers'),
+    path('groups/unread/', views.UnreadCountView.as_view(), name='group-unread-counts'),
+    path('groups/<int:group_id>/read/', views.GroupMarkReadView.as_view(), name='group-mark-read'),
+]
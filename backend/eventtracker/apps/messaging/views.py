@@ -1,3 +1,84 @@
-from django.shortcuts import render
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from .consumers import group_channel
+from .models import Message, MessageGroupMember
+from .pagination import MessageCursorPagination
+from .receipts import count_sent, mark_read, readers, unread_counts
+from .serializers import MarkReadSerializer, MessageReaderSerializer, MessageSerializer, UnreadCountSerializer
+
+
+class GroupMemberMixin:
+    """Réserve la vue aux membres du groupe (404 pour les autres)"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not MessageGroupMember.objects.filter(group_id=kwargs['group_id'], user=request.user).exists():
+            raise Http404
+
+
+class GroupMessageListView(GroupMemberMixin, generics.ListCreateAPIView):
+    """Historique des messages d'un groupe (curseur sur sent_at, id) et envoi d'un message"""
+    serializer_class = MessageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessageCursorPagination
+
+    def get_queryset(self):
+        """Messages du groupe, avec seulement les champs de l'expéditeur affichés par le client"""
+        return (Message.objects.filter(group_id=self.kwargs['group_id'])
+                .select_related('sender').only('group', 'content', 'sent_at', 'sender__username'))
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            message = serializer.save(group_id=self.kwargs['group_id'], sender=self.request.user)
+            count_sent(message.group_id, [message.sender_id])
+        data = MessageSerializer(message).data
+        # Les membres connectés par WebSocket reçoivent aussi les messages envoyés par l'API
+        channel_layer = get_channel_layer()
+        transaction.on_commit(lambda: async_to_sync(channel_layer.group_send)(
+            group_channel(message.group_id), {'type': 'chat.message', 'message': data},
+        ))
+
+
+class GroupMarkReadView(APIView):
+    """Marque le groupe comme lu jusqu'à un message (par défaut le dernier) : un seul UPDATE"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, group_id):
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        message_id = serializer.validated_data.get('message')
+        if not mark_read(group_id, request.user, message_id):
+            # Rien n'a changé : soit déjà lu, soit requête invalide (vérifié seulement dans ce cas)
+            if not MessageGroupMember.objects.filter(group_id=group_id, user=request.user).exists():
+                raise Http404
+            if message_id is not None and not Message.objects.filter(pk=message_id, group_id=group_id).exists():
+                return Response({'message': ["Message inconnu dans ce groupe."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MessageReadersView(GroupMemberMixin, generics.ListAPIView):
+    """Membres qui ont lu un message, déduits de leur filigrane de lecture"""
+    serializer_class = MessageReaderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        message = get_object_or_404(Message.objects.only('group', 'sender'),
+                                    pk=self.kwargs['message_id'], group_id=self.kwargs['group_id'])
+        return readers(message)
+
+
+class UnreadCountView(APIView):
+    """Non-lus de tous les groupes de l'utilisateur, lus dans les compteurs des membres (une requête)"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        groups = UnreadCountSerializer(unread_counts(request.user), many=True).data
+        return Response({'total': sum(group['unread'] for group in groups), 'groups': groups})
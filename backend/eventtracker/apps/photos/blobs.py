@@ -0,0 +1,102 @@
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from .models import Photo, PhotoBlob
+
+# Une même photo est souvent envoyée par plusieurs invités : son contenu est stocké une fois,
+# sous photos/ab/cd/<sha256>.<ext>, et chaque Photo référence le blob. ref_count compte ces
+# références ; le fichier et ses rendus sont supprimés quand la dernière photo disparaît.
+READ_SIZE = 64 * 1024
+# Extension des fichiers stockés, déduite du format détecté par Pillow et jamais du nom fourni
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+# Extensions acceptées dans les noms de fichiers annoncés par les clients
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+
+def hash_file(file):
+    """(SHA-256 hexadécimal, taille) d'un fichier lu par blocs, sans le charger en mémoire"""
+    digest, size = hashlib.sha256(), 0
+    file.seek(0)
+    while True:
+        block = file.read(READ_SIZE)
+        if not block:
+            break
+        digest.update(block)
+        size += len(block)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+
+def blob_name(sha256, extension):
+    return f'photos/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def acquire_blob(sha256, content=None, extension='.jpg', size=None):
+    """Blob du contenu ``sha256`` avec une référence de plus, créé depuis ``content`` s'il est nouveau.
+
+    À appeler dans la transaction qui crée la photo. Retourne None si le contenu est inconnu et
+    qu'aucun fichier n'est fourni (le client doit alors l'envoyer). Sans fichier, l'appelant vérifie
+    d'abord que le contenu lui est visible (visible_content).
+    """
+    updated = PhotoBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+    if updated:
+        return PhotoBlob.objects.get(sha256=sha256)
+    if content is None:
+        return None
+    storage = PhotoBlob._meta.get_field('file').storage
+    name = storage.save(blob_name(sha256, extension), content)
+    try:
+        with transaction.atomic():
+            return PhotoBlob.objects.create(sha256=sha256, file=name, size=size or storage.size(name), ref_count=1)
+    except IntegrityError:
+        # Le même contenu vient d'être créé par un envoi concurrent : sa copie est conservée
+        transaction.on_commit(lambda: storage.delete(name))
+        PhotoBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+        return PhotoBlob.objects.get(sha256=sha256)
+
+
+def visible_content(sha256, album, user):
+    """Le contenu ``sha256`` est-il déjà référencé par une photo de l'événement de l'album que ``user`` voit ?
+
+    Seul ce cas autorise une photo créée par sa seule empreinte : sinon la réponse révélerait qu'un
+    contenu existe ailleurs et permettrait de s'attacher le fichier d'un autre sans en avoir les octets.
+    """
+    return Photo.objects.filter(
+        Q(album__event__created_by=user) | Q(album__is_public=True),
+        blob__sha256=sha256, album__event_id=album.event_id,
+    ).exists()
+
+
+def attach_blob(photo, blob):
+    """Fait pointer la photo sur le blob ; reprend les rendus d'une photo du même contenu s'ils existent"""
+    photo.blob, photo.image = blob, blob.file.name
+    sibling = (Photo.objects.filter(blob=blob, rendition_status='ready').exclude(pk=photo.pk)
+               .values_list('renditions', flat=True).first())
+    photo.renditions, photo.rendition_status = (sibling, 'ready') if sibling else ({}, 'pending')
+    return photo
+
+
+def release_blob(blob_id, renditions=None):
+    """Retire une référence ; au dernier retrait, supprime le blob puis ses fichiers après validation"""
+    with transaction.atomic():
+        blob = PhotoBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            PhotoBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+            return
+        blob.delete()
+    names = [blob.file.name] + [
+        name for entry in (renditions or {}).values() for key, name in entry.items() if key in ('jpeg', 'webp')
+    ]
+    storage = blob.file.storage
+
+    def delete_files():
+        # Un envoi du même contenu a pu recréer le blob (même chemin) entre-temps
+        if not PhotoBlob.objects.filter(sha256=blob.sha256).exists():
+            for name in names:
+                storage.delete(name)
+
+    transaction.on_commit(delete_files)
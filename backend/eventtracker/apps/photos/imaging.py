@@ -0,0 +1,44 @@
+import io
+
+from PIL import Image, ImageOps
+
+# L'original est conservé tel quel, avec une variante WebP à pleine taille. L'écran reçoit
+# l'image entière réduite et la grille des vignettes carrées recadrées. Chaque taille est
+# réduite depuis la précédente (ordre du dictionnaire) : moins de pixels à rééchantillonner.
+SIZES = {
+    'original': {'box': None, 'crop': False},
+    'screen': {'box': (1600, 1600), 'crop': False},
+    'grid': {'box': (320, 320), 'crop': True},
+}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+# Méthode WebP rapide pour les 12 Mpx de l'original : même poids, trois fois moins de calcul
+WEBP_METHOD = {'original': 2}
+
+
+def render(data):
+    """Rendus d'une image (octets) : {taille: {format: (octets, largeur, hauteur)}}.
+
+    Fonction pure, exécutée dans un processus du pool : elle ne touche ni à la base ni au stockage.
+    Le module n'importe pas Django : un processus démarré par spawn ou forkserver le charge seul.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        # Les téléphones enregistrent l'orientation dans l'EXIF : elle est appliquée aux pixels
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGB')
+    outputs = {}
+    for name, spec in SIZES.items():
+        if spec['crop']:
+            image = ImageOps.fit(image, spec['box'], Image.LANCZOS)
+        elif spec['box'] is not None:
+            image.thumbnail(spec['box'], Image.LANCZOS)
+        variants = {}
+        if name != 'original':
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            variants['jpeg'] = (buffer.getvalue(), *image.size)
+        buffer = io.BytesIO()
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=WEBP_METHOD.get(name, 4))
+        variants['webp'] = (buffer.getvalue(), *image.size)
+        outputs[name] = variants
+    return outputs
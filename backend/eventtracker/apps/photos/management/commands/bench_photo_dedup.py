@@ -0,0 +1,52 @@
+import io
+import os
+import random
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.test import override_settings
+from apps.photos.blobs import acquire_blob, hash_file
+from apps.photos.models import PhotoBlob
+
+class Command(BaseCommand):
+    help = "Mesure les octets envoyés et stockés pour un album où plusieurs invités partagent les mêmes photos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guests', type=int, default=30, help='Invités qui envoient des photos')
+        parser.add_argument('--photos', type=int, default=60, help='Photos distinctes prises pendant l\'événement')
+        parser.add_argument('--per-guest', type=int, default=20, help='Photos envoyées par chaque invité')
+        parser.add_argument('--size', type=int, default=512 * 1024, help='Taille d\'une photo (octets)')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        originals = [os.urandom(options['size']) for _ in range(options['photos'])]
+        naive = sent = 0
+        hashing = 0.0
+        # Médias temporaires et transaction annulée : la base et le stockage réels restent intacts
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            with transaction.atomic():
+                for _ in range(options['guests']):
+                    for index in rng.sample(range(options['photos']), options['per_guest']):
+                        content = originals[index]
+                        naive += len(content)
+                        start = time.perf_counter()
+                        sha256, size = hash_file(io.BytesIO(content))
+                        hashing += time.perf_counter() - start
+                        # Le client annonce l'empreinte ; il n'envoie le fichier que si elle est inconnue
+                        if acquire_blob(sha256) is None:
+                            acquire_blob(sha256, ContentFile(content), '.jpg', size)
+                            sent += size
+                stored = PhotoBlob.objects.aggregate(total=Sum('size'))['total']
+                references = PhotoBlob.objects.aggregate(total=Sum('ref_count'))['total']
+                transaction.set_rollback(True)
+
+        mib = 2 ** 20
+        self.stdout.write(f'{references} photos, {options["photos"]} contenus distincts')
+        self.stdout.write(f'sans déduplication : {naive / mib:8.1f} Mio envoyés et stockés')
+        self.stdout.write(f'avec déduplication : {sent / mib:8.1f} Mio envoyés, {stored / mib:.1f} Mio stockés '
+                          f'({naive / stored:.1f}x moins)')
+        self.stdout.write(f'hachage SHA-256 par blocs : {naive / mib / hashing:.0f} Mio/s')
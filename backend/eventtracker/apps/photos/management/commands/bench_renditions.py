@@ -0,0 +1,51 @@
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageFilter
+from apps.photos.imaging import render
+from apps.photos.renditions import workers
+
+class Command(BaseCommand):
+    help = 'Mesure le débit du pipeline de rendus (images par seconde et par cœur) et le poids des vignettes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=48, help='Images rendues par mesure')
+        parser.add_argument('--size', default='4032x3024', help='Dimensions des originaux (photo de téléphone)')
+        parser.add_argument('--workers', type=int, nargs='*', help='Tailles de pool mesurées (défaut : 1 et un par cœur)')
+
+    def handle(self, *args, **options):
+        width, height = (int(value) for value in options['size'].split('x'))
+        original = self.sample(width, height)
+        self.stdout.write(f'original {width}x{height} : {len(original) / 1024:.0f} Kio')
+
+        outputs = render(original)
+        for size, variants in outputs.items():
+            described = ', '.join(f'{fmt} {len(content) / 1024:.0f} Kio' for fmt, (content, *_) in variants.items())
+            self.stdout.write(f'  {size:<8} {variants["webp"][1]}x{variants["webp"][2]} : {described}')
+        grid = len(outputs['grid']['webp'][0])
+        self.stdout.write(f'grille : {len(original) / grid:.0f}x moins d\'octets que l\'original')
+
+        for count in options['workers'] or sorted({1, workers()}):
+            with ProcessPoolExecutor(max_workers=count) as pool:
+                list(pool.map(render, [original] * count))  # démarrage des processus hors mesure
+                start = time.perf_counter()
+                list(pool.map(render, [original] * options['images']))
+                elapsed = time.perf_counter() - start
+            rate = options['images'] / elapsed
+            self.stdout.write(f'{count:>3} processus : {rate:6.2f} images/s ({rate / count:.2f} par cœur)')
+
+    @staticmethod
+    def sample(width, height):
+        """JPEG d'appareil photo simulé : dégradé, formes et bruit, qui se compresse comme une photo"""
+        image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+        draw = ImageDraw.Draw(image)
+        for index in range(40):
+            x, y = (index * 97) % width, (index * 61) % height
+            draw.ellipse((x, y, x + width // 6, y + height // 6), fill=(index * 6 % 256, 120, 255 - index * 6 % 256))
+        noise = Image.effect_noise((width, height), 24).convert('RGB')
+        image = Image.blend(image.filter(ImageFilter.GaussianBlur(3)), noise, 0.15)
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=90)
+        return buffer.getvalue()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from apps.photos.blobs import hash_file
+from apps.photos.models import Photo, PhotoBlob
+
+class Command(BaseCommand):
+    help = 'Rattache les photos existantes à des blobs par empreinte SHA-256 et supprime les fichiers en double'
+
+    def handle(self, *args, **options):
+        storage = Photo._meta.get_field('image').storage
+        attached = duplicates = freed = 0
+        photos = Photo.objects.filter(blob__isnull=True).only('image', 'renditions', 'rendition_status')
+        for photo in photos.order_by('pk').iterator(chunk_size=200):
+            try:
+                with photo.image.open('rb') as image:
+                    sha256, size = hash_file(image)
+            except OSError as exc:
+                self.stderr.write(f'Photo {photo.pk} ignorée : {exc}')
+                continue
+            with transaction.atomic():
+                blob = PhotoBlob.objects.select_for_update().filter(sha256=sha256).first()
+                if blob is None:
+                    # Premier exemplaire : son fichier devient celui du blob, sans déplacement
+                    blob = PhotoBlob.objects.create(sha256=sha256, file=photo.image.name, size=size, ref_count=1)
+                    Photo.objects.filter(pk=photo.pk).update(blob=blob)
+                    attached += 1
+                    continue
+                PhotoBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+                names = [photo.image.name]
+                ready = (Photo.objects.filter(blob=blob, rendition_status='ready')
+                         .values_list('renditions', flat=True).first())
+                changes = {'blob': blob, 'image': blob.file.name}
+                if ready:
+                    # Les rendus du blob remplacent ceux de la copie
+                    names += [name for entry in photo.renditions.values()
+                              for key, name in entry.items() if key in ('jpeg', 'webp')]
+                    changes.update(renditions=ready, rendition_status='ready')
+                Photo.objects.filter(pk=photo.pk).update(**changes)
+                names = [name for name in names if not Photo.objects.filter(image=name).exists()]
+                transaction.on_commit(lambda names=names: [storage.delete(name) for name in names])
+            attached += 1
+            duplicates += 1
+            freed += size
+        self.stdout.write(self.style.SUCCESS(
+            f'{attached} photo(s) rattachée(s), {duplicates} doublon(s), {freed / 2 ** 20:.1f} Mo libérés'
+        ))
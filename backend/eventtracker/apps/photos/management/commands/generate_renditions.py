@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from apps.photos.models import Photo
+from apps.photos.renditions import generate_renditions, workers
+
+class Command(BaseCommand):
+    help = 'Génère les rendus (grille, écran, WebP) des photos qui n\'en ont pas encore'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help='Reprend aussi les photos en échec')
+        parser.add_argument('--album', type=int, help='Limite aux photos d\'un album')
+
+    def handle(self, *args, **options):
+        photos = Photo.objects.filter(rendition_status__in=['pending', 'failed'] if options['failed'] else ['pending'])
+        if options['album']:
+            photos = photos.filter(album_id=options['album'])
+
+        def run(photo):
+            try:
+                return generate_renditions(photo)
+            finally:
+                connections.close_all()
+
+        # Chaque thread lit un original et attend son rendu : les processus du pool restent occupés
+        with ThreadPoolExecutor(max_workers=max(workers(), 1)) as executor:
+            statuses = list(executor.map(run, photos.only('image').order_by('pk').iterator(chunk_size=200)))
+        self.stdout.write(self.style.SUCCESS(
+            f"{statuses.count('ready')} photo(s) traitée(s), {statuses.count('failed')} en échec"
+        ))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.photos.models import PhotoUpload
+from apps.photos.uploads import discard_part, upload_setting
+
+class Command(BaseCommand):
+    help = 'Supprime les envois de photos abandonnés et leurs fichiers partiels'
+
+    def handle(self, *args, **options):
+        limit = timezone.now() - timedelta(seconds=upload_setting('EXPIRY'))
+        stale = list(PhotoUpload.objects.filter(updated_at__lt=limit).only('pk', 'status'))
+        PhotoUpload.objects.filter(pk__in=[upload.pk for upload in stale], updated_at__lt=limit).delete()
+        # Les envois terminés n'ont plus de fichier partiel
+        for upload in stale:
+            if upload.status == 'open':
+                discard_part(upload)
+        self.stdout.write(self.style.SUCCESS(f'{len(stale)} envoi(s) supprimé(s)'))
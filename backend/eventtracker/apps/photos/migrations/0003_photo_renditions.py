@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='rendition_status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('ready', 'Prêts'), ('failed', 'Échec')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['album', 'uploaded_at', 'id'], name='photo_album_uploaded_idx'),
+        ),
+    ]
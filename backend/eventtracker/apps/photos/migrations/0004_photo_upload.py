@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('photos', '0003_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('received', models.PositiveBigIntegerField(default=0)),
+                ('caption', models.CharField(blank=True, max_length=255)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('open', 'En cours'), ('complete', 'Terminé')], default='open', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('album', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='photos.album')),
+                ('photo', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='photos.photo')),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photo_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
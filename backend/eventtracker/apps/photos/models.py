@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 
 # Create your models here.
@@ -17,13 +19,42 @@ class Album(models.Model):
     def __str__(self):
         return self.name
 
+class PhotoBlob(models.Model):
+    """Contenu d'une photo stocké une seule fois, sous un chemin dérivé de son SHA-256 (voir blobs.py)"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='photos/', max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Nombre de photos qui référencent ce contenu : le fichier est supprimé quand il tombe à zéro
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
 class Photo(models.Model):
+    RENDITION_CHOICES = [
+        ('pending', 'En attente'),
+        ('ready', 'Prêts'),
+        ('failed', 'Échec'),
+    ]
+
     album = models.ForeignKey(Album, on_delete=models.CASCADE, related_name='photos')
     image = models.ImageField(upload_to='event_photos/')
+    # Contenu partagé ; image pointe alors sur le fichier du blob (vide pour les photos antérieures)
+    blob = models.ForeignKey(PhotoBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='photos')
     caption = models.CharField(max_length=255, blank=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     location = models.CharField(max_length=255, blank=True)
+    # Rendus générés hors requête (voir renditions.py) : {taille: {format: chemin, width, height}}
+    rendition_status = models.CharField(max_length=10, choices=RENDITION_CHOICES, default='pending')
+    renditions = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            # Grille d'un album paginée par curseur sur (uploaded_at, id)
+            models.Index(fields=['album', 'uploaded_at', 'id'], name='photo_album_uploaded_idx'),
+        ]
     
     def __str__(self):
         return f"Photo {self.id} - {self.album.name}"
@@ -35,4 +66,30 @@ class PhotoComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
-        return f"Commentaire de {self.user.username} sur Photo {self.photo.id}"
\ No newline at end of file
+        return f"Commentaire de {self.user.username} sur Photo {self.photo.id}"
+
+class PhotoUpload(models.Model):
+    """Envoi d'une photo par morceaux, reprenable après une coupure (voir uploads.py)"""
+    STATUS_CHOICES = [
+        ('open', 'En cours'),
+        ('complete', 'Terminé'),
+    ]
+
+    # Identifiant non devinable : il figure dans l'URL des morceaux
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    album = models.ForeignKey(Album, on_delete=models.CASCADE, related_name='uploads')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='photo_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Empreinte annoncée par le client : vérifiée à la finalisation
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    caption = models.CharField(max_length=255, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    photo = models.OneToOneField(Photo, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Envoi {self.id} ({self.received}/{self.size} octets)"
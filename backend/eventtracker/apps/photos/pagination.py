@@ -0,0 +1,8 @@
+from apps.events.pagination import KeysetPagination
+
+
+class PhotoCursorPagination(KeysetPagination):
+    """Grille d'un album, des plus récentes aux plus anciennes, servie par l'index (album, uploaded_at, id)"""
+    ordering = ('-uploaded_at', '-id')
+    page_size = 60
+    max_page_size = 200
@@ -0,0 +1,139 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import Q
+from PIL import Image
+
+from .imaging import render
+from .models import Photo
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {'WORKERS': None, 'BACKGROUND': True, 'START_METHOD': 'forkserver'}
+
+
+def rendition_setting(name):
+    return {**DEFAULTS, **getattr(settings, 'PHOTO_RENDITIONS', {})}[name]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def workers():
+    count = rendition_setting('WORKERS')
+    return (os.cpu_count() or 1) if count is None else count
+
+
+def process_pool():
+    """Pool de processus partagé ; WORKERS = 0 rend les images dans le processus courant.
+
+    Les processus ne sont pas créés par fork : le serveur est multithread (dispatcher, serveur
+    ASGI) et un fork copierait des verrous tenus par d'autres threads.
+    """
+    global _pool
+    if not workers():
+        return None
+    with _pool_lock:
+        if _pool is None:
+            method = rendition_setting('START_METHOD')
+            if method not in multiprocessing.get_all_start_methods():
+                method = 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=workers(), mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def discard_pool(pool):
+    """Abandonne un pool cassé (processus tué) : le prochain rendu en crée un nouveau"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def rendition_name(image_name, size, fmt):
+    """Chemin d'un rendu, à côté de l'original : event_photos/abc.jpg -> event_photos/abc_grid.webp"""
+    root = os.path.splitext(image_name)[0]
+    return f"{root}_{size}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def generate_renditions(photo):
+    """Génère, enregistre et référence les rendus d'une photo ; retourne le statut obtenu.
+
+    Les photos qui partagent le même blob partagent aussi ses rendus : ils ne sont générés qu'une fois.
+    """
+    shared = Photo.objects.filter(pk=photo.pk)
+    if photo.blob_id is not None:
+        ready = (Photo.objects.filter(blob_id=photo.blob_id, rendition_status='ready')
+                 .values_list('renditions', flat=True).first())
+        if ready:
+            shared.update(renditions=ready, rendition_status='ready')
+            photo.renditions, photo.rendition_status = ready, 'ready'
+            return 'ready'
+        shared = Photo.objects.filter(Q(pk=photo.pk) | Q(blob_id=photo.blob_id, rendition_status='pending'))
+    with photo.image.open('rb') as original:
+        data = original.read()
+    pool = process_pool()
+    try:
+        outputs = pool.submit(render, data).result() if pool is not None else render(data)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        logger.warning("Rendus impossibles pour la photo %s : %s", photo.pk, exc)
+        shared.update(rendition_status='failed')
+        return 'failed'
+    except BrokenProcessPool:
+        # Processus de rendu tué (mémoire, signal) : les rendus en cours échouent tous
+        logger.error("Pool de rendu cassé pendant la photo %s", photo.pk)
+        discard_pool(pool)
+        shared.update(rendition_status='failed')
+        return 'failed'
+
+    storage = photo.image.storage
+    renditions = {}
+    for size, variants in outputs.items():
+        entry = {}
+        for fmt, (content, width, height) in variants.items():
+            entry[fmt] = storage.save(rendition_name(photo.image.name, size, fmt), ContentFile(content))
+            entry['width'], entry['height'] = width, height
+        renditions[size] = entry
+    shared.update(renditions=renditions, rendition_status='ready')
+    photo.renditions, photo.rendition_status = renditions, 'ready'
+    return 'ready'
+
+
+def _run(photo_id):
+    try:
+        photo = Photo.objects.only('image', 'blob').filter(pk=photo_id).first()
+        if photo is not None:
+            generate_renditions(photo)
+    except Exception:
+        logger.exception("Échec des rendus de la photo %s", photo_id)
+    finally:
+        connections.close_all()
+
+
+_dispatcher = None
+
+
+def queue_renditions(photo):
+    """Programme les rendus d'une photo après la validation de la transaction : la requête ne les attend pas"""
+    global _dispatcher
+    if photo.rendition_status == 'ready':
+        # Contenu déjà rendu pour une autre photo (blob partagé)
+        return
+    if not rendition_setting('BACKGROUND'):
+        transaction.on_commit(lambda: generate_renditions(photo))
+        return
+    with _pool_lock:
+        if _dispatcher is None:
+            # Un thread par processus : chacun lit l'original, attend son rendu et l'enregistre
+            _dispatcher = ThreadPoolExecutor(max_workers=max(workers(), 1), thread_name_prefix='photo-renditions')
+    photo_id = photo.pk
+    transaction.on_commit(lambda: _dispatcher.submit(_run, photo_id))
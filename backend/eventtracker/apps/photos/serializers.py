@@ -0,0 +1,153 @@
+import os
+
+from django.core.validators import RegexValidator
+from django.db import transaction
+from rest_framework import serializers
+from .blobs import (FORMAT_EXTENSIONS, IMAGE_EXTENSIONS, acquire_blob, attach_blob, hash_file, release_blob,
+                    visible_content)
+from .models import Album, Photo, PhotoUpload
+from .uploads import shortcut_upload, upload_setting
+
+validate_sha256 = RegexValidator(r'^[0-9a-f]{64}$', "Empreinte SHA-256 attendue (64 caractères hexadécimaux).")
+UNKNOWN_CONTENT = "Contenu inconnu : envoyez le fichier."
+UNSUPPORTED_FORMAT = "Format d'image non pris en charge (JPEG, PNG, GIF ou WebP)."
+
+
+def validate_album_access(album, user):
+    """Les invités publient dans les albums publics ; les albums privés sont réservés à l'organisateur"""
+    if not album.is_public and album.event.created_by_id != user.pk:
+        raise serializers.ValidationError("Cet album n'accepte pas vos photos.")
+    return album
+
+
+class AlbumSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Album
+        fields = ['id', 'name', 'event', 'description', 'cover_image', 'created_by', 'created_at', 'is_public']
+        read_only_fields = ['created_by', 'created_at']
+
+    def validate_event(self, event):
+        if event.created_by_id != self.context['request'].user.pk:
+            raise serializers.ValidationError("Vous ne pouvez créer des albums que pour vos événements.")
+        return event
+
+
+class PhotoSerializer(serializers.ModelSerializer):
+    """Photo envoyée en entier (image) ou, si son contenu figure déjà parmi les photos de l'événement
+    visibles par l'utilisateur, par sa seule empreinte (sha256)"""
+    sha256 = serializers.CharField(write_only=True, required=False, validators=[validate_sha256])
+    renditions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Photo
+        fields = ['id', 'album', 'image', 'sha256', 'caption', 'location', 'uploaded_by', 'uploaded_at',
+                  'rendition_status', 'renditions']
+        read_only_fields = ['uploaded_by', 'uploaded_at', 'rendition_status']
+        extra_kwargs = {'image': {'required': False}}
+
+    def validate_album(self, album):
+        return validate_album_access(album, self.context['request'].user)
+
+    def validate(self, attrs):
+        image = attrs.get('image')
+        if image is not None:
+            # Image lue par Pillow lors de la validation du champ : son format fixe l'extension stockée
+            attrs['extension'] = FORMAT_EXTENSIONS.get(getattr(getattr(image, 'image', None), 'format', None))
+            if attrs['extension'] is None:
+                raise serializers.ValidationError({'image': UNSUPPORTED_FORMAT})
+            digest, attrs['size'] = hash_file(image)
+            if attrs.get('sha256', digest) != digest:
+                raise serializers.ValidationError({'sha256': "L'empreinte ne correspond pas au fichier envoyé."})
+            attrs['sha256'] = digest
+        elif self.instance is None and not attrs.get('sha256'):
+            raise serializers.ValidationError({'image': "Envoyez l'image ou son empreinte SHA-256."})
+        return attrs
+
+    def _acquire(self, validated_data):
+        image, size = validated_data.pop('image', None), validated_data.pop('size', None)
+        sha256 = validated_data.pop('sha256')
+        album = validated_data.get('album') or self.instance.album
+        if image is None and not visible_content(sha256, album, self.context['request'].user):
+            # Contenu stocké ailleurs ou absent : même réponse, les octets sont exigés
+            blob = None
+        else:
+            blob = acquire_blob(sha256, image, validated_data.pop('extension', '.jpg'), size)
+        if blob is None:
+            raise serializers.ValidationError({'sha256': [UNKNOWN_CONTENT]}, code='unknown_content')
+        return blob
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            blob = self._acquire(validated_data)
+            photo = attach_blob(Photo(**validated_data), blob)
+            photo.save()
+        return photo
+
+    def update(self, instance, validated_data):
+        if 'sha256' not in validated_data:
+            return super().update(instance, validated_data)
+        with transaction.atomic():
+            blob = self._acquire(validated_data)
+            previous, renditions = instance.blob_id, instance.renditions
+            photo = super().update(attach_blob(instance, blob), validated_data)
+            if previous is not None:
+                release_blob(previous, renditions)
+        return photo
+
+    def get_renditions(self, photo):
+        """URLs des rendus par taille : JPEG (ou l'original) et WebP, avec les dimensions"""
+        request = self.context.get('request')
+        storage = photo.image.storage
+
+        def url(name):
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            size: {
+                'url': url(entry.get('jpeg', photo.image.name)),
+                'webp': url(entry['webp']),
+                'width': entry['width'],
+                'height': entry['height'],
+            }
+            for size, entry in photo.renditions.items()
+        }
+
+
+class PhotoUploadSerializer(serializers.ModelSerializer):
+    """Session d'envoi par morceaux : ``received`` est la position à laquelle reprendre.
+
+    Si ``sha256`` désigne un contenu déjà présent parmi les photos de l'événement visibles par
+    l'utilisateur, la photo est créée aussitôt et la session est terminée : aucun octet n'est à envoyer.
+    """
+    sha256 = serializers.CharField(required=False, allow_blank=True, validators=[validate_sha256])
+
+    class Meta:
+        model = PhotoUpload
+        fields = ['id', 'album', 'filename', 'size', 'sha256', 'received', 'caption', 'location', 'status',
+                  'photo', 'created_at']
+        read_only_fields = ['received', 'status', 'photo', 'created_at']
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            upload = super().create(validated_data)
+            if upload.sha256:
+                shortcut_upload(upload)
+        return upload
+
+    def validate_album(self, album):
+        return validate_album_access(album, self.context['request'].user)
+
+    def validate_filename(self, filename):
+        """Nom indicatif : le fichier est stocké sous son empreinte, avec l'extension de son format réel"""
+        if os.path.basename(filename) != filename or '\\' in filename or '\x00' in filename:
+            raise serializers.ValidationError("Nom de fichier sans chemin attendu.")
+        if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+            raise serializers.ValidationError("Extension d'image attendue (.jpg, .jpeg, .png, .gif ou .webp).")
+        return filename
+
+    def validate_size(self, size):
+        if not 0 < size <= upload_setting('MAX_SIZE'):
+            raise serializers.ValidationError(f"Taille limitée à {upload_setting('MAX_SIZE') // 2 ** 20} Mo.")
+        return size
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .blobs import release_blob
+from .models import Photo
+
+
+@receiver(post_delete, sender=Photo)
+def photo_deleted(sender, instance, **kwargs):
+    # Le contenu partagé n'est supprimé qu'avec la dernière photo qui le référence
+    if instance.blob_id is not None:
+        # Rendus non chargés (suppression depuis un queryset only()) : le fichier d'origine suffit
+        renditions = None if 'renditions' in instance.get_deferred_fields() else instance.renditions
+        release_blob(instance.blob_id, renditions)
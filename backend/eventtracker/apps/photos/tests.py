@@ -1,3 +1,387 @@
-from django.test import TestCase
+import fcntl
+import io
+import os
+import shutil
+import signal
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.events.models import EventType, Event
+from apps.users.models import User
+from eventtracker.testing import EndpointBudgetMixin
+from .blobs import blob_name, hash_file
+from .models import Album, Photo, PhotoBlob, PhotoUpload
+from . import renditions
+from .renditions import generate_renditions
+from .uploads import finalize, part_path
+
+MEDIA_ROOT = tempfile.mkdtemp()
+UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'partial')
+
+# Budgets par endpoint : nombre maximal de requêtes SQL et durée maximale (ms).
+# Toute régression (N+1, sérialisation plus lente) fait échouer la suite.
+ENDPOINT_BUDGETS = {
+    'photos-list': {'queries': 1, 'ms': 200},
+}
+
+
+def jpeg_upload(name='photo.jpg', size=(1200, 900), orientation=None):
+    image = Image.new('RGB', size, (200, 80, 40))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=95, exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PHOTO_RENDITIONS={'WORKERS': 0, 'BACKGROUND': False})
+class PhotoRenditionTests(EndpointBudgetMixin, TestCase):
+    """Envoi de photos et rendus (grille, écran, WebP) générés après la validation"""
+    budgets = ENDPOINT_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='orga', email='orga@example.com', password='secret')
+        cls.guest = User.objects.create_user(username='invite', email='invite@example.com', password='secret')
+        event = Event.objects.create(title='Mariage', event_type=EventType.objects.create(name='Mariage'),
+                                     start_date=timezone.now(), created_by=cls.owner)
+        cls.album = Album.objects.create(name='Soirée', event=event, created_by=cls.owner)
+        cls.private = Album.objects.create(name='Préparatifs', event=event, created_by=cls.owner, is_public=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def upload(self, album, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/photos/', {'album': album.pk, 'image': jpeg_upload(**kwargs)}, format='multipart')
+
+    def test_upload_generates_renditions(self):
+        # Orientation EXIF 6 : l'image doit être tournée, la version écran est donc en portrait
+        response = self.upload(self.album, orientation=6)
+        self.assertEqual(response.status_code, 201)
+        photo = Photo.objects.get(pk=response.data['id'])
+        self.assertEqual(photo.rendition_status, 'ready')
+        self.assertEqual(set(photo.renditions), {'grid', 'screen', 'original'})
+
+        data = self.measure('photos-list', 'get', f'/api/photos/?album={self.album.pk}').data['results'][0]
+        grid, screen = data['renditions']['grid'], data['renditions']['screen']
+        self.assertEqual((grid['width'], grid['height']), (320, 320))
+        self.assertEqual((screen['width'], screen['height']), (900, 1200))
+        self.assertTrue(grid['url'].startswith('http://testserver/media/photos/'))
+        self.assertTrue(grid['webp'].endswith('_grid.webp'))
+        self.assertEqual(data['renditions']['original']['url'], data['image'])
+
+        storage = photo.image.storage
+        self.assertLess(storage.size(photo.renditions['grid']['webp']) * 10, storage.size(photo.image.name))
+
+    def test_private_album_and_foreign_photos(self):
+        self.assertEqual(self.upload(self.private).status_code, 400)
+        self.client.force_authenticate(self.owner)
+        photo_id = self.upload(self.private).data['id']
+
+        self.client.force_authenticate(self.guest)
+        self.assertEqual(self.client.get(f'/api/photos/{photo_id}/').status_code, 404)
+        mine = self.upload(self.album).data['id']
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.patch(f'/api/photos/{mine}/', {'caption': 'Ouverture du bal'}).status_code, 200)
+        self.client.force_authenticate(User.objects.create_user(username='autre', email='autre@example.com'))
+        self.assertEqual(self.client.delete(f'/api/photos/{mine}/').status_code, 404)
+
+    def test_unreadable_image_is_marked_failed(self):
+        photo = Photo.objects.create(album=self.album, uploaded_by=self.guest,
+                                     image=SimpleUploadedFile('casse.jpg', b'pas une image'))
+        with self.assertLogs('apps.photos.renditions', 'WARNING'):
+            self.assertEqual(generate_renditions(photo), 'failed')
+        photo.refresh_from_db()
+        self.assertEqual((photo.rendition_status, photo.renditions), ('failed', {}))
+
+
+    @override_settings(PHOTO_RENDITIONS={'WORKERS': 1, 'START_METHOD': 'spawn'})
+    def test_killed_worker_fails_the_photo_and_replaces_the_pool(self):
+        photos = [Photo.objects.create(album=self.album, uploaded_by=self.guest, image=jpeg_upload(size=(400, 300)))
+                  for _ in range(3)]
+        pool = renditions.process_pool()
+        self.addCleanup(lambda: renditions._pool and renditions.discard_pool(renditions._pool))
+        self.assertEqual(generate_renditions(photos[0]), 'ready')
+
+        for process in list(pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+        with self.assertLogs('apps.photos.renditions', 'ERROR'):
+            self.assertEqual(generate_renditions(photos[1]), 'failed')
+        self.assertEqual(Photo.objects.get(pk=photos[1].pk).rendition_status, 'failed')
+
+        self.assertIsNot(renditions.process_pool(), pool)
+        self.assertEqual(generate_renditions(photos[2]), 'ready')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PHOTO_RENDITIONS={'WORKERS': 0, 'BACKGROUND': False},
+                   PHOTO_UPLOADS={'TEMP_DIR': UPLOAD_DIR, 'MAX_SIZE': 2 ** 20, 'EXPIRY': 60})
+class ChunkedUploadTests(TestCase):
+    """Envoi reprenable : morceaux hors séquence, renvoi après coupure et finalisation unique"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='invite', email='invite@example.com', password='secret')
+        event = Event.objects.create(title='Gala', event_type=EventType.objects.create(name='Gala'),
+                                     start_date=timezone.now(), created_by=cls.guest)
+        cls.album = Album.objects.create(name='Soirée', event=event, created_by=cls.guest)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+        self.data = jpeg_upload(size=(400, 300)).read()
+
+    def start(self, size=None):
+        response = self.client.post('/api/photos/uploads/', {
+            'album': self.album.pk, 'filename': 'soiree.jpg', 'size': size or len(self.data), 'caption': 'Le gâteau',
+        })
+        self.assertEqual(response.status_code, 201)
+        return f"/api/photos/uploads/{response.data['id']}/"
+
+    def put(self, url, start, end, body=None):
+        return self.client.generic('PUT', url, self.data[start:end] if body is None else body,
+                                   content_type='application/octet-stream',
+                                   HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.data)}')
+
+    def test_resumed_upload_creates_one_photo(self):
+        url, third = self.start(), len(self.data) // 3
+        self.assertEqual(self.put(url, 0, third).data['received'], third)
+
+        # Morceau en avance : refusé avec la position à reprendre
+        response = self.put(url, 2 * third, len(self.data))
+        self.assertEqual((response.status_code, response.data['received']), (409, third))
+        # Renvoi d'un morceau déjà reçu, puis d'un morceau qui le chevauche
+        self.assertEqual(self.put(url, 0, third).data['received'], third)
+        self.assertEqual(self.put(url, third - 10, 2 * third).data['received'], 2 * third)
+        self.assertEqual(self.client.post(f'{url}finalize/').status_code, 409)
+        self.assertEqual(self.client.get(url).data['received'], 2 * third)
+        self.put(url, 2 * third, len(self.data))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{url}finalize/')
+        self.assertEqual(response.status_code, 201)
+        photo = Photo.objects.get(pk=response.data['id'])
+        self.assertEqual((photo.caption, photo.rendition_status), ('Le gâteau', 'ready'))
+        with photo.image.open('rb') as image:
+            self.assertEqual(image.read(), self.data)
+        self.assertFalse(os.path.exists(part_path(PhotoUpload.objects.get())))
+
+        # Finalisation rejouée : la même photo, sans doublon
+        again = self.client.post(f'{url}finalize/')
+        self.assertEqual((again.status_code, again.data['id']), (200, photo.pk))
+        self.assertEqual(Photo.objects.count(), 1)
+
+    def test_invalid_uploads(self):
+        too_big = self.client.post('/api/photos/uploads/', {'album': self.album.pk, 'filename': 'x.jpg', 'size': 2 ** 21})
+        self.assertEqual(too_big.status_code, 400)
+
+        url = self.start()
+        self.assertEqual(self.client.generic('PUT', url, b'abc', content_type='application/octet-stream').status_code, 400)
+        self.put(url, 0, len(self.data), body=b'x' * len(self.data))
+        self.assertEqual(self.client.post(f'{url}finalize/').status_code, 400)
+
+        # Un autre utilisateur ne voit pas la session
+        self.client.force_authenticate(User.objects.create_user(username='autre', email='autre@example.com'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_filename_is_checked_and_format_detected(self):
+        for filename in ('../x.jpg', 'albums/x.jpg', 'x\\..\\y.jpg', 'photo.exe', 'photo'):
+            response = self.client.post('/api/photos/uploads/', {
+                'album': self.album.pk, 'filename': filename, 'size': len(self.data)})
+            self.assertEqual((filename, response.status_code), (filename, 400))
+
+        # Un PNG annoncé « soiree.jpg » est stocké avec l'extension de son format réel
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), (10, 120, 200)).save(buffer, 'PNG')
+        self.data = buffer.getvalue()
+        url = self.start()
+        self.put(url, 0, len(self.data))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{url}finalize/')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Photo.objects.get().image.name.endswith('.png'))
+
+    def test_failed_finalize_keeps_the_part(self):
+        # Contenu propre à ce test : aucun blob du même contenu n'est déjà stocké
+        self.data = jpeg_upload(size=(401, 300)).read()
+        url = self.start()
+        self.put(url, 0, len(self.data))
+        upload = PhotoUpload.objects.get()
+        storage = PhotoBlob._meta.get_field('file').storage
+        with mock.patch('apps.photos.uploads._create_photo', side_effect=RuntimeError('panne')):
+            with self.assertRaises(RuntimeError):
+                finalize(upload)
+        # Transaction annulée : le fichier partiel est intact et la copie stockée est supprimée
+        self.assertEqual(PhotoBlob.objects.count(), 0)
+        self.assertTrue(os.path.exists(part_path(upload)))
+        self.assertFalse(storage.exists(blob_name(hash_file(io.BytesIO(self.data))[0], '.jpg')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{url}finalize/')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(os.path.exists(part_path(upload)))
+
+    def test_decompression_bomb_is_rejected(self):
+        url = self.start()
+        self.put(url, 0, len(self.data))
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            response = self.client.post(f'{url}finalize/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Photo.objects.count(), 0)
+
+    def test_concurrent_chunk_on_same_session_is_rejected(self):
+        url = self.start()
+        upload = PhotoUpload.objects.get()
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        with open(part_path(upload), 'wb') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            self.assertEqual(self.put(url, 0, 100).status_code, 409)
+            # Les autres sessions ne sont pas bloquées
+            other = self.start()
+            self.assertEqual(self.put(other, 0, 100).status_code, 200)
+        self.assertEqual(self.put(url, 0, 100).data['received'], 100)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PHOTO_RENDITIONS={'WORKERS': 0, 'BACKGROUND': False},
+                   PHOTO_UPLOADS={'TEMP_DIR': UPLOAD_DIR, 'MAX_SIZE': 2 ** 20, 'EXPIRY': 60})
+class PhotoDeduplicationTests(TestCase):
+    """Un même contenu envoyé plusieurs fois n'est stocké et rendu qu'une fois"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='invite', email='invite@example.com', password='secret')
+        event = Event.objects.create(title='Baptême', event_type=EventType.objects.create(name='Baptême'),
+                                     start_date=timezone.now(), created_by=cls.guest)
+        cls.album = Album.objects.create(name='Église', event=event, created_by=cls.guest)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+        self.data = jpeg_upload(size=(400, 300)).read()
+        self.sha256 = hash_file(io.BytesIO(self.data))[0]
+
+    def post(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/photos/', {'album': self.album.pk, **data}, format='multipart')
+
+    def test_same_content_is_stored_once(self):
+        first = self.post(image=SimpleUploadedFile('a.jpg', self.data))
+        second = self.post(image=SimpleUploadedFile('b.jpg', self.data), sha256=self.sha256)
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        blob = PhotoBlob.objects.get()
+        self.assertEqual((blob.sha256, blob.ref_count, blob.size), (self.sha256, 2, len(self.data)))
+        photos = Photo.objects.order_by('pk')
+        self.assertEqual({photo.image.name for photo in photos}, {blob.file.name})
+        self.assertEqual(photos[0].renditions, photos[1].renditions)
+        self.assertEqual(second.data['rendition_status'], 'ready')
+
+        # Empreinte seule : le contenu connu n'est pas renvoyé
+        self.assertEqual(self.post(sha256=self.sha256).status_code, 201)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 3)
+
+        # Le fichier survit tant qu'une photo le référence
+        storage = blob.file.storage
+        grid = photos[0].renditions['grid']['webp']
+        for photo in Photo.objects.order_by('pk')[:2]:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.client.delete(f'/api/photos/{photo.pk}/').status_code, 204)
+        self.assertTrue(storage.exists(blob.file.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/photos/{Photo.objects.get().pk}/')
+        self.assertFalse(PhotoBlob.objects.exists())
+        self.assertFalse(storage.exists(blob.file.name) or storage.exists(grid))
+
+    def test_unknown_or_mismatched_hash_is_rejected(self):
+        unknown = self.post(sha256='0' * 64)
+        self.assertEqual((unknown.status_code, unknown.data['sha256'][0].code), (400, 'unknown_content'))
+        self.assertEqual(self.post(image=SimpleUploadedFile('a.jpg', self.data), sha256='0' * 64).status_code, 400)
+        self.assertEqual(self.post(sha256='pas-une-empreinte').status_code, 400)
+        self.assertFalse(PhotoBlob.objects.exists())
+
+    def test_hash_alone_only_reuses_visible_content(self):
+        # Photo d'un autre événement, puis d'un album privé du même événement
+        other = User.objects.create_user(username='autre', email='autre@example.com')
+        elsewhere = Album.objects.create(name='Ailleurs', created_by=other, event=Event.objects.create(
+            title='Anniversaire', event_type=self.album.event.event_type, start_date=timezone.now(), created_by=other))
+        private = Album.objects.create(name='Coulisses', event=self.album.event, created_by=self.guest, is_public=False)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.post(album=elsewhere.pk, image=SimpleUploadedFile('a.jpg', self.data)).status_code, 201)
+
+        # Contenu stocké mais invisible : même réponse qu'un contenu inconnu, les octets sont exigés
+        self.client.force_authenticate(self.guest)
+        response = self.post(sha256=self.sha256)
+        self.assertEqual((response.status_code, response.data['sha256'][0].code), (400, 'unknown_content'))
+        response = self.client.post('/api/photos/uploads/', {
+            'album': self.album.pk, 'filename': 'b.jpg', 'size': len(self.data), 'sha256': self.sha256,
+        })
+        self.assertEqual(response.data['status'], 'open')
+
+        self.assertEqual(self.post(album=private.pk, image=SimpleUploadedFile('a.jpg', self.data)).status_code, 201)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.post(sha256=self.sha256).status_code, 400)
+        # L'organisateur voit l'album privé : l'empreinte lui suffit
+        self.client.force_authenticate(self.guest)
+        self.assertEqual(self.post(sha256=self.sha256).status_code, 201)
+        self.assertEqual(PhotoBlob.objects.get().ref_count, 3)
+
+    def test_upload_session_with_known_hash_completes_at_once(self):
+        self.post(image=SimpleUploadedFile('a.jpg', self.data))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/photos/uploads/', {
+                'album': self.album.pk, 'filename': 'b.jpg', 'size': len(self.data), 'sha256': self.sha256,
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['status'], response.data['received']), ('complete', len(self.data)))
+        self.assertEqual((Photo.objects.count(), PhotoBlob.objects.get().ref_count), (2, 2))
+
+        # Contenu inconnu : la session reste ouverte et le fichier est vérifié à la finalisation
+        other = jpeg_upload(size=(300, 200)).read()
+        response = self.client.post('/api/photos/uploads/', {
+            'album': self.album.pk, 'filename': 'c.jpg', 'size': len(other), 'sha256': self.sha256[::-1],
+        })
+        self.assertEqual(response.data['status'], 'open')
+        url = f"/api/photos/uploads/{response.data['id']}/"
+        self.client.generic('PUT', url, other, content_type='application/octet-stream',
+                            HTTP_CONTENT_RANGE=f'bytes 0-{len(other) - 1}/{len(other)}')
+        self.assertEqual(self.client.post(f'{url}finalize/').status_code, 400)
+
+    def test_dedupe_command_merges_existing_photos(self):
+        legacy = [Photo.objects.create(album=self.album, uploaded_by=self.guest,
+                                       image=SimpleUploadedFile(name, self.data)) for name in ('a.jpg', 'b.jpg')]
+        for photo in legacy:
+            generate_renditions(photo)
+        storage = legacy[1].image.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_photos', stdout=io.StringIO())
+        blob = PhotoBlob.objects.get()
+        self.assertEqual((blob.ref_count, blob.file.name), (2, legacy[0].image.name))
+        kept = Photo.objects.get(pk=legacy[1].pk)
+        self.assertEqual((kept.image.name, kept.renditions), (blob.file.name, legacy[0].renditions))
+        self.assertFalse(storage.exists(legacy[1].image.name))
+        self.assertFalse(storage.exists(legacy[1].renditions['grid']['webp']))
@@ -0,0 +1,181 @@
+import fcntl
+import os
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .blobs import FORMAT_EXTENSIONS, acquire_blob, attach_blob, hash_file, visible_content
+from .models import Photo, PhotoUpload
+from .renditions import queue_renditions
+
+# Les morceaux sont ajoutés à un fichier temporaire local, lus par blocs depuis le corps de la
+# requête : un envoi de 10 Mo ne passe jamais en mémoire. Chaque session a son propre verrou de
+# fichier ; aucune transaction n'est ouverte pendant la réception d'un morceau.
+READ_SIZE = 64 * 1024
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+DEFAULTS = {'TEMP_DIR': os.path.join(settings.BASE_DIR, 'tmp', 'photo_uploads'),
+            'MAX_SIZE': 50 * 1024 * 1024, 'EXPIRY': 24 * 60 * 60}
+
+
+def upload_setting(name):
+    return {**DEFAULTS, **getattr(settings, 'PHOTO_UPLOADS', {})}[name]
+
+
+class UploadError(ValueError):
+    """Morceau refusé ; ``offset`` indique au client où reprendre"""
+
+    def __init__(self, message, offset=None, conflict=False):
+        super().__init__(message)
+        self.offset = offset
+        self.conflict = conflict
+
+
+def part_path(upload):
+    return os.path.join(upload_setting('TEMP_DIR'), f'{upload.pk}.part')
+
+
+def parse_content_range(header, size):
+    """(début, fin exclue) d'un en-tête « Content-Range: bytes 0-1048575/10485760 »"""
+    match = CONTENT_RANGE.match(header or '')
+    if not match:
+        raise UploadError("En-tête Content-Range attendu : « bytes début-fin/taille ».")
+    start, last, total = (int(value) for value in match.groups())
+    if total != size or last < start or last >= size:
+        raise UploadError("Plage d'octets incompatible avec la taille annoncée.")
+    return start, last + 1
+
+
+@contextmanager
+def _locked(path):
+    """Verrou exclusif, sans attente, sur le fichier temporaire d'une session"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError("Un autre morceau de cet envoi est en cours de réception.", conflict=True)
+        try:
+            yield part
+        finally:
+            fcntl.flock(part, fcntl.LOCK_UN)
+
+
+def append_chunk(upload, start, end, stream):
+    """Écrit les octets [start, end[ lus dans ``stream`` ; retourne la nouvelle position.
+
+    Un morceau déjà reçu est ignoré (renvoi après une coupure) ; un morceau qui laisserait un
+    trou est refusé avec la position attendue.
+    """
+    if upload.status != 'open':
+        raise UploadError("Cet envoi est déjà terminé.", offset=upload.received, conflict=True)
+    with _locked(part_path(upload)) as part:
+        # La position fait foi une fois le verrou obtenu : un autre morceau a pu l'avancer
+        received = PhotoUpload.objects.filter(pk=upload.pk).values_list('received', flat=True).get()
+        if end <= received:
+            return received
+        if start > received:
+            raise UploadError("Morceau hors séquence.", offset=received, conflict=True)
+        # Le début du morceau déjà reçu est lu puis ignoré
+        remaining, skip = end - start, received - start
+        part.seek(received)
+        while remaining:
+            block = stream.read(min(READ_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            if skip:
+                dropped = min(skip, len(block))
+                block, skip = block[dropped:], skip - dropped
+            part.write(block)
+        part.flush()
+        os.fsync(part.fileno())
+        written = part.tell()
+        if remaining:
+            # Corps tronqué : la partie reçue est conservée, le client reprendra à ``written``
+            part.truncate(written)
+        PhotoUpload.objects.filter(pk=upload.pk).update(received=written, updated_at=timezone.now())
+    upload.received = written
+    if remaining:
+        raise UploadError("Corps de requête plus court que la plage annoncée.", offset=written)
+    return written
+
+
+def _create_photo(upload, blob):
+    photo = attach_blob(Photo(album_id=upload.album_id, uploaded_by_id=upload.uploaded_by_id,
+                              caption=upload.caption, location=upload.location), blob)
+    photo.save()
+    upload.status, upload.photo = 'complete', photo
+    upload.save(update_fields=['status', 'received', 'photo', 'updated_at'])
+    queue_renditions(photo)
+    return photo
+
+
+def shortcut_upload(upload):
+    """Termine une session dont l'empreinte désigne un contenu visible de l'auteur ; retourne la photo ou None"""
+    if not visible_content(upload.sha256, upload.album, upload.uploaded_by_id):
+        return None
+    blob = acquire_blob(upload.sha256)
+    if blob is None:
+        return None
+    upload.received = upload.size
+    return _create_photo(upload, blob)
+
+
+def finalize(upload):
+    """Crée la photo depuis le fichier reçu, en une transaction, et programme ses rendus.
+
+    Le fichier est haché par blocs : un contenu déjà stocké n'est pas conservé une seconde fois.
+    L'extension stockée est celle du format détecté par Pillow, pas celle du nom annoncé.
+    """
+    if upload.status == 'complete':
+        return upload.photo, False
+    if upload.received != upload.size:
+        raise UploadError("Envoi incomplet.", offset=upload.received, conflict=True)
+    path = part_path(upload)
+    try:
+        with Image.open(path) as image:
+            image.verify()
+            extension = FORMAT_EXTENSIONS.get(image.format)
+    except Image.DecompressionBombError:
+        raise UploadError("Image trop grande (nombre de pixels).")
+    except (OSError, SyntaxError):
+        raise UploadError("Le fichier reçu n'est pas une image valide.")
+    if extension is None:
+        raise UploadError("Format d'image non pris en charge (JPEG, PNG, GIF ou WebP).")
+
+    with open(path, 'rb') as part:
+        sha256, size = hash_file(part)
+        if upload.sha256 and upload.sha256 != sha256:
+            raise UploadError("Le fichier reçu ne correspond pas à l'empreinte annoncée.")
+        stored = None
+        try:
+            with transaction.atomic():
+                # Verrou de la seule session : deux finalisations simultanées ne créent qu'une photo
+                upload = PhotoUpload.objects.select_for_update().get(pk=upload.pk)
+                if upload.status == 'complete':
+                    return upload.photo, False
+                # Contenu nouveau : le fichier partiel est copié, et supprimé seulement après la
+                # validation. Si la transaction est annulée, la session reste finalisable.
+                blob = acquire_blob(sha256, File(part), extension, size)
+                if blob.ref_count == 1:
+                    stored = blob.file
+                photo = _create_photo(upload, blob)
+                transaction.on_commit(lambda: discard_part(upload))
+        except Exception:
+            # La copie faite par cet envoi n'est référencée par aucun blob validé
+            if stored is not None:
+                stored.storage.delete(stored.name)
+            raise
+    return photo, True
+
+
+def discard_part(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
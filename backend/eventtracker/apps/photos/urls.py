@@ -1,7 +1,13 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
 from . import views
 
+# Les photos sont à la racine de l'application (api/photos/<id>/), comme l'attend l'application mobile
+router = SimpleRouter()
+router.register(r'albums', views.AlbumViewSet, basename='album')
+router.register(r'uploads', views.PhotoUploadViewSet, basename='photo-upload')
+router.register(r'', views.PhotoViewSet, basename='photo')
+
 urlpatterns = [
-    # Vos URLs ici
-    # Exemple : path('gifts/', views.GiftListView.as_view(), name='gift-list'),
-]
\ No newline at end of file
+    path('', include(router.urls)),
+]
@@ -1,3 +1,110 @@
-from django.shortcuts import render
+import io
 
-# Create your views here.
+from django.db.models import Q
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .models import Album, Photo, PhotoUpload
+from .pagination import PhotoCursorPagination
+from .renditions import queue_renditions
+from .serializers import AlbumSerializer, PhotoSerializer, PhotoUploadSerializer
+from .uploads import UploadError, append_chunk, discard_part, finalize, parse_content_range
+
+
+class AlbumViewSet(viewsets.ModelViewSet):
+    """Albums des événements de l'utilisateur et albums publics"""
+    serializer_class = AlbumSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if self.action in ('list', 'retrieve'):
+            albums = Album.objects.filter(Q(event__created_by=user) | Q(is_public=True))
+        else:
+            # Seul l'organisateur de l'événement modifie ses albums
+            albums = Album.objects.filter(event__created_by=user)
+        return albums.order_by('-created_at', '-id')
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+
+class PhotoViewSet(viewsets.ModelViewSet):
+    """Photos des albums visibles ; les rendus sont générés après l'envoi, hors requête"""
+    serializer_class = PhotoSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PhotoCursorPagination
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        user = self.request.user
+        photos = Photo.objects.filter(Q(album__event__created_by=user) | Q(album__is_public=True))
+        if self.action not in ('list', 'retrieve'):
+            # Une photo est modifiée par son auteur ou par l'organisateur de l'événement
+            photos = photos.filter(Q(uploaded_by=user) | Q(album__event__created_by=user))
+        for param, field in (('album', 'album'), ('event', 'album__event')):
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    photos = photos.filter(**{field: int(value)})
+                except ValueError:
+                    raise ValidationError({param: "Identifiant invalide."})
+        return photos
+
+    def perform_create(self, serializer):
+        queue_renditions(serializer.save(uploaded_by=self.request.user))
+
+    def perform_update(self, serializer):
+        photo = serializer.save()
+        if 'sha256' in serializer.validated_data:
+            # Nouveau contenu : ses rendus sont repris d'une autre photo ou générés
+            queue_renditions(photo)
+
+
+class PhotoUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                         viewsets.GenericViewSet):
+    """Envoi reprenable : création de la session, PUT des plages d'octets, puis finalisation.
+
+    GET sur la session donne la position ``received`` à laquelle reprendre après une coupure.
+    """
+    serializer_class = PhotoUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return PhotoUpload.objects.filter(uploaded_by=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(uploaded_by=self.request.user)
+
+    def perform_destroy(self, upload):
+        upload.delete()
+        discard_part(upload)
+
+    def update(self, request, *args, **kwargs):
+        """Ajoute un morceau (corps brut, en-tête Content-Range) ; le corps est lu par blocs"""
+        upload = self.get_object()
+        try:
+            start, end = parse_content_range(request.headers.get('Content-Range'), upload.size)
+            received = append_chunk(upload, start, end, request.stream or io.BytesIO())
+        except UploadError as error:
+            return self.upload_error(error, upload)
+        return Response({'id': upload.pk, 'received': received, 'size': upload.size})
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Crée la photo depuis le fichier reçu et programme ses rendus"""
+        upload = self.get_object()
+        try:
+            photo, created = finalize(upload)
+        except UploadError as error:
+            return self.upload_error(error, upload)
+        return Response(PhotoSerializer(photo, context=self.get_serializer_context()).data,
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @staticmethod
+    def upload_error(error, upload):
+        data = {'detail': str(error)}
+        if error.offset is not None:
+            data['received'] = error.offset
+        return Response(data, status=status.HTTP_409_CONFLICT if error.conflict else status.HTTP_400_BAD_REQUEST)
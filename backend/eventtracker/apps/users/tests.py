@@ -1,3 +1,61 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from eventtracker.testing import EndpointBudgetMixin
+from .models import User, UserPreference
+
+# Budgets par endpoint : nombre maximal de requêtes SQL et durée maximale (ms).
+# Toute régression (N+1, sérialisation plus lente) fait échouer la suite.
+ENDPOINT_BUDGETS = {
+    'users-register': {'queries': 9, 'ms': 300},
+    'users-login': {'queries': 5, 'ms': 300},
+    'users-profile': {'queries': 0, 'ms': 200},
+    'users-profile-update': {'queries': 1, 'ms': 200},
+    'users-preferences': {'queries': 1, 'ms': 200},
+    'users-preferences-update': {'queries': 2, 'ms': 200},
+}
+
+
+class UserEndpointBudgetTests(EndpointBudgetMixin, TestCase):
+    """Budgets des endpoints d'authentification et de profil"""
+    budgets = ENDPOINT_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='invite', email='invite@example.com', password='secret')
+        UserPreference.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_register(self):
+        response = self.measure('users-register', 'post', '/api/users/register/', {
+            'username': 'nouveau',
+            'email': 'nouveau@example.com',
+            'password': 'Mot2passe!Solide',
+            'password_confirm': 'Mot2passe!Solide',
+        }, expected_status=201)
+        self.assertIn('token', response.data)
+
+    def test_login(self):
+        response = self.measure('users-login', 'post', '/api/users/login/', {
+            'email': 'invite@example.com',
+            'password': 'secret',
+        })
+        self.assertIn('token', response.data)
+
+    def test_profile(self):
+        self.client.force_authenticate(self.user)
+        self.measure('users-profile', 'get', '/api/users/profile/')
+
+    def test_profile_update(self):
+        self.client.force_authenticate(self.user)
+        self.measure('users-profile-update', 'patch', '/api/users/profile/', {'first_name': 'Awa'})
+
+    def test_preferences(self):
+        self.client.force_authenticate(self.user)
+        self.measure('users-preferences', 'get', '/api/users/preferences/')
+
+    def test_preferences_update(self):
+        self.client.force_authenticate(self.user)
+        self.measure('users-preferences-update', 'patch', '/api/users/preferences/', {'notification_push': False})
@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eventtracker.settings')
 
-application = get_asgi_application()
+# Django doit être initialisé avant d'importer les consumers (modèles)
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from apps.messaging.middleware import TokenAuthMiddleware  # noqa: E402
+from apps.messaging.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': TokenAuthMiddleware(URLRouter(websocket_urlpatterns)),
+})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -32,17 +33,21 @@ AUTH_USER_MODEL = 'users.User'
 # Application definition
 
 INSTALLED_APPS = [
+    # Serveur ASGI : runserver sert aussi les WebSockets (doit précéder staticfiles)
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
       
     # Third party apps
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
+    'channels',
     
     # Local apps
     'apps.users',
@@ -84,6 +89,21 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'eventtracker.wsgi.application'
+ASGI_APPLICATION = 'eventtracker.asgi.application'
+
+# Diffusion des messages de discussion entre connexions WebSocket. La couche en mémoire ne
+# relie que les sockets d'un même processus : en production, utiliser channels_redis
+# ('channels_redis.core.RedisChannelLayer') pour partager les groupes entre workers.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    }
+}
+# Messages reçus par WebSocket : regroupés par groupe de discussion puis insérés en un bulk_create
+MESSAGE_INGESTION = {
+    'DELAY': 0.005,     # attente (s) avant l'écriture d'un lot (0 : une insertion par message)
+    'MAX_BATCH': 200,   # un lot plein est écrit sans attendre
+}
 
 
 # Database
@@ -100,6 +120,24 @@ DATABASES = {
     }
 }
 
+# Les tests tournent sur SQLite pour ne pas dépendre d'un serveur PostgreSQL
+if 'test' in sys.argv:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        }
+    }
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Cache (calendrier mensuel des événements). Avec plusieurs processus en production, utiliser
+# un cache partagé (Redis, Memcached) pour que l'invalidation atteigne tous les workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -137,6 +175,18 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Rendus des photos (vignette de grille, écran, WebP) générés par un pool de processus
+PHOTO_RENDITIONS = {
+    'WORKERS': None,     # processus de rendu (None : un par cœur ; 0 : dans le processus courant)
+    'BACKGROUND': True,  # rendus hors requête ; False : à la validation de la transaction (tests)
+    'START_METHOD': 'forkserver',  # création des processus (spawn si forkserver est indisponible)
+}
+# Envois de photos par morceaux (api/photos/uploads/) : fichiers partiels sur le disque local
+PHOTO_UPLOADS = {
+    'TEMP_DIR': os.path.join(BASE_DIR, 'tmp', 'photo_uploads'),
+    'MAX_SIZE': 50 * 1024 * 1024,  # octets par photo
+    'EXPIRY': 24 * 60 * 60,        # secondes avant la purge d'un envoi abandonné
+}
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -152,4 +202,20 @@ REST_FRAMEWORK = {
     ],
 }
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Envoi des rappels (commande send_reminders)
+REMINDER_NOTIFIER = 'apps.events.reminders.LogNotifier'
+# Envoi des invitations par email (commande send_invitations et api/guests/invitations/send/)
+DEFAULT_FROM_EMAIL = 'EventTracker <invitations@eventtracker.local>'
+INVITATION_LINK = 'http://localhost:8000/api/guests/invitations/{code}/'
+INVITATION_MAILER = {
+    'WORKERS': 4,       # connexions SMTP ouvertes en parallèle
+    'RATE': 0,          # messages par seconde, tous workers confondus (0 : sans limite)
+    'RETRIES': 3,       # nouvelles tentatives par message
+    'BACKOFF': 1.0,     # attente initiale (s) avant une nouvelle tentative, doublée à chaque essai
+    'BATCH_SIZE': 500,  # invitations réclamées par lot
+    'BACKGROUND': True,  # l'API lance l'envoi dans un thread ; False : envoi immédiat (tests)
+    'TIMEOUT': 120,     # secondes sans résultat avant de compter le reste du lot en échec
+    'CLAIM_EXPIRY': 3600,  # secondes avant qu'un lot interrompu (« sending ») soit repris par --retry-failed
+}
@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class EndpointBudgetMixin:
+    """Mesure chaque appel d'endpoint (requêtes SQL, durée, taille de la réponse)
+    et le compare au budget de ``budgets``, défini par les tests de chaque application"""
+    budgets = {}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.measurements = []
+
+    @classmethod
+    def tearDownClass(cls):
+        # EVENTTRACKER_BENCH_REPORT=1 affiche le relevé complet de la suite
+        if os.environ.get('EVENTTRACKER_BENCH_REPORT'):
+            for name, queries, elapsed, size in cls.measurements:
+                print(f"{name:<28} {queries:>4} requêtes {elapsed:>8.1f} ms {size:>8} octets")
+        super().tearDownClass()
+
+    def measure(self, name, method, url, data=None, expected_status=200, **extra):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, data, format='json', **extra)
+            elapsed = (time.perf_counter() - start) * 1000
+        self.assertEqual(response.status_code, expected_status, response.content)
+
+        queries = len(context.captured_queries)
+        self.measurements.append((name, queries, elapsed, len(response.content)))
+
+        budget = self.budgets[name]
+        self.assertLessEqual(
+            queries, budget['queries'],
+            f"{name} : {queries} requêtes (budget {budget['queries']})\n"
+            + '\n'.join(query['sql'] for query in context.captured_queries)
+        )
+        self.assertLessEqual(elapsed, budget['ms'], f"{name} : {elapsed:.1f} ms (budget {budget['ms']} ms)")
+        return response
@@ -2,6 +2,8 @@ class PhotoModel {
   final String id;
   final String eventId;
   final String url;
+  // Vignette de grille (320 px) générée par le serveur ; absente tant que les rendus sont en cours
+  final String? thumbnailUrl;
   final String? caption;
   final String uploadedBy;
   final DateTime createdAt;
@@ -10,6 +12,7 @@ class PhotoModel {
     required this.id,
     required this.eventId,
     required this.url,
+    this.thumbnailUrl,
     this.caption,
     required this.uploadedBy,
     required this.createdAt,
@@ -20,6 +23,7 @@ class PhotoModel {
       id: json['id'],
       eventId: json['event_id'],
       url: json['url'],
+      thumbnailUrl: json['renditions']?['grid']?['url'],
       caption: json['caption'],
       uploadedBy: json['uploaded_by'],
       createdAt: DateTime.parse(json['created_at']),
@@ -31,6 +35,7 @@ class PhotoModel {
       'id': id,
       'event_id': eventId,
       'url': url,
+      'renditions': thumbnailUrl == null ? {} : {'grid': {'url': thumbnailUrl}},
       'caption': caption,
       'uploaded_by': uploadedBy,
       'created_at': createdAt.toIso8601String(),
@@ -41,6 +46,7 @@ class PhotoModel {
     String? id,
     String? eventId,
     String? url,
+    String? thumbnailUrl,
     String? caption,
     String? uploadedBy,
     DateTime? createdAt,
@@ -49,6 +55,7 @@ class PhotoModel {
       id: id ?? this.id,
       eventId: eventId ?? this.eventId,
       url: url ?? this.url,
+      thumbnailUrl: thumbnailUrl ?? this.thumbnailUrl,
       caption: caption ?? this.caption,
       uploadedBy: uploadedBy ?? this.uploadedBy,
       createdAt: createdAt ?? this.createdAt,
@@ -26,11 +26,28 @@ class ApiService {
   }
 
   Future<dynamic> get(String endpoint) async {
+    return _getUri(Uri.parse('${Constants.apiUrl}/$endpoint'));
+  }
+
+  // Tous les éléments d'une liste paginée par curseur ({next, previous, results}) :
+  // les pages sont lues en suivant `next` jusqu'à la dernière
+  Future<List<dynamic>> getAll(String endpoint) async {
+    dynamic response = await get(endpoint);
+    if (response is List) return response;
+
+    final items = <dynamic>[];
+    while (response is Map && response['results'] is List) {
+      items.addAll(response['results'] as List);
+      final next = response['next'];
+      if (next is! String) break;
+      response = await _getUri(Uri.parse(next));
+    }
+    return items;
+  }
+
+  Future<dynamic> _getUri(Uri uri) async {
     final headers = await _getHeaders();
-    final response = await _client.get(
-      Uri.parse('${Constants.apiUrl}/$endpoint'),
-      headers: headers,
-    );
+    final response = await _client.get(uri, headers: headers);
 
     return _handleResponse(response);
   }
@@ -27,13 +27,9 @@ class EventService {
     }
     
     // Mode normal avec API
-    final response = await _apiService.get('events');
-    
-    if (response != null && response is List) {
-      return response.map((item) => EventModel.fromJson(item)).toList();
-    }
-    
-    return [];
+    // Réponse paginée par curseur : toutes les pages sont lues
+    final items = await _apiService.getAll('events?page_size=100');
+    return items.map((item) => EventModel.fromJson(item)).toList();
   }
 
   Future<EventModel> getEventById(String id) async {
@@ -218,13 +214,9 @@ class EventService {
     }
     
     // Mode normal avec API
-    final response = await _apiService.get('events/upcoming');
-    
-    if (response != null && response is List) {
-      return response.map((item) => EventModel.fromJson(item)).toList();
-    }
-    
-    return [];
+    // Réponse paginée par curseur : toutes les pages sont lues
+    final items = await _apiService.getAll('events/upcoming?page_size=100');
+    return items.map((item) => EventModel.fromJson(item)).toList();
   }
 
   Future<List<EventModel>> getPastEvents() async {
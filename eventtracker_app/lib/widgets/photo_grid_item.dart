@@ -27,7 +27,7 @@ class PhotoGridItem extends StatelessWidget {
           children: [
             // Image
             CachedNetworkImage(
-              imageUrl: photo.url,
+              imageUrl: photo.thumbnailUrl ?? photo.url,
               fit: BoxFit.cover,
               placeholder: (context, url) => Container(
                 color: Colors.grey[300],